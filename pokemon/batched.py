@@ -0,0 +1,322 @@
+"""
+Struct-of-arrays battle simulator for many concurrent battles.
+
+Instead of Player / Pokemon / Move objects, a BattleBatch keeps the state of
+every battle in NumPy arrays indexed by [battle, side, party slot (, move
+slot)], and BattleBatch.step() advances every unfinished battle by one turn
+with a fixed number of array operations, no matter how many battles there are.
+
+The turn rules are the ones used by pokemon_driver.execute_turn():
+
+    - If anybody runs away, the battle ends (a draw if both ran).
+    - Otherwise higher-priority actions go first (heal > switch > attack).
+      If both players attack, the faster current Pokemon goes first, and
+      speed ties are decided by a coin flip.
+    - If the first action makes the other side's current Pokemon faint, the
+      other side doesn't act this turn.
+    - A side whose current Pokemon fainted switches to the first Pokemon in
+      its party that can still battle (like engine.Policy.choose_switch()).
+    - After a faint, the battle is over if either side has no Pokemon left.
+
+Actions are given as two [battle, side] integer arrays: the action kind, and
+its argument (the move slot to attack with, or the party slot to switch to).
+
+This module requires NumPy.
+
+"""
+
+import numpy
+
+from type_chart import EFFECTIVENESS_ARRAY
+
+
+# Action kinds. They are numbered like the priorities of the matching Action
+# classes in pokemon_driver, so comparing kinds compares priorities.
+ATTACK = 0
+SWITCH = 1
+HEAL = 2
+RUN = 3
+
+# Values of BattleBatch.result.
+ONGOING = -1
+P1_WINS = 0
+P2_WINS = 1
+DRAW = 2
+
+HEAL_AMOUNT = 20
+
+
+def encode_parties(parties):
+    """Takes a list of parties (lists of Pokemon objects, or Player objects)
+    and returns a dict of NumPy arrays describing them, indexed by
+    [party, party slot (, move slot)]. Short parties and move lists are
+    padded with empty slots: no HP, and moves with no power. 'party_size'
+    (indexed by [party]) tells how many slots of each party are real.
+    """
+
+    parties = [
+        getattr(party, 'pokemon_party', party) for party in parties
+    ]
+
+    # Each distinct party is encoded once, and then copied to every index
+    # it appears at.
+    uniqueIndex = {}
+    rows = []
+    for party in parties:
+        uniqueIndex.setdefault(id(party), len(uniqueIndex))
+        rows.append(uniqueIndex[id(party)])
+
+    unique = list({id(party): party for party in parties}.values())
+
+    partySize = max(len(party) for party in unique)
+    moveCount = max(len(pokemon.moves) for party in unique for pokemon in party)
+
+    # Nested lists, padded, for converting to arrays in one go.
+    emptyMoves = [0] * moveCount
+    columns = {
+        'hp': [], 'max_hp': [], 'speed': [], 'type_id': [], 'move_count': [],
+        'move_power': [], 'move_type_id': [],
+    }
+
+    for party in unique:
+        padding = partySize - len(party)
+        columns['hp'].append([pokemon.hp for pokemon in party] + [0] * padding)
+        columns['max_hp'].append([pokemon.max_hp for pokemon in party] + [0] * padding)
+        columns['speed'].append([pokemon.speed for pokemon in party] + [0] * padding)
+        columns['type_id'].append([pokemon.type_id for pokemon in party] + [0] * padding)
+        columns['move_count'].append([len(pokemon.moves) for pokemon in party] + [0] * padding)
+        columns['move_power'].append([
+            [move.power for move in pokemon.moves] + [0] * (moveCount - len(pokemon.moves))
+            for pokemon in party
+        ] + [emptyMoves] * padding)
+        columns['move_type_id'].append([
+            [move.type_id for move in pokemon.moves] + [0] * (moveCount - len(pokemon.moves))
+            for pokemon in party
+        ] + [emptyMoves] * padding)
+
+    rows = numpy.array(rows, dtype=numpy.intp)
+    arrays = {
+        'party_size': numpy.array([len(party) for party in parties], dtype=numpy.intp),
+    }
+    for name, values in columns.items():
+        dtype = numpy.intp if name in ('type_id', 'move_count', 'move_type_id') else numpy.float64
+        arrays[name] = numpy.array(values, dtype=dtype)[rows]
+
+    return arrays
+
+
+class BattleBatch:
+    """The state of many battles between pairs of parties, stored as NumPy
+    arrays indexed by [battle, side, party slot (, move slot)]. Side 0 is
+    player 1.
+
+    parties1, parties2: equally long lists of parties (lists of Pokemon, or
+    Player objects). Battle i is parties1[i] against parties2[i]. The
+    objects are only read; every battle starts with the current HP of the
+    given Pokemon and with the first Pokemon of each party sent out.
+    """
+
+    def __init__(self, parties1, parties2):
+        assert len(parties1) == len(parties2)
+
+        count = len(parties1)
+        arrays = encode_parties(list(parties1) + list(parties2))
+
+        def by_side(array):
+            # [party, ...] -> [battle, side, ...]
+            return numpy.ascontiguousarray(
+                numpy.stack([array[:count], array[count:]], axis=1)
+            )
+
+        self.hp = by_side(arrays['hp'])
+        self.max_hp = by_side(arrays['max_hp'])
+        self.speed = by_side(arrays['speed'])
+        self.type_id = by_side(arrays['type_id'])
+        self.move_count = by_side(arrays['move_count'])
+        self.move_power = by_side(arrays['move_power'])
+        self.move_type_id = by_side(arrays['move_type_id'])
+
+        self.active = numpy.zeros((count, 2), dtype=numpy.intp)
+        self.result = numpy.full(count, ONGOING, dtype=numpy.int8)
+        self.turns = numpy.zeros(count, dtype=numpy.int64)
+
+    def __len__(self):
+        return len(self.result)
+
+    def ongoing(self):
+        '''Returns the indices of the battles that aren't over yet.'''
+        return numpy.flatnonzero(self.result == ONGOING)
+
+    def greedy_actions(self):
+        '''Returns (kinds, args) arrays in which every side attacks with the
+        move that deals the most damage to the other side's current Pokemon
+        (the first such move on ties, like engine.GreedyPolicy). Only the
+        unfinished battles are looked at.
+        '''
+        battles = self.ongoing()[:, None]
+        sides = numpy.arange(2)[None, :]
+        attacker = self.active[battles[:, 0]]
+        defender = attacker[:, ::-1]
+
+        power = self.move_power[battles, sides, attacker]
+        moveTypes = self.move_type_id[battles, sides, attacker]
+        defendTypes = self.type_id[battles, 1 - sides, defender]
+
+        damage = power * EFFECTIVENESS_ARRAY[moveTypes, defendTypes[..., None]]
+
+        # Never pick padding slots.
+        moveSlots = numpy.arange(damage.shape[-1])
+        padding = moveSlots >= self.move_count[battles, sides, attacker][..., None]
+        damage[padding] = -1
+
+        kinds = numpy.zeros((len(self), 2), dtype=numpy.intp)
+        args = numpy.zeros((len(self), 2), dtype=numpy.intp)
+        args[battles[:, 0]] = damage.argmax(axis=-1)
+        return kinds, args
+
+    def random_actions(self, rng):
+        '''Returns (kinds, args) arrays in which every side attacks with a
+        uniformly random move. rng is a numpy.random.Generator.
+        '''
+        battles = numpy.arange(len(self))[:, None]
+        sides = numpy.arange(2)[None, :]
+        moveCount = self.move_count[battles, sides, self.active]
+
+        kinds = numpy.full((len(self), 2), ATTACK, dtype=numpy.intp)
+        args = (rng.random((len(self), 2)) * moveCount).astype(numpy.intp)
+        return kinds, args
+
+    def step(self, kinds, args, rng):
+        """Advances every unfinished battle by one turn.
+
+        kinds, args: [battle, side] integer arrays with each side's action
+            kind (ATTACK, SWITCH, HEAL or RUN) and its move or party slot.
+            Entries for finished battles are ignored.
+        rng: a numpy.random.Generator, used for speed ties.
+
+        Returns the number of battles that took a turn.
+        """
+
+        ongoing = self.ongoing()
+        self.turns[ongoing] += 1
+
+        kind1 = kinds[ongoing, 0]
+        kind2 = kinds[ongoing, 1]
+
+        # Running away ends the battle.
+        ran1 = kind1 == RUN
+        ran2 = kind2 == RUN
+        self.result[ongoing[ran1 & ran2]] = DRAW
+        self.result[ongoing[ran1 & ~ran2]] = P2_WINS
+        self.result[ongoing[~ran1 & ran2]] = P1_WINS
+
+        stayed = ~(ran1 | ran2)
+        battles = ongoing[stayed]
+        kind1 = kind1[stayed]
+        kind2 = kind2[stayed]
+
+        # In what order should we perform these actions?
+        speed1 = self.speed[battles, 0, self.active[battles, 0]]
+        speed2 = self.speed[battles, 1, self.active[battles, 1]]
+        coin = rng.integers(0, 2, size=len(battles)) == 0
+
+        bothAttack = (kind1 == ATTACK) & (kind2 == ATTACK)
+        p1First = numpy.where(
+            bothAttack,
+            (speed1 > speed2) | ((speed1 == speed2) & coin),
+            kind1 > kind2,
+        )
+        firstSide = numpy.where(p1First, 0, 1)
+        secondSide = 1 - firstSide
+
+        self._apply(battles, firstSide, kinds, args)
+        fainted = self._handle_fainting(battles, secondSide)
+
+        # Only the battles where nobody fainted get a second action.
+        rest = ~fainted
+        self._apply(battles[rest], secondSide[rest], kinds, args)
+        fainted[rest] = self._handle_fainting(battles[rest], firstSide[rest])
+
+        # If either Pokemon fainted, check to see if the battle is over.
+        checked = battles[fainted]
+        hasPokemon = (self.hp[checked] > 0).any(axis=2)
+        self.result[checked[hasPokemon[:, 0] & ~hasPokemon[:, 1]]] = P1_WINS
+        self.result[checked[~hasPokemon[:, 0] & hasPokemon[:, 1]]] = P2_WINS
+        self.result[checked[~hasPokemon[:, 0] & ~hasPokemon[:, 1]]] = DRAW
+
+        return len(ongoing)
+
+    def run(self, choose_actions, rng, maxTurns=1000):
+        """Steps every battle until all of them are over, asking
+        choose_actions(batch) for each turn's (kinds, args) arrays. Battles
+        that last longer than maxTurns turns are declared draws.
+
+        Returns the total number of battle turns simulated.
+        """
+
+        turns = 0
+        for _ in range(maxTurns):
+            if not (self.result == ONGOING).any():
+                break
+
+            kinds, args = choose_actions(self)
+            turns += self.step(kinds, args, rng)
+
+        self.result[self.result == ONGOING] = DRAW
+        return turns
+
+    def _apply(self, battles, sides, kinds, args):
+        # Performs the action of the given side in each of the given battles.
+        kind = kinds[battles, sides]
+        arg = args[battles, sides]
+        current = self.active[battles, sides]
+
+        attack = kind == ATTACK
+        if attack.any():
+            b = battles[attack]
+            side = sides[attack]
+            attacker = current[attack]
+            move = arg[attack]
+            defender = self.active[b, 1 - side]
+
+            damage = self.move_power[b, side, attacker, move] * EFFECTIVENESS_ARRAY[
+                self.move_type_id[b, side, attacker, move],
+                self.type_id[b, 1 - side, defender],
+            ]
+            self.hp[b, 1 - side, defender] = numpy.maximum(
+                self.hp[b, 1 - side, defender] - damage, 0,
+            )
+
+        switch = kind == SWITCH
+        if switch.any():
+            b = battles[switch]
+            side = sides[switch]
+            target = numpy.clip(arg[switch], 0, self.hp.shape[2] - 1)
+
+            # Like Player.switch(), refuse fainted Pokemon and the current one.
+            allowed = (self.hp[b, side, target] > 0) & (target != current[switch])
+            self.active[b[allowed], side[allowed]] = target[allowed]
+
+        heal = kind == HEAL
+        if heal.any():
+            b = battles[heal]
+            side = sides[heal]
+            pokemon = current[heal]
+
+            self.hp[b, side, pokemon] = numpy.minimum(
+                self.hp[b, side, pokemon] + HEAL_AMOUNT,
+                self.max_hp[b, side, pokemon],
+            )
+
+    def _handle_fainting(self, battles, sides):
+        # Vectorized pokemon_driver.handle_fainting(). Returns a boolean array
+        # telling which of the given sides' current Pokemon had fainted.
+        fainted = self.hp[battles, sides, self.active[battles, sides]] <= 0
+
+        b = battles[fainted]
+        side = sides[fainted]
+        canBattle = self.hp[b, side] > 0
+        hasPokemon = canBattle.any(axis=1)
+        self.active[b[hasPokemon], side[hasPokemon]] = canBattle[hasPokemon].argmax(axis=1)
+
+        return fainted
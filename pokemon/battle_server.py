@@ -0,0 +1,689 @@
+"""
+Asyncio battle server: many simultaneous battles over local TCP.
+
+pokemon_driver.main() plays one battle at a time, blocking on input(). A
+BattleServer hosts any number of battles in one asyncio event loop instead.
+Clients connect over TCP and speak newline-delimited JSON: one JSON object
+per line, each with a "type".
+
+Client to server:
+
+    {"type": "join", "name": "Ash", "rating": 1500}
+        Join the matchmaking queue (see matchmaking.py). A server that
+        keeps ratings (see ratings.py) matches players by its own rating
+        of them, and ignores any rating they send; otherwise the rating is
+        taken from the message (default: DEFAULT_RATING). A "team" may be
+        given as a list of
+        [name, type, max_hp, speed, [[move name, move type, power], ...]]
+        entries; otherwise the server's team factory (by default
+        pokemon_team.create_team()) builds one. Either way, the team must
+        pass compatibility_checker.check_team().
+
+    {"type": "action", "action": "attack", "move": "Thunderbolt"}
+    {"type": "action", "action": "switch", "pokemon": "Squirtle"}
+    {"type": "action", "action": "heal"}
+    {"type": "action", "action": "run"}
+        This turn's action. "switchTo" may name the Pokemon to send out if
+        the current one faints this turn (by default, the first one in the
+        party that can battle). "turn" may be given, to have actions meant
+        for an earlier turn rejected.
+
+Server to client:
+
+    {"type": "waiting"}                  queued; waiting for an opponent
+    {"type": "start", "room": ..., "side": 1 or 2, "you": ..., "opponent": ...}
+        a battle: both players' names and parties (see player_state())
+    {"type": "state", "turn": ..., "deadline": ..., "you": ..., "opponent": ...}
+        a new turn: both players' current Pokemon and HP (see turn_state()),
+        and the seconds left to act
+    {"type": "events", "turn": ..., "events": [...]}
+        what happened during the turn (see events.py), with its narration
+    {"type": "timeout", "turn": ...}     no action in time; one was chosen
+    {"type": "error", "message": ...}    a message was rejected
+    {"type": "game_over", "winner": ..., "loser": ...}
+
+Players are paired by the server's Matchmaker, by rating. Turns are
+resolved with engine.play_turn(), i.e. with the rules of
+pokemon_driver.execute_turn(), as soon as both actions are in. A player who
+hasn't acted by the turn's deadline gets an action chosen by the server's
+timeout policy (engine.GreedyPolicy by default); a player who disconnects
+runs away. Speed ties use a random stream per room, derived from the
+server's seed (see seeding.py).
+
+Run a server, or a load test against one, from this directory:
+
+    python battle_server.py serve [--port PORT]
+    python battle_server.py loadtest [--port PORT] [--sessions N]
+                                     [--think SECONDS]
+
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+from pokemon import Pokemon, Move
+from pokemon_driver import AttackAction, SwitchAction, HealAction, RunAction, TurnResult
+from engine import Policy, GreedyPolicy, play_turn
+from events import CollectingSink
+from matchmaking import Matchmaker
+from ratings import DEFAULT_RATING
+from seeding import spawn, master_seed
+from type_chart import multiplier
+
+
+DEFAULT_PORT = 8765
+
+# Longest accepted message line, in bytes.
+MAX_LINE = 64 * 1024
+
+
+def encode_message(message):
+    """Returns a message as one line of JSON, as bytes."""
+
+    return json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def player_state(player):
+    """Returns the JSON-ready state of a Player: its name, current Pokemon,
+    and party. Only the current Pokemon and HP change during a battle (see
+    turn_state()).
+    """
+
+    return {
+        'name': player.name,
+        'current': player.current_pokemon.name,
+        'party': [
+            {
+                'name': pokemon.name,
+                'type': pokemon.type,
+                'hp': pokemon.hp,
+                'max_hp': pokemon.max_hp,
+                'speed': pokemon.speed,
+                'moves': [[move.name, move.type, move.power] for move in pokemon.moves],
+            }
+            for pokemon in player.pokemon_party
+        ],
+    }
+
+
+def turn_state(player):
+    """Returns the JSON-ready state of a Player that changes from turn to
+    turn: its current Pokemon, and the HP of each Pokemon in its party.
+    """
+
+    return {
+        'current': player.current_pokemon.name,
+        'hp': [pokemon.hp for pokemon in player.pokemon_party],
+    }
+
+
+def event_message(event):
+    """Returns the JSON-ready form of an event (see events.py)."""
+
+    message = {'event': type(event).__name__}
+    for name in event.__slots__:
+        message[name] = getattr(event, name)
+    message['text'] = event.text()
+    return message
+
+
+def build_team(definition):
+    """Builds a list of Pokemon from a join message's "team" (see the top of
+    this file). Raises ValueError if it is malformed.
+    """
+
+    try:
+        team = [
+            Pokemon(
+                str(name),
+                _number(maxHp),
+                [Move(str(moveName), _number(power), str(moveType))
+                 for moveName, moveType, power in moves],
+                str(pokemonType),
+                _number(speed),
+            )
+            for name, pokemonType, maxHp, speed, moves in definition
+        ]
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"malformed team: {e}") from None
+
+    if not team or any(not pokemon.moves for pokemon in team):
+        raise ValueError("a team needs at least one Pokemon, and every Pokemon a move")
+
+    return team
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"expected a number, not {value!r}")
+    return value
+
+
+def parse_action(message, player, opponent):
+    """Returns the Action an "action" message asks for, or raises
+    ValueError if the player can't take it.
+    """
+
+    kind = message.get('action')
+
+    if kind == 'attack':
+        moveName = message.get('move')
+        if not any(move.name == moveName for move in player.current_pokemon.moves):
+            raise ValueError(f"{player.current_pokemon.name} doesn't know {moveName!r}")
+        return AttackAction(player, moveName, opponent)
+
+    elif kind == 'switch':
+        pokemonName = message.get('pokemon')
+        if not _can_switch_to(player, pokemonName):
+            raise ValueError(f"can't switch to {pokemonName!r}")
+        return SwitchAction(player, pokemonName)
+
+    elif kind == 'heal':
+        return HealAction(player)
+
+    elif kind == 'run':
+        return RunAction(player)
+
+    raise ValueError(f"unknown action {kind!r}")
+
+
+def _can_switch_to(player, pokemonName):
+    return any(
+        pokemon.name == pokemonName and pokemon.is_alive()
+            and pokemon is not player.current_pokemon
+        for pokemon in player.pokemon_party
+    )
+
+
+class _Session:
+    # One connected client.
+
+    __slots__ = (
+        'writer', 'name', 'player', 'entrant', 'room', 'turn', 'action', 'switchTo',
+        'connected',
+    )
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.name = None
+        self.player = None
+        self.entrant = None
+        self.room = None
+        self.turn = 0
+
+        # The future the room awaits this turn's Action on, if any.
+        self.action = None
+        self.switchTo = None
+        self.connected = True
+
+    def send(self, message):
+        if self.connected:
+            self.writer.write(encode_message(message))
+
+    def write(self, data):
+        # Sends an already-encoded message.
+        if self.connected:
+            self.writer.write(data)
+
+    async def drain(self):
+        if self.connected:
+            try:
+                await self.writer.drain()
+            except ConnectionError:
+                self.disconnect()
+
+    def begin_turn(self, turn):
+        self.turn = turn
+        self.switchTo = None
+        self.action = asyncio.get_running_loop().create_future()
+        if not self.connected:
+            self.action.set_result(RunAction(self.player))
+
+    def receive(self, message):
+        kind = message.get('type')
+
+        if kind != 'action':
+            self.send({'type': 'error', 'message': f"unexpected message {kind!r}"})
+            return
+
+        if self.action is None or self.action.done():
+            self.send({'type': 'error', 'message': "not waiting for an action"})
+            return
+
+        if message.get('turn', self.turn) != self.turn:
+            self.send({'type': 'error', 'message': f"it is turn {self.turn}"})
+            return
+
+        try:
+            action = parse_action(message, self.player, self.room.opponent_of(self).player)
+        except ValueError as e:
+            self.send({'type': 'error', 'message': str(e)})
+            return
+
+        self.switchTo = message.get('switchTo')
+        self.action.set_result(action)
+
+    def disconnect(self):
+        self.connected = False
+        if self.action is not None and not self.action.done():
+            self.action.set_result(RunAction(self.player))
+
+
+class _SwitchPolicy(Policy):
+    # Chooses a session's forced switches: the Pokemon its last action asked
+    # for, or else the first one that can battle.
+
+    def __init__(self, session):
+        self.session = session
+
+    def choose_switch(self, player, opponent):
+        if _can_switch_to(player, self.session.switchTo):
+            return SwitchAction(player, self.session.switchTo)
+        return super().choose_switch(player, opponent)
+
+
+class _Room:
+    # A battle between two sessions.
+
+    def __init__(self, server, number, session1, session2):
+        self.server = server
+        self.number = number
+        self.sessions = (session1, session2)
+        self.rng = spawn(server.seed, number)
+
+        for session in self.sessions:
+            session.room = self
+
+    def opponent_of(self, session):
+        return self.sessions[1] if session is self.sessions[0] else self.sessions[0]
+
+    async def run(self):
+        server = self.server
+        session1, session2 = self.sessions
+        player1, player2 = session1.player, session2.player
+        policies = (_SwitchPolicy(session1), _SwitchPolicy(session2))
+
+        for side, session in enumerate(self.sessions, 1):
+            session.send({
+                'type': 'start',
+                'room': self.number,
+                'side': side,
+                'you': player_state(session.player),
+                'opponent': player_state(self.opponent_of(session).player),
+            })
+
+        result = TurnResult(gameOver=True)
+
+        for turn in range(1, server.maxTurns + 1):
+            states = (turn_state(player1), turn_state(player2))
+            for side, session in enumerate(self.sessions):
+                session.begin_turn(turn)
+                session.send({
+                    'type': 'state',
+                    'turn': turn,
+                    'deadline': server.turnTimeout,
+                    'you': states[side],
+                    'opponent': states[1 - side],
+                })
+                await session.drain()
+
+            await asyncio.wait(
+                [session.action for session in self.sessions], timeout=server.turnTimeout,
+            )
+
+            actions = []
+            for session in self.sessions:
+                if session.action.done():
+                    actions.append(session.action.result())
+                else:
+                    session.action.cancel()
+                    actions.append(server.timeoutPolicy.choose_action(
+                        session.player, self.opponent_of(session).player,
+                    ))
+                    session.send({'type': 'timeout', 'turn': turn})
+                session.action = None
+
+            sink = CollectingSink()
+            turnResult = play_turn(
+                actions[0], actions[1], policies[0], policies[1], sink=sink, rng=self.rng,
+            )
+            server.turns += 1
+
+            events = encode_message({
+                'type': 'events',
+                'turn': turn,
+                'events': [event_message(event) for event in sink.events],
+            })
+            for session in self.sessions:
+                session.write(events)
+
+            if turnResult.gameOver:
+                result = turnResult
+                break
+
+        gameOver = encode_message({
+            'type': 'game_over',
+            'winner': result.winner.name if result.winner is not None else None,
+            'loser': result.loser.name if result.loser is not None else None,
+        })
+        for session in self.sessions:
+            session.write(gameOver)
+            await session.drain()
+            session.writer.close()
+
+        if server.ratings is not None:
+            server.ratings.record_result(result, player1, player2)
+
+        return result
+
+
+class BattleServer:
+    """Hosts battles between pairs of clients (see the top of this file).
+
+    host, port: where to listen (port 0 picks a free port; see .port)
+    teamFactory: builds the team of a client that doesn't send one
+                 (default: pokemon_team.create_team)
+    turnTimeout: seconds each player has to choose an action
+    timeoutPolicy: the Policy that chooses actions for players who don't
+    maxTurns: turns after which a battle is a draw
+    seed: the master seed of every room's random stream (default: a fresh
+          random seed)
+    matchmaker: the Matchmaker that pairs clients (default: a Matchmaker
+                with its default rating windows)
+    ratings: a ratings.Ratings object to record every finished battle in,
+             and to look up every client's rating in (clients' own ratings
+             are only used without one)
+    """
+
+    def __init__(
+        self,
+        host='127.0.0.1',
+        port=DEFAULT_PORT,
+        teamFactory=None,
+        turnTimeout=30,
+        timeoutPolicy=None,
+        maxTurns=1000,
+        seed=None,
+        matchmaker=None,
+        ratings=None,
+    ):
+        if teamFactory is None:
+            import pokemon_team
+            teamFactory = pokemon_team.create_team
+
+        self.host = host
+        self.port = port
+        self.teamFactory = teamFactory
+        self.turnTimeout = turnTimeout
+        self.timeoutPolicy = timeoutPolicy if timeoutPolicy is not None else GreedyPolicy()
+        self.maxTurns = maxTurns
+        self.seed = master_seed(seed)
+        self.matchmaker = matchmaker if matchmaker is not None else Matchmaker()
+        self.ratings = ratings
+
+        # Statistics.
+        self.connections = 0
+        self.roomsStarted = 0
+        self.roomsFinished = 0
+        self.turns = 0
+
+        self._server = None
+        self._rooms = set()
+
+    @property
+    def activeRooms(self):
+        return len(self._rooms)
+
+    async def start(self):
+        '''Starts listening. If the port was 0, .port is the one picked.'''
+        self._server = await asyncio.start_server(
+            self._handle_client, self.host, self.port, limit=MAX_LINE, backlog=4096,
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.matchmaker.start(self._start_room)
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self):
+        '''Stops listening, and waits for the battles in progress.'''
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.matchmaker.close()
+        if self._rooms:
+            await asyncio.wait(set(self._rooms))
+
+    async def _handle_client(self, reader, writer):
+        self.connections += 1
+        session = _Session(writer)
+
+        try:
+            line = await reader.readline()
+            if not self._join(session, line):
+                writer.close()
+                return
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    session.send({'type': 'error', 'message': "messages must be JSON"})
+                    continue
+
+                if isinstance(message, dict):
+                    session.receive(message)
+
+        except (ConnectionError, ValueError, asyncio.LimitOverrunError):
+            pass
+
+        finally:
+            session.disconnect()
+            if session.entrant is not None:
+                self.matchmaker.leave(session.entrant)
+
+    def _join(self, session, line):
+        # Handles the first message of a session. Returns False if the
+        # session should be dropped.
+        try:
+            message = json.loads(line)
+            if not isinstance(message, dict) or message.get('type') != 'join':
+                raise ValueError("the first message must be a join message")
+
+            session.name = str(message.get('name') or f"Player {self.connections}")
+            if self.ratings is not None:
+                # Clients can't be trusted with their own ratings.
+                rating = self.ratings.rating(session.name)
+            else:
+                rating = message.get('rating')
+                rating = _number(rating) if rating is not None else DEFAULT_RATING
+            team = message.get('team')
+            team = build_team(team) if team is not None else self.teamFactory()
+            session.entrant = self.matchmaker.join(session.name, team, rating, session)
+
+        except ValueError as e:
+            session.send({'type': 'error', 'message': str(e)})
+            return False
+
+        session.player = session.entrant.player
+        session.send({'type': 'waiting'})
+        return True
+
+    async def _start_room(self, entrant1, entrant2):
+        # The matchmaker's battle worker: starts a room for each pair.
+        self.roomsStarted += 1
+        room = _Room(self, self.roomsStarted, entrant1.client, entrant2.client)
+
+        task = asyncio.create_task(room.run())
+        self._rooms.add(task)
+        task.add_done_callback(self._room_finished)
+
+    def _room_finished(self, task):
+        self._rooms.discard(task)
+        self.roomsFinished += 1
+
+
+class BattleClient:
+    """A simple client, for load tests: joins a server, and attacks with
+    the move the type chart says is best, after thinking for `think`
+    seconds each turn.
+
+    Returns the game_over message from play().
+    """
+
+    def __init__(
+        self,
+        host='127.0.0.1',
+        port=DEFAULT_PORT,
+        name=None,
+        think=0.0,
+        rating=DEFAULT_RATING,
+    ):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.think = think
+        self.rating = rating
+        self.turns = 0
+
+        # The parties, from the "start" message.
+        self.party = None
+        self.opponentParty = None
+
+    async def play(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=MAX_LINE)
+
+        try:
+            writer.write(encode_message({
+                'type': 'join',
+                'name': self.name,
+                'rating': self.rating,
+            }))
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return None
+
+                message = json.loads(line)
+                kind = message['type']
+
+                if kind == 'start':
+                    self.party = message['you']['party']
+                    self.opponentParty = message['opponent']['party']
+
+                elif kind == 'state':
+                    if self.think:
+                        await asyncio.sleep(self.think)
+                    writer.write(encode_message(self.choose_action(message)))
+                    self.turns += 1
+
+                elif kind == 'game_over':
+                    return message
+
+        finally:
+            writer.close()
+
+    def choose_action(self, state):
+        '''Returns the action message for a "state" message.'''
+        currentName = state['you']['current']
+        targetName = state['opponent']['current']
+
+        current = next(p for p in self.party if p['name'] == currentName)
+        target = next(p for p in self.opponentParty if p['name'] == targetName)
+
+        moveName, _, _ = max(
+            current['moves'],
+            key=lambda move: move[2] * multiplier(move[1], target['type']),
+        )
+        return {'type': 'action', 'turn': state['turn'], 'action': 'attack', 'move': moveName}
+
+
+async def load_test(
+    host='127.0.0.1',
+    port=DEFAULT_PORT,
+    sessions=1000,
+    think=0.0,
+    connectRate=None,
+    ratingSpread=200,
+    seed=0,
+):
+    """Plays `sessions` BattleClients (so sessions / 2 battles) against a
+    server at once, and returns a dict of statistics.
+
+    connectRate: new connections per second (default: all at once)
+    ratingSpread: the standard deviation of the clients' ratings (drawn,
+                  with the given seed, around DEFAULT_RATING)
+    """
+
+    start = time.perf_counter()
+    rng = random.Random(seed)
+    clients = [
+        BattleClient(
+            host, port, f"Load {index}", think,
+            round(rng.gauss(DEFAULT_RATING, ratingSpread)),
+        )
+        for index in range(sessions)
+    ]
+
+    async def play(index, client):
+        if connectRate:
+            await asyncio.sleep(index / connectRate)
+        try:
+            return await client.play()
+        except (ConnectionError, OSError):
+            return None
+
+    results = await asyncio.gather(*(play(index, client) for index, client in enumerate(clients)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'sessions': sessions,
+        'finished': sum(result is not None for result in results),
+        'seconds': elapsed,
+        'turns': sum(client.turns for client in clients) // 2,
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Hosts Pokemon battles over TCP.")
+    parser.add_argument('command', choices=('serve', 'loadtest'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--turn-timeout', type=float, default=30)
+    parser.add_argument('--sessions', type=int, default=1000)
+    parser.add_argument('--think', type=float, default=0.0)
+    parser.add_argument('--connect-rate', type=float, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        server = BattleServer(args.host, args.port, turnTimeout=args.turn_timeout)
+        print(f"Serving battles on {args.host}:{args.port}")
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    stats = asyncio.run(load_test(
+        args.host, args.port, args.sessions, args.think, args.connect_rate,
+    ))
+    print(
+        f"{stats['finished']}/{stats['sessions']} sessions finished in "
+        f"{stats['seconds']:.2f}s, {stats['turns'] / stats['seconds']:,.0f} turns/s"
+    )
+    return 0 if stats['finished'] == stats['sessions'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
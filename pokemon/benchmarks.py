@@ -0,0 +1,1153 @@
+"""
+Benchmarks for the battle engine and the tools built on top of it.
+
+Run from this directory:
+
+    python benchmarks.py            # runs every benchmark
+    python benchmarks.py engine     # runs only the named benchmark(s)
+
+"""
+
+import sys
+import time
+
+from pokemon import Player
+from pokemon_team import create_team
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Registers the decorated function as the benchmark with the given name."""
+
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+
+    return register
+
+
+def _make_players():
+    return Player("Player 1", create_team()), Player("Player 2", create_team())
+
+
+@benchmark('engine')
+def bench_engine(battles=20000):
+    """Headless battles and turns per second between two create_team()
+    lineups, with seeded speed ties and random choices.
+    """
+
+    import random
+
+    import engine
+    from engine import GreedyPolicy, RandomPolicy, run_battle, reset_player
+
+    player1, player2 = _make_players()
+
+    for label, p1Policy, p2Policy in (
+        ('greedy vs greedy', GreedyPolicy(), GreedyPolicy()),
+        ('random vs random', RandomPolicy(random.Random(1)), RandomPolicy(random.Random(2))),
+    ):
+        rng = random.Random(0)
+        start = time.perf_counter()
+        for _ in range(battles):
+            reset_player(player1)
+            reset_player(player2)
+            run_battle(player1, player2, p1Policy, p2Policy, rng=rng)
+        elapsed = time.perf_counter() - start
+
+        # Count the turns of the same battles again.
+        turns = 0
+        play_turn = engine.play_turn
+
+        def counted(*args, **kwargs):
+            nonlocal turns
+            turns += 1
+            return play_turn(*args, **kwargs)
+
+        engine.play_turn = counted
+        try:
+            p1Policy.reseed(random.Random(1))
+            p2Policy.reseed(random.Random(2))
+            rng = random.Random(0)
+            for _ in range(battles):
+                reset_player(player1)
+                reset_player(player2)
+                run_battle(player1, player2, p1Policy, p2Policy, rng=rng)
+        finally:
+            engine.play_turn = play_turn
+
+        print(f"engine ({label}): {battles / elapsed:,.0f} battles/s, "
+              f"{turns / elapsed:,.0f} turns/s ({turns / battles:.1f} turns per battle)")
+
+
+def _if_chain_multiplier(move, pokemon):
+    # The string-comparison chain that Move.get_multiplier_against() used
+    # before the type chart existed, kept here as the baseline.
+    if move.type == "grass":
+        if pokemon.type == "water" or pokemon.type == "ground":
+            return 2
+        elif pokemon.type == "fire" or pokemon.type == "grass":
+            return 0.5
+        else:
+            return 1
+
+    elif move.type == "fire":
+        if pokemon.type == "grass":
+            return 2
+        elif pokemon.type == "water" or pokemon.type == "fire":
+            return 0.5
+        else:
+            return 1
+
+    elif move.type == "water":
+        if pokemon.type == "fire" or pokemon.type == "ground":
+            return 2
+        elif pokemon.type == "grass" or pokemon.type == "water":
+            return 0.5
+        else:
+            return 1
+
+    elif move.type == "ground":
+        if pokemon.type == "fire" or pokemon.type == "electric":
+            return 2
+        elif pokemon.type == "grass":
+            return 0.5
+        else:
+            return 1
+
+    elif move.type == "electric":
+        if pokemon.type == "water":
+            return 2
+        elif pokemon.type == "grass" or pokemon.type == "electric":
+            return 0.5
+        elif pokemon.type == "ground":
+            return 0
+        else:
+            return 1
+
+    else:
+        return 1
+
+
+class _Typed:
+    def __init__(self, type):
+        self.type = type
+
+
+@benchmark('type_chart')
+def bench_type_chart(pairs=200000):
+    """Type multiplier lookups: the old if-chain against the type chart,
+    one at a time and batched.
+    """
+
+    import random
+
+    import type_chart
+    from pokemon import Move, Pokemon, INVALID_MOVE
+
+    typeNames = type_chart.TYPE_NAMES + ['normal']
+    moves = [Move(f"{name} move", 50, name) for name in typeNames]
+    defenders = [
+        Pokemon(f"{name} mon", 100, [INVALID_MOVE], name, 50) for name in typeNames
+    ]
+
+    for move in moves:
+        for defender in defenders:
+            assert move.get_multiplier_against(defender) == \
+                _if_chain_multiplier(move, defender)
+
+    rng = random.Random(0)
+    pairMoves = [rng.choice(moves) for _ in range(pairs)]
+    pairDefenders = [rng.choice(defenders) for _ in range(pairs)]
+
+    def timed(label, function):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        print(f"type_chart ({label}): {pairs / elapsed / 1e6:,.2f}M lookups/s")
+        return elapsed
+
+    # The if-chain only ever read plain .type attributes.
+    plainMoves = [_Typed(move.type) for move in pairMoves]
+    plainDefenders = [_Typed(pokemon.type) for pokemon in pairDefenders]
+
+    chain = timed('if-chain', lambda: [
+        _if_chain_multiplier(move, defender)
+        for move, defender in zip(plainMoves, plainDefenders)
+    ])
+    table = timed('get_multiplier_against', lambda: [
+        move.get_multiplier_against(defender)
+        for move, defender in zip(pairMoves, pairDefenders)
+    ])
+    batched = timed('multipliers()', lambda: type_chart.multipliers(
+        pairMoves, pairDefenders,
+    ))
+    print(f"type_chart: table lookup is {chain / table:.1f}x, "
+          f"batched list is {chain / batched:.1f}x the if-chain")
+
+    if type_chart.numpy is not None:
+        attackIds = type_chart.type_id_array([move.type for move in pairMoves])
+        defendIds = type_chart.type_id_array([pokemon.type for pokemon in pairDefenders])
+        vectorized = timed('multipliers_array()', lambda: type_chart.multipliers_array(
+            attackIds, defendIds,
+        ))
+        print(f"type_chart: NumPy batch is {chain / vectorized:.1f}x the if-chain")
+
+
+def _random_team(seed):
+    # A create_team()-shaped factory for made-up teams. Used through
+    # functools.partial so that it can be sent to worker processes.
+    import random
+
+    from pokemon import Pokemon, Move
+    from type_chart import TYPE_NAMES
+
+    rng = random.Random(seed)
+    types = TYPE_NAMES[1:]
+
+    team = []
+    for index in range(4):
+        moves = [
+            Move(f"Move {index}.{slot}", rng.randrange(30, 100, 5), rng.choice(types))
+            for slot in range(4)
+        ]
+        team.append(Pokemon(
+            f"Mon {seed}.{index}",
+            rng.randrange(120, 200),
+            moves,
+            rng.choice(types),
+            rng.randrange(30, 120),
+        ))
+
+    return team
+
+
+@benchmark('tournament')
+def bench_tournament(entrants=100, bestOf=3):
+    """Round-robin tournament wall time with one worker and with one worker
+    per CPU, with random play, checking that every run gives the same table.
+    """
+
+    import os
+    from functools import partial
+
+    from engine import RandomPolicy
+    from tournament import run_tournament
+
+    teams = {f"Team {seed}": partial(_random_team, seed) for seed in range(entrants)}
+    matches = entrants * (entrants - 1) // 2
+    tables = set()
+
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        standings = run_tournament(
+            teams, bestOf=bestOf, policy=RandomPolicy, workers=workers, seed=0,
+        )
+        elapsed = time.perf_counter() - start
+
+        tables.add(tuple(
+            (s.name, s.wins, s.losses, s.draws, s.gamesWon, s.gamesLost) for s in standings
+        ))
+        print(f"tournament ({entrants} entrants, {workers} workers): "
+              f"{elapsed:.2f}s, {matches / elapsed:,.0f} matches/s")
+
+    print(f"tournament: {'identical' if len(tables) == 1 else 'DIFFERENT'} "
+          f"results with every worker count")
+
+
+@benchmark('team_builder')
+def bench_team_builder(generations=10, populationSize=24, battles=10):
+    """Genetic-algorithm team search time with one worker, two worker
+    processes and (if more) one per CPU, how many fitness evaluations the
+    cache saves, and whether every worker count finds the same best team.
+    """
+
+    import os
+
+    import pokemon_team
+    from team_builder import evolve_team, random_field
+
+    opponents = dict(random_field(7), create_team=pokemon_team.create_team)
+    bests = set()
+
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        result = evolve_team(
+            opponents,
+            generations=generations,
+            populationSize=populationSize,
+            battles=battles,
+            workers=workers,
+            seed=0,
+        )
+        elapsed = time.perf_counter() - start
+
+        bests.add(result.best)
+        lookups = result.evaluations + result.cacheHits
+        print(f"team_builder ({workers} workers): {elapsed:.2f}s, "
+              f"{result.evaluations / elapsed:.0f} genomes/s, "
+              f"{result.cacheHits}/{lookups} fitness lookups cached, "
+              f"best fitness {result.fitness:.3f}")
+
+    print(f"team_builder: {'identical' if len(bests) == 1 else 'DIFFERENT'} "
+          f"best team with every worker count")
+
+
+@benchmark('coverage')
+def bench_coverage(sizes=(12, 48, 96), top=10):
+    """Type-coverage ranking time for pools of made-up Pokemon with six
+    moves each, pruned and (for the smallest pool) exhaustive.
+    """
+
+    import random
+
+    from pokemon import Pokemon, Move
+    from type_chart import TYPE_NAMES
+    from coverage import rank_teams
+
+    rng = random.Random(0)
+    types = TYPE_NAMES[1:]
+
+    def make_pool(size):
+        return [
+            Pokemon(
+                f"Pokemon {index}",
+                rng.randrange(100, 200),
+                [
+                    Move(f"Move {index}.{slot}", rng.randrange(30, 100, 5), rng.choice(types))
+                    for slot in range(6)
+                ],
+                rng.choice(types),
+                rng.randrange(20, 120),
+            )
+            for index in range(size)
+        ]
+
+    for size in sizes:
+        pool = make_pool(size)
+
+        start = time.perf_counter()
+        ranked = rank_teams(pool, top=top)
+        elapsed = time.perf_counter() - start
+        print(f"coverage ({size} Pokemon, pruned): {elapsed * 1000:.1f}ms")
+
+        if size == min(sizes):
+            start = time.perf_counter()
+            exhaustive = rank_teams(pool, top=top, prune=False)
+            fullElapsed = time.perf_counter() - start
+            print(f"coverage ({size} Pokemon, exhaustive): {fullElapsed * 1000:.1f}ms, "
+                  f"same best score: {ranked[0].score == exhaustive[0].score}")
+
+
+@benchmark('matchup')
+def bench_matchup(battles=20000, lookups=200000):
+    """Best-move lookups from a MatchupCache against working the best move
+    out with engine.best_move(), and greedy battles per second with the
+    cache and with GreedyPolicy's own memory of best moves (checking that
+    they play out the same).
+    """
+
+    import random
+
+    from engine import GreedyPolicy, best_move, run_battle, reset_player
+    from matchup import MatchupCache
+
+    player1, player2 = _make_players()
+
+    start = time.perf_counter()
+    matchups = MatchupCache(player1.pokemon_party, player2.pokemon_party)
+    built = time.perf_counter() - start
+    print(f"matchup (cache for {len(matchups)} pairs built in {built * 1000:.2f}ms)")
+
+    pairs = [
+        (attacker, defender)
+        for attacker in player1.pokemon_party for defender in player2.pokemon_party
+    ] * (lookups // 16)
+
+    start = time.perf_counter()
+    for attacker, defender in pairs:
+        best_move(attacker, defender)
+    computed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lookup = matchups.best_move
+    for attacker, defender in pairs:
+        lookup(attacker, defender)
+    cached = time.perf_counter() - start
+
+    print(f"matchup (best move): computed {computed / len(pairs) * 1e9:.0f}ns, "
+          f"cached {cached / len(pairs) * 1e9:.0f}ns")
+
+    winners = {}
+    for label, policy in (('remembered', GreedyPolicy()), ('cached', GreedyPolicy(matchups))):
+        winners[label] = []
+        start = time.perf_counter()
+        for seed in range(battles):
+            reset_player(player1)
+            reset_player(player2)
+            result = run_battle(player1, player2, policy, policy, rng=random.Random(seed))
+            winners[label].append(result.winner.name if result.winner else None)
+        elapsed = time.perf_counter() - start
+
+        print(f"matchup (greedy vs greedy, {label}): {battles / elapsed:,.0f} battles/s")
+
+    print(f"matchup: {'identical' if winners['remembered'] == winners['cached'] else 'DIFFERENT'} "
+          f"results")
+
+
+@benchmark('damage_matrix')
+def bench_damage_matrix(pairs=5000):
+    """Team-vs-team damage matrices for many pairs of teams: nested Python
+    loops over get_multiplier_against(), against one damage_matrices() call
+    (from Pokemon objects, and from parties encoded beforehand).
+    """
+
+    from batched import encode_parties
+    from damage_matrix import damage_matrices
+
+    teams = [_random_team(seed) for seed in range(200)]
+    attackers = [teams[index % 200] for index in range(pairs)]
+    defenders = [teams[index * 7 % 200] for index in range(pairs)]
+
+    start = time.perf_counter()
+    looped = [
+        [
+            [[move.power * move.get_multiplier_against(defender) for defender in party2]
+             for move in attacker.moves]
+            for attacker in party1
+        ]
+        for party1, party2 in zip(attackers, defenders)
+    ]
+    loopElapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    damage, _ = damage_matrices(attackers, defenders)
+    elapsed = time.perf_counter() - start
+
+    encodedAttackers = encode_parties(attackers)
+    encodedDefenders = encode_parties(defenders)
+    start = time.perf_counter()
+    damage_matrices(encodedAttackers, encodedDefenders)
+    encodedElapsed = time.perf_counter() - start
+
+    assert damage.tolist() == looped
+    print(f"damage_matrix ({pairs} pairs, nested loops): {loopElapsed * 1000:.1f}ms")
+    print(f"damage_matrix ({pairs} pairs, vectorized): {elapsed * 1000:.1f}ms, "
+          f"{loopElapsed / elapsed:.1f}x faster")
+    print(f"damage_matrix ({pairs} pairs, vectorized, pre-encoded): "
+          f"{encodedElapsed * 1000:.1f}ms, {loopElapsed / encodedElapsed:.0f}x faster")
+
+
+@benchmark('battle_server')
+def bench_battle_server(busySessions=1000, idleSessions=4000, think=0.5):
+    """Turns per second through a BattleServer, with its load-test clients
+    in the same process: clients that answer at once, then idle-heavy
+    clients that think before every action.
+    """
+
+    import asyncio
+    import resource
+    from battle_server import BattleServer, load_test
+
+    async def run(sessions, thinkTime):
+        server = BattleServer(port=0, seed=1)
+        await server.start()
+        stats = await load_test(
+            port=server.port, sessions=sessions, think=thinkTime, ratingSpread=0,
+        )
+        await server.close()
+        assert stats['finished'] == sessions == server.roomsFinished * 2
+        return stats
+
+    for sessions, thinkTime in ((busySessions, 0.0), (idleSessions, think)):
+        stats = asyncio.run(run(sessions, thinkTime))
+        # Every turn waits at least `think` seconds.
+        thinking = stats['turns'] / (sessions // 2) * thinkTime
+        print(f"battle_server ({sessions} sessions, {thinkTime}s think): "
+              f"{stats['seconds']:.2f}s ({thinking:.1f}s thinking), "
+              f"{stats['turns'] / stats['seconds']:,.0f} turns/s")
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"battle_server: peak RSS {peak:.0f}MB (server and clients)")
+
+
+@benchmark('matchmaking')
+def bench_matchmaking(entrants=50000, interval=0.1):
+    """Pairing latency in a Matchmaker with tens of thousands of entrants
+    queued: all of them joining at once with windows that start at 0 (so
+    nobody is paired on joining), and then arriving in equal batches every
+    interval over two seconds.
+    """
+
+    import random
+    import asyncio
+    import itertools
+    from matchmaking import Matchmaker
+
+    team = create_team()
+    rng = random.Random(1)
+    ratings = [rng.gauss(1500, 300) for _ in range(entrants)]
+
+    async def run(batches, window):
+        matchmaker = Matchmaker(window=window, interval=interval)
+        queued = []
+        joinElapsed = sweepElapsed = 0.0
+        sweepTimes = []
+        peak = 0
+        batch = entrants // batches
+
+        for tick in itertools.count():
+            if tick < batches:
+                start = time.perf_counter()
+                for index in range(tick * batch, (tick + 1) * batch):
+                    queued.append(matchmaker.join(f"Entrant {index}", team, ratings[index]))
+                joinElapsed += time.perf_counter() - start
+            elif len(matchmaker) < 2:
+                break
+
+            await asyncio.sleep(interval)
+
+            peak = max(peak, len(matchmaker))
+            start = time.perf_counter()
+            matchmaker.sweep()
+            sweepTimes.append(time.perf_counter() - start)
+
+        await matchmaker.close()
+        return queued, joinElapsed, sweepTimes, peak
+
+    for label, batches, window in (('burst', 1, 0), ('stream', 20, 5)):
+        queued, joinElapsed, sweepTimes, peak = asyncio.run(run(batches, window))
+        latencies = sorted(entrant.latency for entrant in queued if entrant.latency is not None)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        print(f"matchmaking ({label}, {entrants} entrants, peak queue {peak}): "
+              f"join {joinElapsed / entrants * 1e6:.1f}us each (team check included), "
+              f"sweep {max(sweepTimes) * 1000:.1f}ms at most")
+        print(f"matchmaking ({label}): {len(latencies)} paired, latency mean "
+              f"{sum(latencies) / len(latencies):.2f}s, p50 {percentile(0.5):.2f}s, "
+              f"p99 {percentile(0.99):.2f}s, max {latencies[-1]:.2f}s")
+
+
+def _battle_results(count, players, seed):
+    # Yields (winner, loser, draw) results between randomly paired players,
+    # who win according to a hidden strength.
+    import random
+
+    rng = random.Random(seed)
+    names = [f"Player {index}" for index in range(players)]
+    strengths = [rng.gauss(0, 1) for _ in range(players)]
+
+    for _ in range(count):
+        i = rng.randrange(players)
+        j = rng.randrange(players)
+        if i == j:
+            j = (j + 1) % players
+
+        roll = rng.random()
+        if roll < 0.05:
+            yield names[i], names[j], True
+        elif roll < 0.05 + 0.95 / (1 + 10 ** (strengths[j] - strengths[i])):
+            yield names[i], names[j], False
+        else:
+            yield names[j], names[i], False
+
+
+def _textbook_glicko2(results, tau=0.5):
+    # Glicko-2 as the paper describes one rating period: every player's
+    # results are kept until the period ends, then re-read. The baseline for
+    # ratings.Glicko2Ratings, which keeps running sums instead.
+    import math
+    from ratings import DEFAULT_RATING, DEFAULT_RD, DEFAULT_VOLATILITY, GLICKO2_SCALE
+    from ratings import _new_volatility
+
+    games = {}
+    for winner, loser, draw in results:
+        score = 0.5 if draw else 1.0
+        games.setdefault(winner, []).append((loser, score))
+        games.setdefault(loser, []).append((winner, 1 - score))
+
+    phi = DEFAULT_RD / GLICKO2_SCALE
+    g = 1 / math.sqrt(1 + 3 * phi * phi / (math.pi * math.pi))
+    expected = 0.5
+    updated = {}
+
+    # Everyone starts the period unrated, so every opponent looks the same.
+    for name, played in games.items():
+        variance = 1 / sum(g * g * expected * (1 - expected) for _ in played)
+        scoreSum = sum(g * (score - expected) for _, score in played)
+        volatility = _new_volatility(DEFAULT_VOLATILITY, phi, variance, variance * scoreSum, tau)
+        phiStar = math.sqrt(phi * phi + volatility * volatility)
+        newPhi = min(1 / math.sqrt(1 / (phiStar * phiStar) + 1 / variance), phi)
+        updated[name] = DEFAULT_RATING + GLICKO2_SCALE * newPhi * newPhi * scoreSum
+
+    return updated
+
+
+@benchmark('ratings')
+def bench_ratings(results=1000000, players=10000, periodLength=10000, periodResults=200000):
+    """Rating updates per second from a stream of battle results (Elo, and
+    Glicko-2 in rating periods), saving, loading and leaderboards, and the
+    peak memory of one long Glicko-2 period: running sums per player against
+    keeping every result until the period ends.
+    """
+
+    import os
+    import tempfile
+    import tracemalloc
+    from ratings import Ratings, EloRatings, Glicko2Ratings
+
+    stream = list(_battle_results(results, players, seed=1))
+
+    for label, ratings in (
+        ('Elo', EloRatings()),
+        (f'Glicko-2, periods of {periodLength}', Glicko2Ratings(periodLength=periodLength)),
+    ):
+        start = time.perf_counter()
+        ratings.record_many(stream)
+        elapsed = time.perf_counter() - start
+        print(f"ratings ({label}): {results / elapsed:,.0f} results/s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ratings.bin')
+
+        start = time.perf_counter()
+        ratings.save(path)
+        saveElapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = Ratings.load(path)
+        loadElapsed = time.perf_counter() - start
+
+        size = os.path.getsize(path)
+
+    assert [(p.name, p.rating, p.rd) for p in loaded] == \
+        [(p.name, p.rating, p.rd) for p in ratings]
+    print(f"ratings: {players} players saved in {size / 1024:.0f}KB "
+          f"({size / players:.0f} bytes each), save {saveElapsed * 1000:.1f}ms, "
+          f"load {loadElapsed * 1000:.1f}ms")
+
+    start = time.perf_counter()
+    leaders = ratings.leaderboard(10)
+    elapsed = time.perf_counter() - start
+    print(f"ratings: top 10 of {players} in {elapsed * 1000:.2f}ms, "
+          f"leader {leaders[0].name} at {leaders[0].rating:.0f}")
+
+    def peak(function):
+        tracemalloc.start()
+        value = function()
+        _, peakSize = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return value, peakSize
+
+    def running_sums():
+        ratings = Glicko2Ratings()
+        ratings.record_many(_battle_results(periodResults, players, seed=2))
+        ratings.end_period()
+        return {player.name: player.rating for player in ratings}
+
+    summed, summedPeak = peak(running_sums)
+    textbook, textbookPeak = peak(lambda: _textbook_glicko2(
+        _battle_results(periodResults, players, seed=2),
+    ))
+
+    assert all(abs(summed[name] - rating) < 1e-6 for name, rating in textbook.items())
+    print(f"ratings (one period of {periodResults} results): peak "
+          f"{summedPeak / 2**20:.1f}MB with running sums, "
+          f"{textbookPeak / 2**20:.1f}MB keeping every result")
+
+
+@benchmark('batched')
+def bench_batched(battles=100000):
+    """Battle turns per second in the NumPy struct-of-arrays simulator."""
+
+    import numpy
+
+    from batched import BattleBatch
+
+    teams1 = [_random_team(seed) for seed in range(100)]
+    teams2 = [_random_team(seed) for seed in range(100, 200)]
+    parties1 = [teams1[index % 100] for index in range(battles)]
+    parties2 = [teams2[index * 7 % 100] for index in range(battles)]
+
+    rng = numpy.random.default_rng(0)
+
+    for label, choose_actions in (
+        ('greedy', BattleBatch.greedy_actions),
+        ('random', lambda batch: batch.random_actions(rng)),
+    ):
+        batch = BattleBatch(parties1, parties2)
+
+        start = time.perf_counter()
+        turns = batch.run(choose_actions, rng)
+        elapsed = time.perf_counter() - start
+
+        print(f"batched ({label}, {battles:,} battles): "
+              f"{turns / elapsed / 1e6:,.2f}M turns/s, "
+              f"{battles / elapsed:,.0f} battles/s")
+
+
+def _slot_values(obj):
+    values = {}
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get('__slots__', ()):
+            if hasattr(obj, name):
+                values[name] = getattr(obj, name)
+    return values
+
+
+def _dict_backed_copy(obj, plainClasses, memo):
+    # Copies an object graph built from slotted classes into look-alike
+    # objects that keep their attributes in a __dict__, the way every class
+    # did before __slots__ were added.
+    if id(obj) in memo:
+        return memo[id(obj)]
+
+    if isinstance(obj, tuple):
+        return tuple(_dict_backed_copy(item, plainClasses, memo) for item in obj)
+
+    if isinstance(obj, list):
+        copy = []
+        memo[id(obj)] = copy
+        copy.extend(_dict_backed_copy(item, plainClasses, memo) for item in obj)
+        return copy
+
+    if not hasattr(type(obj), '__slots__'):
+        return obj
+
+    Plain = plainClasses.setdefault(type(obj), type(type(obj).__name__, (), {}))
+    copy = Plain()
+    memo[id(obj)] = copy
+    for name, value in _slot_values(obj).items():
+        setattr(copy, name, _dict_backed_copy(value, plainClasses, memo))
+    return copy
+
+
+@benchmark('memory')
+def bench_memory(states=2000):
+    """Bytes per battle state (two Players with create_team() parties, plus
+    one turn's Actions and TurnResult) with __slots__ and with per-instance
+    __dict__s.
+    """
+
+    import tracemalloc
+
+    from pokemon_driver import AttackAction, SwitchAction, TurnResult
+
+    def build_state():
+        player1, player2 = _make_players()
+        return (
+            player1,
+            player2,
+            AttackAction(player1, player1.current_pokemon.moves[0].name, player2),
+            SwitchAction(player2, player2.pokemon_party[1].name),
+            TurnResult(gameOver=False),
+        )
+
+    def measure(build):
+        tracemalloc.start()
+        kept = [build() for _ in range(states)]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del kept
+        return size / states
+
+    plainClasses = {}
+    slotted = measure(build_state)
+    plain = measure(lambda: _dict_backed_copy(build_state(), plainClasses, {}))
+
+    print(f"memory (with __dict__): {plain:,.0f} bytes per battle state")
+    print(f"memory (with __slots__): {slotted:,.0f} bytes per battle state "
+          f"({1 - slotted / plain:.0%} smaller)")
+
+
+@benchmark('snapshot')
+def bench_snapshot(branches=20000):
+    """Branching from a battle position: snapshot/restore against
+    copy.deepcopy() of both Players.
+    """
+
+    import copy
+    import random
+
+    from snapshot import take_snapshot, restore_snapshot
+
+    player1, player2 = _make_players()
+    player1.current_pokemon.take_damage(30)
+    rng = random.Random(0)
+
+    start = time.perf_counter()
+    for _ in range(branches // 10):
+        copy.deepcopy((player1, player2))
+    deepcopied = (time.perf_counter() - start) / (branches // 10)
+
+    start = time.perf_counter()
+    for _ in range(branches):
+        snapshot = take_snapshot(player1, player2)
+        restore_snapshot(player1, player2, snapshot)
+    restored = (time.perf_counter() - start) / branches
+
+    start = time.perf_counter()
+    for _ in range(branches):
+        snapshot = take_snapshot(player1, player2, rng)
+        restore_snapshot(player1, player2, snapshot, rng)
+    restoredWithRng = (time.perf_counter() - start) / branches
+
+    print(f"snapshot (deepcopy): {1 / deepcopied:,.0f} branches/s")
+    print(f"snapshot (take + restore): {1 / restored:,.0f} branches/s "
+          f"({deepcopied / restored:.0f}x deepcopy)")
+    print(f"snapshot (take + restore, with rng state): "
+          f"{1 / restoredWithRng:,.0f} branches/s")
+
+
+@benchmark('expectimax')
+def bench_expectimax(battles=200, budgets=(5, 20)):
+    """Expectimax search speed and strength against GreedyPolicy for a few
+    thinking-time budgets, from the seat where GreedyPolicy plays itself as
+    the baseline.
+    """
+
+    import random
+
+    from engine import GreedyPolicy, Policy, run_battle
+    from expectimax import ExpectimaxPolicy
+
+    class Measured(Policy):
+        def __init__(self, policy):
+            self.policy = policy
+            self.decisions = 0
+            self.depth = 0
+            self.nodes = 0
+            self.seconds = 0
+
+        def choose_action(self, player, opponent):
+            start = time.perf_counter()
+            action = self.policy.choose_action(player, opponent)
+            self.seconds += time.perf_counter() - start
+            self.decisions += 1
+            self.depth += self.policy.depth
+            self.nodes += self.policy.nodes
+            return action
+
+        def choose_switch(self, player, opponent):
+            return self.policy.choose_switch(player, opponent)
+
+    def win_rate(make_policy):
+        wins = 0
+        for seed in range(battles):
+            player1 = Player("Player 1", _random_team(seed))
+            player2 = Player("Player 2", _random_team(seed + 1000))
+            result = run_battle(
+                player1, player2, make_policy(), GreedyPolicy(), rng=random.Random(seed),
+            )
+            wins += result.winner is player1
+        return wins / battles
+
+    print(f"expectimax (greedy vs greedy): {win_rate(GreedyPolicy):.0%} wins")
+
+    for budgetMs in budgets:
+        measured = []
+
+        def make_policy():
+            measured.append(Measured(ExpectimaxPolicy(budgetMs=budgetMs)))
+            return measured[-1]
+
+        rate = win_rate(make_policy)
+        decisions = sum(policy.decisions for policy in measured)
+        depth = sum(policy.depth for policy in measured) / decisions
+        nodes = sum(policy.nodes for policy in measured)
+        seconds = sum(policy.seconds for policy in measured)
+
+        print(f"expectimax ({budgetMs}ms vs greedy): {rate:.0%} wins, "
+              f"average depth {depth:.1f}, {nodes / seconds:,.0f} turns searched/s")
+
+
+@benchmark('mcts')
+def bench_mcts(battles=200, thinkTimes=(5, 20)):
+    """Monte Carlo Tree Search playout speed, and strength against
+    GreedyPolicy for a few thinking times, in one process and with root
+    parallel search in two worker processes (and one per CPU, if more).
+    """
+
+    import os
+    import random
+
+    from engine import GreedyPolicy, run_battle
+    from mcts import MCTSPolicy, search
+
+    player1, player2 = _make_players()
+    start = time.perf_counter()
+    _, playouts = search(player1, player2, 1000, seed=0)
+    elapsed = time.perf_counter() - start
+    print(f"mcts (1 process): {playouts / elapsed:,.0f} playouts/s")
+
+    wins = 0
+    for seed in range(battles):
+        player1 = Player("Player 1", _random_team(seed))
+        player2 = Player("Player 2", _random_team(seed + 1000))
+        result = run_battle(
+            player1, player2, GreedyPolicy(), GreedyPolicy(), rng=random.Random(seed),
+        )
+        wins += result.winner is player1
+    print(f"mcts (greedy vs greedy): {wins / battles:.0%} wins")
+
+    workerCounts = sorted({1, 2, os.cpu_count() or 1})
+
+    for workers in workerCounts:
+        for thinkMs in thinkTimes:
+            with MCTSPolicy(thinkMs=thinkMs, workers=workers, seed=0) as policy:
+                wins = 0
+                playouts = decisions = 0
+
+                for seed in range(battles):
+                    player1 = Player("Player 1", _random_team(seed))
+                    player2 = Player("Player 2", _random_team(seed + 1000))
+
+                    # Count the playouts of every decision.
+                    choose_action = policy.choose_action
+
+                    def counted(player, opponent):
+                        nonlocal playouts, decisions
+                        action = choose_action(player, opponent)
+                        playouts += policy.playouts
+                        decisions += 1
+                        return action
+
+                    policy.choose_action = counted
+                    result = run_battle(
+                        player1, player2, policy, GreedyPolicy(), rng=random.Random(seed),
+                    )
+                    del policy.choose_action
+                    wins += result.winner is player1
+
+            print(f"mcts ({workers} worker(s), {thinkMs}ms vs greedy): "
+                  f"{wins / battles:.0%} wins, "
+                  f"{playouts / decisions:,.0f} playouts per decision")
+
+
+@benchmark('events')
+def bench_events(battles=5000):
+    """Headless battles per second with each kind of event sink, compared
+    with print()ing every line of narration like the game used to.
+    """
+
+    import os
+    from contextlib import redirect_stdout
+
+    from engine import RandomPolicy, run_battle, reset_player
+    from events import NullSink, TextSink, CollectingSink
+
+    player1, player2 = _make_players()
+    policy = RandomPolicy()
+
+    class PrintSink(TextSink):
+        # One print() per line.
+        def emit(self, event):
+            text = event.text()
+            if text is not None:
+                print(text)
+
+    with open(os.devnull, 'w') as devnull:
+        for label, make_sink in (
+            ('no sink', lambda: None),
+            ('NullSink', NullSink),
+            ('CollectingSink', CollectingSink),
+            ('TextSink', lambda: TextSink(devnull)),
+            ('print() per line', PrintSink),
+        ):
+            start = time.perf_counter()
+            with redirect_stdout(devnull):
+                for _ in range(battles):
+                    reset_player(player1)
+                    reset_player(player2)
+                    run_battle(player1, player2, policy, policy, sink=make_sink())
+            elapsed = time.perf_counter() - start
+
+            print(f"events ({label}): {battles / elapsed:,.0f} battles/s")
+
+
+@benchmark('replay')
+def bench_replay(battles=2000):
+    """Replay size, and the speed of recording, streaming and replaying
+    random battles.
+    """
+
+    import io
+    import random
+
+    from engine import RandomPolicy
+    from replay import record_battle, write_replay, read_archive, Replayer
+
+    archive = io.BytesIO()
+    turns = 0
+
+    start = time.perf_counter()
+    for seed in range(battles):
+        player1, player2 = _make_players()
+        replay, _ = record_battle(
+            player1,
+            player2,
+            RandomPolicy(random.Random(seed)),
+            RandomPolicy(random.Random(-seed - 1)),
+            seed=seed,
+        )
+        write_replay(archive, replay)
+        turns += len(replay.turns)
+    elapsed = time.perf_counter() - start
+
+    size = archive.tell()
+    print(f"replay (record): {battles / elapsed:,.0f} battles/s, "
+          f"{size / battles:,.0f} bytes per battle, {turns / battles:.1f} turns per battle")
+
+    archive.seek(0)
+    start = time.perf_counter()
+    replays = list(read_archive(archive))
+    elapsed = time.perf_counter() - start
+    print(f"replay (stream archive): {battles / elapsed:,.0f} replays/s")
+
+    start = time.perf_counter()
+    for replay in replays:
+        Replayer(replay).run()
+    elapsed = time.perf_counter() - start
+    print(f"replay (replay): {turns / elapsed:,.0f} turns/s")
+
+    longest = max(replays, key=lambda replay: len(replay.turns))
+    replayer = Replayer(longest, keyframeInterval=8)
+    replayer.run()
+
+    seeks = 10000
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(seeks):
+        replayer.seek(rng.randrange(len(longest.turns) + 1))
+    elapsed = time.perf_counter() - start
+    print(f"replay (seek in a {len(longest.turns)}-turn battle): "
+          f"{elapsed / seeks * 1e6:,.0f}us per seek")
+
+
+@benchmark('checker')
+def bench_checker(runs=50):
+    """Compatibility checking time, with and without a cached verdict."""
+
+    import tempfile
+
+    import compatibility_checker
+
+    with tempfile.TemporaryDirectory() as cacheDir:
+        start = time.perf_counter()
+        for _ in range(runs):
+            compatibility_checker.run_checks(useCache=False)
+        unchecked = (time.perf_counter() - start) / runs
+
+        compatibility_checker.run_checks(cacheDir=cacheDir)
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            compatibility_checker.run_checks(cacheDir=cacheDir)
+        cached = (time.perf_counter() - start) / runs
+
+    print(f"checker (full check): {unchecked * 1000:.2f}ms")
+    print(f"checker (cached verdict): {cached * 1000:.2f}ms, "
+          f"{unchecked / cached:.0f}x faster")
+
+
+@benchmark('bulk_check')
+def bench_bulk_check(submissions=8):
+    """Submissions checked per second by bulk_check, without the verdict
+    cache, with one checker process at a time and with one per CPU; and
+    broken submissions rejected per second, with and without the static
+    check.
+    """
+
+    import os
+    import shutil
+    import tempfile
+
+    from bulk_check import check_submissions
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with tempfile.TemporaryDirectory() as root:
+        paths = []
+        for index in range(submissions):
+            path = os.path.join(root, f"submission{index}")
+            os.mkdir(path)
+            for name in ('pokemon.py', 'pokemon_team.py', 'type_chart.py'):
+                shutil.copy(os.path.join(here, name), path)
+            paths.append(path)
+
+        for workers in sorted({1, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            reports = check_submissions(paths, workers=workers, useCache=False)
+            elapsed = time.perf_counter() - start
+
+            assert all(report.passed for report in reports), reports
+            print(f"bulk_check ({workers} workers): "
+                  f"{submissions / elapsed:.1f} submissions/s")
+
+        # The same submissions, broken so that the static check rejects them.
+        for path in paths:
+            pokemonPath = os.path.join(path, 'pokemon.py')
+            with open(pokemonPath) as file:
+                source = file.read()
+            with open(pokemonPath, 'w') as file:
+                file.write(source.replace('def is_alive(self)', 'def is_alive(self, other)'))
+
+        for static in (False, True):
+            start = time.perf_counter()
+            reports = check_submissions(paths, workers=1, useCache=False, static=static)
+            elapsed = time.perf_counter() - start
+
+            assert not any(report.passed for report in reports), reports
+            print(f"bulk_check (broken, {'static check' if static else 'full check only'}): "
+                  f"{submissions / elapsed:.1f} submissions/s")
+
+
+@benchmark('startup')
+def bench_startup(runs=10):
+    """Import time of the modules that short-lived battle workers start
+    with, each measured in a fresh interpreter with -X importtime.
+    """
+
+    import os
+    import subprocess
+    import statistics
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    for moduleName in ('compatibility_checker', 'pokemon_driver', 'engine'):
+        times = []
+        for _ in range(runs):
+            completed = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', f"import {moduleName}"],
+                cwd=here,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            # The last line is the module itself: "import time: self | cumulative | name".
+            cumulative = completed.stderr.strip().splitlines()[-1].split('|')[1]
+            times.append(int(cumulative) / 1000)
+
+        print(f"startup (import {moduleName}): {statistics.median(times):.1f}ms")
+
+
+def main(argv):
+    names = argv or list(BENCHMARKS)
+
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'! Choose from: {', '.join(BENCHMARKS)}")
+            return 1
+
+    for name in names:
+        BENCHMARKS[name]()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
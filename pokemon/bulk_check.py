@@ -0,0 +1,225 @@
+"""
+Bulk compatibility checking of many team submissions.
+
+Each submission is a directory holding a pokemon.py (and usually a
+pokemon_team.py). Its source is first read by
+compatibility_checker.static_check(), which rejects submissions with
+structural problems (missing classes, methods with the wrong number of
+arguments, ...) without running any of their code. Every other submission
+is checked by compatibility_checker.py in a process of its own, so
+submissions can't interfere with each other or with the batch: a
+create_team() that loops forever is killed when it runs out of time (or CPU
+time, which the checker limits with its --cpu-limit option), and the rest of
+the batch carries on. Up to `workers` submissions are checked at once.
+
+Run from this directory:
+
+    python bulk_check.py [-j WORKERS] [--timeout SECONDS] [--cpu-limit SECONDS]
+                         [--no-static] [-o REPORT.json] DIRECTORY...
+
+The report is a JSON object with one entry per submission (its status, and
+the errors found by check_module() / check_class()) and a summary.
+
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import compatibility_checker
+
+
+CHECKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'compatibility_checker.py')
+
+# Submission statuses.
+PASSED = 'passed'
+FAILED = 'failed'
+TIMEOUT = 'timeout'
+CRASHED = 'crashed'
+
+# Exit statuses of a checker killed for using too much CPU time.
+_KILLED = {
+    -getattr(signal, name) for name in ('SIGXCPU', 'SIGKILL') if hasattr(signal, name)
+}
+
+
+class SubmissionReport:
+    """The result of checking one submission.
+
+    status: PASSED, FAILED (the checker found errors), TIMEOUT (the check
+            ran out of time or CPU time) or CRASHED (the checker died without
+            a verdict)
+    errors: the errors found, as messages
+    """
+
+    def __init__(self, path, status, errors, seconds):
+        self.path = path
+        self.status = status
+        self.errors = errors
+        self.seconds = seconds
+
+    @property
+    def passed(self):
+        return self.status == PASSED
+
+    def to_json(self):
+        return {
+            'path': self.path,
+            'status': self.status,
+            'passed': self.passed,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+        }
+
+    def __repr__(self):
+        return f"SubmissionReport({self.path!r}, {self.status}, errors={len(self.errors)})"
+
+
+def check_submission(path, timeout=10, cpuLimit=None, useCache=True, static=True):
+    """Checks one submission directory in a new process, and returns a
+    SubmissionReport.
+
+    timeout: wall-clock seconds before the check is killed
+    cpuLimit: CPU seconds before the check is killed (where the resource
+              module is available; default: the timeout)
+    static: if True, the submission's source is checked first, and the
+            submission is failed without starting a process if that finds
+            errors
+    """
+
+    if cpuLimit is None:
+        cpuLimit = timeout
+
+    start = time.perf_counter()
+
+    if static:
+        errors = compatibility_checker.static_check(path, report=False)
+        if errors:
+            return SubmissionReport(path, FAILED, errors, time.perf_counter() - start)
+
+    # The checker limits its own CPU time: setting the limit in a preexec_fn
+    # isn't safe from the worker threads of check_submissions(). It runs in
+    # the submission directory, so it's given that directory's absolute path
+    # (a relative one would be resolved against it again).
+    command = [
+        sys.executable, CHECKER, '--json', f'--cpu-limit={cpuLimit}', os.path.abspath(path),
+    ]
+    if not useCache:
+        command.append('--no-cache')
+
+    try:
+        completed = subprocess.run(
+            command,
+            cwd=path,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return SubmissionReport(
+            path,
+            TIMEOUT,
+            [f"Checking took longer than {timeout} seconds!"],
+            time.perf_counter() - start,
+        )
+    except OSError as e:
+        return SubmissionReport(
+            path, CRASHED, [f"Couldn't run the checker: {e}"], time.perf_counter() - start,
+        )
+
+    seconds = time.perf_counter() - start
+
+    try:
+        verdict = json.loads(completed.stdout.decode('utf-8').strip().splitlines()[-1])
+        return SubmissionReport(
+            path, PASSED if verdict['passed'] else FAILED, verdict['errors'], seconds,
+        )
+    except (ValueError, IndexError, KeyError, TypeError):
+        pass
+
+    # No verdict: the checker was killed, or crashed.
+    if completed.returncode in _KILLED:
+        return SubmissionReport(
+            path, TIMEOUT, [f"Checking used more than {cpuLimit} seconds of CPU time!"], seconds,
+        )
+
+    stderr = completed.stderr.decode('utf-8', 'replace').strip()
+    message = stderr.splitlines()[-1] if stderr else "no output"
+    return SubmissionReport(
+        path,
+        CRASHED,
+        [f"The checker exited with status {completed.returncode}: {message}"],
+        seconds,
+    )
+
+
+def check_submissions(paths, workers=None, timeout=10, cpuLimit=None, useCache=True,
+                      static=True):
+    """Checks every given submission directory, running up to `workers`
+    checker processes at a time (default: one per CPU).
+
+    Returns a list of SubmissionReports, in the order of the paths.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # The threads only wait for their checker processes.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            lambda path: check_submission(path, timeout, cpuLimit, useCache, static),
+            paths,
+        ))
+
+
+def make_report(reports):
+    """Returns the JSON-ready report for a list of SubmissionReports."""
+
+    counts = {status: 0 for status in (PASSED, FAILED, TIMEOUT, CRASHED)}
+    for report in reports:
+        counts[report.status] += 1
+
+    return {
+        'summary': dict(counts, total=len(reports)),
+        'submissions': [report.to_json() for report in reports],
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Checks many team submissions for tournament compatibility.",
+    )
+    parser.add_argument('paths', nargs='+', metavar='DIRECTORY')
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--cpu-limit', type=float, default=None)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument(
+        '--no-static', action='store_true', help="run the full check on every submission",
+    )
+    parser.add_argument('-o', '--output', default=None, help="report file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    reports = check_submissions(
+        args.paths, args.workers, args.timeout, args.cpu_limit, not args.no_cache,
+        not args.no_static,
+    )
+    report = make_report(reports)
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    return 0 if all(report.passed for report in reports) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
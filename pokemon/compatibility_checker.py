@@ -5,17 +5,51 @@ OFFICIAL POKEMON TOURNAMENT STANDARD™.
 If your pokemon.py code fails validation by this module,
 it cannot be used in our tournament/driver and will be rejected.
 
+Verdicts are cached on disk, keyed by a hash of CHECKER_VERSION and the
+checked source files (pokemon.py, pokemon_team.py, and the modules next to
+them that they import), so unchanged code is not checked again: its cached
+errors (if any) are reported instead. The files are found and hashed without
+importing them, so code with a cached verdict doesn't run at all. The cache
+lives in ~/.cache/pokemon_checker, or in the directory named by the
+POKEMON_CHECKER_CACHE environment variable (set it to an empty string to
+turn caching off).
+
+Importing this module doesn't check anything. To check your code, call
+check_or_exit() (or run_checks(), which returns the errors instead), or run:
+
+    python compatibility_checker.py [--json] [--no-cache] [--static]
+                                    [--cpu-limit SECONDS] [DIRECTORY]
+
+which checks the code in DIRECTORY (by default, the code next to this file).
+With --cpu-limit, the check is killed (by SIGXCPU) once it has used that many
+seconds of CPU time, where the resource module is available: the limit is
+set before any of the checked code is imported.
+With --json, the verdict is printed to standard output as a JSON object:
+{"passed": true/false, "errors": [...]}. The exit status is 0 if the code
+is compatible and 1 otherwise.
+
+With --static, the code is only read, not imported: static_check() looks
+for structural problems (missing classes and methods, wrong numbers of
+arguments, ...) in its source. That's much cheaper than the full check, and
+safe to run on code you don't trust, but passing it doesn't make the code
+compatible.
+
+check_team() checks a team (rather than code) before it is entered into a
+battle, e.g. one sent to the matchmaker by a player.
+
 """
 
+import os
 import sys
-import copy
-import inspect
-from types import ModuleType
-from typing import Union, Callable, List, get_origin, get_args
-from collections.abc import Callable as CallableType
-from io import StringIO
-from unittest.mock import Mock
-from contextlib import contextmanager
+
+# The checks need inspect and typing, which are slow to import; each function
+# imports what it needs, so that importing this module stays cheap for code
+# that never runs a check.
+
+
+# Bump this whenever the checks change, so that cached verdicts made by older
+# versions of this file are ignored.
+CHECKER_VERSION = 3
 
 
 def check_module(module):
@@ -31,6 +65,10 @@ def check_module(module):
     
     """
 
+    import inspect
+    from types import ModuleType
+    from typing import Callable
+
     assert isinstance(module, ModuleType)
 
     moduleName = module.__name__.rsplit('.', 1)[-1]
@@ -195,6 +233,10 @@ def check_class(cls):
 
     """
 
+    import inspect
+    from typing import Union, get_origin, get_args
+    from collections.abc import Callable as CallableType
+
     assert isinstance(cls, type)
     assert cls.__name__ in ('Player', 'Pokemon', 'Move')
     assert _suppress_output(lambda: check_module(inspect.getmodule(cls)))
@@ -214,95 +256,60 @@ def check_class(cls):
     if _spew_errors(errors):
         return False
     
-    expectedTypeForFieldForClass = {
-        Player: {
-            'name': str,
-            'pokemon_party': List[Pokemon],
-            'current_pokemon': Pokemon,
-            '__init__': Callable[[str, List[Pokemon]], None],
-            'list_pokemon': Callable[[], None],
-            'switch': Callable[[str], bool],
-            'get_pokemon': Callable[[str], Pokemon],
-            'heal': Callable[[], None],
-            'team_is_alive': Callable[[], bool],
-            'print_moves': Callable[[], None],
-            'attack': Callable[[str, Pokemon], None],
-        },
-        Pokemon: {
-            'hp': int,
-            'max_hp': int,
-            'name': str,
-            'moves': List[Move],
-            'type': str,
-            'speed': int,
-            '__init__': Callable[[str, int, List[Move], str, int], None],
-            'is_alive': Callable[[], bool],
-            'print_moves': Callable[[], None],
-            'get_move': Callable[[str], Move],
-            'attack': Callable[[str, Pokemon], None],
-            'take_damage': Callable[[Union[int, float]], None],
-            'heal': Callable[[], None],
-        },
-        Move: {
-            'name': str,
-            'power': int,
-            'type': str,
-            '__init__': Callable[[str, int, str], None],
-            '__str__': Callable[[], str],
-            'get_multiplier_against': Callable[[Pokemon], Union[int, float]],
-        },
-    }
+    expectedTypeForFieldForClass = _expected_types(Player, Pokemon, Move)
 
-    mockForType = {}
-    
-    def get_mock(Type):
+    stubForType = {}
+
+    def get_stub(Type):
+        # Returns an object of the given type for passing to the methods
+        # being checked: a value, a list of 3 stubs, or a stub object whose
+        # attributes and methods return other stubs (see _make_stub()).
         try:
-            return mockForType[Type]
+            return stubForType[Type]
         except KeyError:
             typeArgs = get_args(Type)
             OriginType = get_origin(Type)
-            
+
             if OriginType is list:
                 assert len(typeArgs) == 1
-                innerMock = get_mock(typeArgs[0])
-                mock = [
-                    innerMock,
-                    copy.deepcopy(innerMock),
-                    copy.deepcopy(innerMock),
+                innerStub = get_stub(typeArgs[0])
+                stub = [
+                    innerStub,
+                    _copy_stub(innerStub),
+                    _copy_stub(innerStub),
                 ]
-                
+
             elif OriginType is Union:
                 assert len(typeArgs) > 1
-                mock = get_mock(typeArgs[0])
-                
+                stub = get_stub(typeArgs[0])
+
             elif Type in (int, float, str, bool):
-                mock = Type()
-                
+                stub = Type()
+
+            elif Type is None or Type is type(None):
+                stub = None
+
             else:
                 expectedTypeForField = expectedTypeForFieldForClass.get(Type, {})
 
-                mock = Mock(Type)
-                
-                # Mock attributes
-                kwargs = {
-                    fieldName: get_mock(FieldType)
+                attributes = {
+                    fieldName: get_stub(FieldType)
                     for fieldName, FieldType in expectedTypeForField.items()
                         if get_origin(FieldType) is not CallableType
                 }
-                mock.configure_mock(**kwargs)
 
-                # Mock methods
-                kwargs = {
-                    f'{fieldName}.return_value': get_mock(get_args(FieldType)[1])
+                returnValues = {
+                    fieldName: get_stub(get_args(FieldType)[1])
                     for fieldName, FieldType in expectedTypeForField.items()
                         if get_origin(FieldType) is CallableType
                             and fieldName not in ('__init__', '__str__')
                 }
-                mock.configure_mock(**kwargs)
-                
-            mockForType[Type] = mock
-            
-            return mock
+
+                stub = _make_stub(Type, attributes, returnValues)
+
+            stubForType[Type] = stub
+
+            return stub
 
     expectedTypeForField = expectedTypeForFieldForClass[cls]
 
@@ -326,7 +333,7 @@ def check_class(cls):
     
     # Attempt to construct an instance of the given class.
     try:
-        testObject = cls(*(get_mock(ArgType) for ArgType in ctorArgTypes))
+        testObject = cls(*(get_stub(ArgType) for ArgType in ctorArgTypes))
     except Exception as e:
         check(
             False,
@@ -373,7 +380,7 @@ def check_class(cls):
             
             try:
                 with _capture_output():
-                    returnVal = value(*(get_mock(ArgType) for ArgType in argTypes))
+                    returnVal = value(*(get_stub(ArgType) for ArgType in argTypes))
             except Exception as e:
                 check(
                     False,
@@ -440,10 +447,587 @@ def check_class(cls):
     return not _spew_errors(errors)
 
 
+# Limits on the teams check_team() accepts.
+MAX_TEAM_SIZE = 6
+MAX_MOVES = 4
+MAX_HP = 255
+MAX_SPEED = 255
+MAX_POWER = 250
+
+
+def check_team(team, report=True):
+    """
+    Checks the given team (a list of Pokemon, from pokemon.py) for
+    compatibility with our OFFICIAL POKEMON TOURNAMENT STANDARD™ before it
+    is entered into a battle.
+
+    Specifically:
+        - The team must have 1 to MAX_TEAM_SIZE Pokemon, with different names.
+        - Every Pokemon must be at full health, with a max_hp of 1 to MAX_HP,
+          a speed of 0 to MAX_SPEED, and a type from the type chart.
+        - Every Pokemon must know 1 to MAX_MOVES moves, with different names.
+        - Every move must have a power of 0 to MAX_POWER, and a type from the
+          type chart.
+
+    Each problem found is reported (printed, unless report is False). Returns
+    the list of errors found.
+    """
+
+    from pokemon import Pokemon, Move
+    from type_chart import TYPE_IDS
+
+    errors = []
+
+    # The error messages are only built for the checks that fail: this runs
+    # for every team that joins a matchmaking queue.
+    if not isinstance(team, list) or not all(isinstance(item, Pokemon) for item in team):
+        errors.append(
+            "A team must be a list of Pokemon! "
+            f"(Yours was found to be a {_type_str(type(team), value=team)})"
+        )
+        if report:
+            _spew_errors(errors)
+        return errors
+
+    if not 1 <= len(team) <= MAX_TEAM_SIZE:
+        errors.append(
+            f"A team must have 1 to {MAX_TEAM_SIZE} Pokemon! (Yours has {len(team)})"
+        )
+
+    names = [pokemon.name for pokemon in team]
+    if len(set(names)) != len(names):
+        errors.append(
+            f"The Pokemon in a team must have different names! (Yours are {names})"
+        )
+
+    for pokemon in team:
+        name = pokemon.name
+        maxHp = pokemon.max_hp
+
+        if not (_is_whole(maxHp) and 1 <= maxHp <= MAX_HP):
+            errors.append(
+                f"{name}'s max_hp must be a whole number from 1 to {MAX_HP}! "
+                f"(It is {maxHp!r})"
+            )
+        if pokemon.hp != maxHp:
+            errors.append(
+                f"{name} must be at full health! (It has {pokemon.hp!r} of "
+                f"{maxHp!r} HP)"
+            )
+        if not (_is_whole(pokemon.speed) and 0 <= pokemon.speed <= MAX_SPEED):
+            errors.append(
+                f"{name}'s speed must be a whole number from 0 to {MAX_SPEED}! "
+                f"(It is {pokemon.speed!r})"
+            )
+        if pokemon.type not in TYPE_IDS:
+            errors.append(
+                f"{name}'s type must be one of {sorted(TYPE_IDS)}! "
+                f"(It is {pokemon.type!r})"
+            )
+
+        moves = pokemon.moves
+        if not isinstance(moves, list) or not all(isinstance(move, Move) for move in moves):
+            errors.append(
+                f"{name}'s moves must be a list of Moves! (They were found to "
+                f"be a {_type_str(type(moves), value=moves)})"
+            )
+            continue
+
+        if not 1 <= len(moves) <= MAX_MOVES:
+            errors.append(
+                f"{name} must know 1 to {MAX_MOVES} moves! (It knows {len(moves)})"
+            )
+
+        moveNames = [move.name for move in moves]
+        if len(set(moveNames)) != len(moveNames):
+            errors.append(
+                f"{name}'s moves must have different names! (They are {moveNames})"
+            )
+
+        for move in moves:
+            if not (_is_whole(move.power) and 0 <= move.power <= MAX_POWER):
+                errors.append(
+                    f"{name}'s move {move.name}'s power must be a whole number "
+                    f"from 0 to {MAX_POWER}! (It is {move.power!r})"
+                )
+            if move.type not in TYPE_IDS:
+                errors.append(
+                    f"{name}'s move {move.name}'s type must be one of "
+                    f"{sorted(TYPE_IDS)}! (It is {move.type!r})"
+                )
+
+    if report:
+        _spew_errors(errors)
+
+    return errors
+
+
+def _is_whole(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def static_check(directory=None, report=True):
+    """
+    Checks the source of pokemon.py (and pokemon_team.py, if there is one)
+    in the given directory (by default, the current directory) for
+    structural problems, without importing or running any of it:
+
+        - missing classes, variables, methods and attributes
+        - methods, constructors and create_team() that take the wrong number
+          of arguments
+
+    Each problem found is reported (printed, unless report is False) with
+    the message check_module() / check_class() would give for it. Names
+    that might be defined in ways that can't be seen without running the
+    code (inherited from a base class, set with setattr(), ...) are given
+    the benefit of the doubt.
+
+    Returns the list of errors found, or None if the source can't be
+    checked this way (pokemon.py is missing or doesn't parse). An empty list
+    doesn't mean the code is compatible, only that the full check is needed
+    to tell.
+    """
+
+    import ast
+
+    if directory is None:
+        directory = os.getcwd()
+
+    trees = []
+    for fileName in ('pokemon.py', 'pokemon_team.py'):
+        try:
+            with open(os.path.join(directory, fileName), 'rb') as file:
+                trees.append(ast.parse(file.read(), fileName))
+        except FileNotFoundError:
+            if fileName == 'pokemon.py':
+                return None
+            trees.append(None)
+        except (OSError, SyntaxError, ValueError):
+            return None
+
+    groups = _static_errors(*trees)
+
+    if report:
+        for errors in groups:
+            _spew_errors(errors)
+
+    return [error for errors in groups for error in errors]
+
+
+def _static_errors(pokemonTree, teamTree):
+    # Returns the errors static_check() finds in the given module ASTs, in
+    # the groups check_module() and check_class() would report them in.
+    import ast
+
+    groups = []
+
+    def add_group(errors):
+        if errors:
+            groups.append(errors)
+
+        return not errors
+
+    pokemonScope = _Scope(pokemonTree)
+
+    errors = []
+    if pokemonScope.known:
+        for name in ('Pokemon', 'Player', 'Move'):
+            if not pokemonScope.binds(name):
+                errors.append(f"pokemon.py file must contain a '{name}' class!")
+
+        for name in ('INVALID_MOVE', 'INVALID_POKEMON'):
+            if not pokemonScope.binds(name):
+                errors.append(f"pokemon.py file must contain a '{name}' variable!")
+
+    pokemonOk = add_group(errors)
+
+    if teamTree is not None:
+        teamScope = _Scope(teamTree)
+
+        errors = []
+        if teamScope.known:
+            if not teamScope.binds('create_team'):
+                errors.append("team.py file must contain a 'create_team()' function!")
+            else:
+                function = teamScope.definition('create_team', ast.FunctionDef)
+                if function is not None:
+                    argCount = _param_count(function.args)
+                    if argCount != 0:
+                        errors.append(
+                            "'create_team()' should take no arguments! "
+                            f"(Your version takes {argCount} arguments)"
+                        )
+
+        add_group(errors)
+
+    if not pokemonOk:
+        return groups
+
+    # Stand-ins for the classes, named like them, so that _type_str()
+    # describes the expected types just as check_class() does.
+    Player, Pokemon, Move = (type(name, (), {}) for name in ('Player', 'Pokemon', 'Move'))
+
+    for Class, expectedTypeForField in _expected_types(Player, Pokemon, Move).items():
+        classDef = pokemonScope.definition(Class.__name__, ast.ClassDef)
+        if classDef is not None:
+            add_group(_static_class_errors(classDef, expectedTypeForField, pokemonScope))
+
+    return groups
+
+
+def _static_class_errors(classDef, expectedTypeForField, scope):
+    # Returns the errors static_check() finds in a class definition, in the
+    # order check_class() would report them, or no errors if the class does
+    # things that can't be followed without running it.
+    import ast
+    import inspect
+    from typing import get_origin, get_args
+    from collections.abc import Callable as CallableType
+
+    plainBases = all(
+        isinstance(base, ast.Name) and base.id == 'object' for base in classDef.bases
+    )
+    if classDef.decorator_list or classDef.keywords or not plainBases:
+        return []
+
+    methods = {}
+    classNames = set()
+    for statement in classDef.body:
+        if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            classNames.add(statement.name)
+            if not statement.decorator_list:
+                methods[statement.name] = statement
+        else:
+            classNames.update(_bound_names(statement))
+
+    if classNames & {'__new__', '__getattr__', '__getattribute__', '__class__'}:
+        return []
+
+    className = classDef.name
+    errors = []
+
+    # The constructor must take the right number of arguments, not counting
+    # self (object.__init__() takes any number).
+    ctorArgTypes, _ = get_args(expectedTypeForField['__init__'])
+    if '__init__' in methods:
+        ctorArgCount = _param_count(methods['__init__'].args, skip='self')
+    elif '__init__' not in classNames:
+        ctorArgCount = len(inspect.signature(object.__init__).parameters) - 1
+    else:
+        ctorArgCount = len(ctorArgTypes)
+
+    if ctorArgCount != len(ctorArgTypes):
+        errors.append(
+            f"{className} class constructor should take "
+            f"{len(ctorArgTypes)} arguments! "
+            f"(Your version takes {ctorArgCount} arguments)"
+        )
+        return errors
+
+    for fieldName, ExpectedType in expectedTypeForField.items():
+        if fieldName == '__init__':
+            continue
+
+        isMethod = get_origin(ExpectedType) is CallableType
+
+        if fieldName not in classNames:
+            if hasattr(object, fieldName) or scope.sets_attribute(fieldName, className):
+                continue
+
+            if isMethod:
+                errors.append(f"{className} class must have a '.{fieldName}()' method!")
+            else:
+                errors.append(f"{className} class must have a '.{fieldName}' attribute!")
+
+        elif isMethod and fieldName in methods \
+                and not scope.sets_attribute(fieldName, className):
+            argTypes, _ = get_args(ExpectedType)
+            argCount = _param_count(methods[fieldName].args, skip=0)
+
+            if argCount != len(argTypes):
+                errors.append(
+                    f"Method '{className}.{fieldName}()' "
+                    f"should take {len(argTypes)} arguments! "
+                    f"(Your version takes {argCount} arguments)"
+                )
+                errors.append(
+                    f"Method '{className}.{fieldName}()' must be a "
+                    f"{_type_str(ExpectedType)}!"
+                )
+
+    return errors
+
+
+def _param_count(arguments, skip=None):
+    # The number of parameters inspect.signature() would give a function
+    # with the given ast.arguments. skip=0 leaves out the first positional
+    # parameter (as binding a method does); skip='self' leaves out any
+    # parameter named self.
+    names = [
+        arg.arg
+        for arg in arguments.posonlyargs + arguments.args
+    ]
+    if skip == 0:
+        names = names[1:]
+
+    names += [arg.arg for arg in arguments.kwonlyargs]
+    names += [arg.arg for arg in (arguments.vararg, arguments.kwarg) if arg is not None]
+
+    if skip == 'self':
+        names = [name for name in names if name != 'self']
+
+    return len(names)
+
+
+def _bound_names(node):
+    # The names a statement binds in the scope it runs in (not counting
+    # names bound inside functions and classes it defines).
+    import ast
+
+    names = set()
+
+    def visit(node):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+            for child in node.decorator_list:
+                visit(child)
+            return
+
+        if isinstance(node, ast.Lambda):
+            return
+
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add(alias.asname or alias.name.split('.')[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            names.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            names.add(node.rest)
+
+        for child in ast.iter_child_nodes(node):
+            visit(child)
+
+    visit(node)
+    return names
+
+
+class _Scope:
+    # What can be told about a module's global names from its AST.
+    #
+    # .known is False if the module might define names in ways that can't
+    # be seen without running it (a star import, globals(), exec(), a module
+    # __getattr__(), ...), in which case binds() shouldn't be relied on.
+
+    _DYNAMIC_CALLS = {'globals', 'exec', 'eval', '__import__'}
+    _ATTRIBUTE_CALLS = {'setattr', 'delattr', 'vars'}
+
+    def __init__(self, tree):
+        import ast
+
+        self.tree = tree
+        self.names = set()
+        self.attributes = set()
+        self.globalNames = set()
+        # The objects passed to setattr() and co (None for anything but a
+        # plain name).
+        self.attributeTargets = set()
+        self.known = True
+
+        for statement in tree.body:
+            self.names |= _bound_names(statement)
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Global):
+                self.globalNames.update(node.names)
+            elif isinstance(node, ast.ImportFrom) and any(
+                alias.name == '*' for alias in node.names
+            ):
+                self.known = False
+            elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+                if node.func.id in self._DYNAMIC_CALLS:
+                    self.known = False
+                elif node.func.id in self._ATTRIBUTE_CALLS:
+                    if not node.args:
+                        self.known = False
+                    elif isinstance(node.args[0], ast.Name):
+                        self.attributeTargets.add(node.args[0].id)
+                    else:
+                        self.attributeTargets.add(None)
+            elif isinstance(node, ast.Attribute):
+                if node.attr in ('__dict__', 'modules'):
+                    self.known = False
+                elif isinstance(node.ctx, ast.Store):
+                    self.attributes.add(node.attr)
+
+        self.names |= self.globalNames
+
+        if '__getattr__' in self.names:
+            self.known = False
+
+    def binds(self, name):
+        return name in self.names
+
+    def sets_attribute(self, name, className):
+        # Whether any code in the module assigns to an attribute with the
+        # given name (of any object), or might set attributes of instances
+        # of the given class some other way.
+        if not self.known or name in self.attributes:
+            return True
+
+        # setattr() on one of the module's other classes doesn't matter.
+        import ast
+
+        return any(
+            target is None or target == className
+                or self.definition(target, ast.ClassDef) is None
+            for target in self.attributeTargets
+        )
+
+    def definition(self, name, nodeType):
+        # Returns the node that defines the name, if the name is bound only
+        # once, by a top-level statement of the given type, and the module's
+        # names are known. Otherwise returns None.
+        if not self.known:
+            return None
+
+        found = None
+        for statement in self.tree.body:
+            if name in _bound_names(statement):
+                if found is not None or type(statement) is not nodeType:
+                    return None
+                found = statement
+
+        if found is None or getattr(found, 'decorator_list', None):
+            return None
+
+        if name in self.globalNames:
+            return None
+
+        return found
+
+
+def _expected_types(Player, Pokemon, Move):
+    # Returns the expected type of every field of each of the given classes
+    # (see check_class()), keyed by class and field name.
+    from typing import Union, Callable, List
+
+    return {
+        Player: {
+            'name': str,
+            'pokemon_party': List[Pokemon],
+            'current_pokemon': Pokemon,
+            '__init__': Callable[[str, List[Pokemon]], None],
+            'list_pokemon': Callable[[], None],
+            'switch': Callable[[str], bool],
+            'get_pokemon': Callable[[str], Pokemon],
+            'heal': Callable[[], None],
+            'team_is_alive': Callable[[], bool],
+            'print_moves': Callable[[], None],
+            'attack': Callable[[str, Pokemon], None],
+        },
+        Pokemon: {
+            'hp': int,
+            'max_hp': int,
+            'name': str,
+            'moves': List[Move],
+            'type': str,
+            'speed': int,
+            '__init__': Callable[[str, int, List[Move], str, int], None],
+            'is_alive': Callable[[], bool],
+            'print_moves': Callable[[], None],
+            'get_move': Callable[[str], Move],
+            'attack': Callable[[str, Pokemon], None],
+            'take_damage': Callable[[Union[int, float]], None],
+            'heal': Callable[[], None],
+        },
+        Move: {
+            'name': str,
+            'power': int,
+            'type': str,
+            '__init__': Callable[[str, int, str], None],
+            '__str__': Callable[[], str],
+            'get_multiplier_against': Callable[[Pokemon], Union[int, float]],
+        },
+    }
+
+
+# While run_checks() is checking, every group of errors reported by
+# _spew_errors() is also appended here, to be cached.
+_errorLog = None
+
+
+def _make_stub(Type, attributes, returnValues):
+    # Returns a stub instance of the given class: an object of a subclass
+    # whose methods just return the given values, and whose attributes are
+    # the given values. The class's own __init__() is never run, and its
+    # properties and __slots__ are shadowed by the stub's attributes, so
+    # the stub behaves the same whatever the class does.
+    namespace = {
+        '__module__': Type.__module__,
+        '__qualname__': Type.__qualname__,
+        '_stubOf': Type,
+        '__str__': _stub_str,
+        '__repr__': _stub_str,
+    }
+
+    for fieldName in attributes:
+        namespace[fieldName] = None
+
+    for fieldName, returnValue in returnValues.items():
+        namespace[fieldName] = _returning(returnValue)
+
+    Stub = type(Type.__name__, (Type,), namespace)
+
+    stub = object.__new__(Stub)
+    stub.__dict__.update(attributes)
+    return stub
+
+
+def _returning(value):
+    def method(self, *args, **kwargs):
+        return value
+
+    return method
+
+
+def _stub_str(self):
+    return f"<{type(self).__name__} stub>"
+
+
+def _copy_stub(stub):
+    # Returns another stub like the given one, with its own copies of any
+    # list attributes.
+    if not isinstance(type(stub).__dict__.get('_stubOf'), type):
+        return stub
+
+    copied = object.__new__(type(stub))
+    copied.__dict__.update({
+        name: list(value) if isinstance(value, list) else value
+        for name, value in stub.__dict__.items()
+    })
+    return copied
+
+
+def _unstub(Type):
+    # Maps a stub class made by _make_stub() back to the class it stands in
+    # for.
+    if isinstance(Type, type):
+        return Type.__dict__.get('_stubOf', Type)
+
+    return Type
+
+
 def _spew_errors(errors):
     if len(errors) == 0:
         return False
 
+    if _errorLog is not None:
+        _errorLog.append(list(errors))
+
     print(
         f"Found {len(errors)} Pokemon Tournament driver compatibility errors:", 
         file=sys.stderr,
@@ -456,22 +1040,27 @@ def _spew_errors(errors):
     return True
 
 
-@contextmanager
-def _capture_output():
-    capture = StringIO()
+class _capture_output:
+    # Context manager that sends stdout and stderr to a StringIO. (A class
+    # rather than a contextlib.contextmanager, to keep contextlib out of
+    # this module's imports.)
 
-    stdout = sys.stdout
-    stderr = sys.stderr
-    
-    try:
-        sys.stdout = capture
-        sys.stderr = capture
-        
-        yield capture
-        
-    finally:
-        sys.stdout = stdout
-        sys.stderr = stderr
+    def __enter__(self):
+        from io import StringIO
+
+        self.capture = StringIO()
+
+        self.stdout = sys.stdout
+        self.stderr = sys.stderr
+
+        sys.stdout = self.capture
+        sys.stderr = self.capture
+
+        return self.capture
+
+    def __exit__(self, *excInfo):
+        sys.stdout = self.stdout
+        sys.stderr = self.stderr
 
 
 def _suppress_output(callable):
@@ -480,9 +1069,14 @@ def _suppress_output(callable):
 
 
 def _type_str(Type, value=None):
+    from typing import Union, get_origin, get_args
+    from collections.abc import Callable as CallableType
+
     if Type is None:
         Type = type(None)
 
+    Type = _unstub(Type)
+
     typeArgs = get_args(Type)
     OriginType = get_origin(Type)
 
@@ -513,7 +1107,7 @@ def _type_str(Type, value=None):
         
     elif Type is list and value is not None:
         itemTypes = [
-            type(item) if type(item).__name__ != 'Mock' else item.__class__
+            _unstub(type(item))
             for item in value
         ]
         itemTypesDeduped = set(itemTypes)
@@ -532,9 +1126,6 @@ def _type_str(Type, value=None):
                 for ItemType, item in zip(itemTypes, value)
             )
 
-    elif Type.__name__ == 'Mock' and value is not None:
-        return _type_str(value.__class__, value=value)
-    
     elif Type is type:
         return 'class'
 
@@ -545,38 +1136,320 @@ def _type_str(Type, value=None):
         return Type.__name__
 
 
-def _do_checks():
-    import pokemon
+def _check_modules(pokemon, pokemon_team):
+    # Runs every check, reporting errors like check_module() and
+    # check_class() do. Returns the reported errors, in groups.
+    global _errorLog
+    _errorLog = []
 
-    failed = False
-        
-    if not check_module(pokemon):
-        failed = True
+    try:
+        failed = False
+
+        if not check_module(pokemon):
+            failed = True
+
+        if pokemon_team is not None and not check_module(pokemon_team):
+            failed = True
+
+        if not failed:
+            for cls in (pokemon.Player, pokemon.Pokemon, pokemon.Move):
+                check_class(cls)
+
+        return _errorLog
+
+    finally:
+        _errorLog = None
+
+
+def run_checks(useCache=True, cacheDir=None):
+    """
+    Checks the pokemon module (and the pokemon_team module, if there is one)
+    for compatibility with our OFFICIAL POKEMON TOURNAMENT STANDARD™,
+    printing any errors found.
+
+    Unless useCache is False, a cached verdict for the same source code is
+    used if there is one (see the top of this file). cacheDir overrides the
+    cache directory.
+
+    Returns the list of errors found (empty if the code is compatible).
+    """
+
+    if cacheDir is None:
+        cacheDir = _cache_dir()
+
+    # The key is computed from the source files alone, so that nothing of
+    # the checked code runs unless the verdict isn't cached.
+    key = _source_key() if useCache and cacheDir else None
+
+    if key is not None:
+        groups = _load_verdict(cacheDir, key)
+        if groups is not None:
+            for errors in groups:
+                _spew_errors(errors)
+
+            return [error for errors in groups for error in errors]
+
+    import pokemon
 
     try:
         import pokemon_team
     except ImportError:
+        pokemon_team = None
+
+    groups = _check_modules(pokemon, pokemon_team)
+
+    if key is not None:
+        _store_verdict(cacheDir, key, groups)
+
+    return [error for errors in groups for error in errors]
+
+
+def _cache_dir():
+    cacheDir = os.environ.get('POKEMON_CHECKER_CACHE')
+    if cacheDir is None:
+        cacheDir = os.path.join(os.path.expanduser('~'), '.cache', 'pokemon_checker')
+
+    return cacheDir
+
+
+def _source_key():
+    # A hash of the checker version and the source of every file
+    # _source_files() finds, or None if some source can't be read.
+    import hashlib
+
+    files = _source_files()
+    if files is None:
+        return None
+
+    digest = hashlib.sha256(f"{CHECKER_VERSION}\0".encode())
+
+    for name, path in sorted(files.items()):
+        try:
+            with open(path, 'rb') as file:
+                source = file.read()
+        except OSError:
+            return None
+
+        digest.update(name.encode() + b'\0')
+        digest.update(hashlib.sha256(source).digest())
+
+    return digest.hexdigest()
+
+
+def _source_files():
+    # Finds, without importing anything, the source files of pokemon (and
+    # pokemon_team, if there is one) and of the modules next to them that
+    # they import, directly or not. Returns them keyed by module name, or
+    # None if pokemon's source can't be found. Imports are found by
+    # _IMPORT_PATTERN, which is much cheaper than parsing the source: lines
+    # that only look like imports (in strings) just add files to the hash.
+    # Imports the source can't show (importlib, __import__(), ...) aren't
+    # followed.
+    import re
+
+    importPattern = re.compile(_IMPORT_PATTERN, re.MULTILINE)
+
+    pokemonPath = _find_source('pokemon')
+    if pokemonPath is None:
+        return None
+
+    directory = os.path.dirname(pokemonPath)
+    files = {'pokemon': pokemonPath}
+
+    teamPath = _find_source('pokemon_team')
+    if teamPath is not None:
+        files['pokemon_team'] = teamPath
+
+    pending = list(files.values())
+    while pending:
+        path = pending.pop()
+        try:
+            with open(path, 'rb') as file:
+                source = file.read().decode('utf-8', 'replace')
+        except OSError:
+            # _source_key() gives up on it.
+            continue
+
+        for fromName, importNames in importPattern.findall(source):
+            names = [fromName] if fromName else [
+                name.split()[0] for name in importNames.split(',') if name.strip()
+            ]
+
+            for name in names:
+                name = name.partition('.')[0]
+                if not name or name in files:
+                    continue
+
+                modulePath = _find_source(name)
+                if modulePath is not None and os.path.dirname(modulePath) == directory:
+                    files[name] = modulePath
+                    pending.append(modulePath)
+
+    return files
+
+
+# `from MODULE import ...` or `import MODULE[ as NAME], ...`, at the start of
+# a line.
+_IMPORT_PATTERN = (
+    r'^[ \t]*(?:from[ \t]+([\w.]+)[ \t]+import\b|import[ \t]+([\w. \t,]+))'
+)
+
+
+def _find_source(name):
+    # Returns the path of a top-level module's .py source, or None. Finding a
+    # top-level module's spec doesn't import it.
+    import importlib.util
+
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+
+    if spec is None or not spec.has_location or not (spec.origin or '').endswith('.py'):
+        return None
+
+    return spec.origin
+
+
+def _load_verdict(cacheDir, key):
+    # Returns the cached error groups for the key, or None.
+    import json
+
+    try:
+        with open(os.path.join(cacheDir, f"{key}.json"), encoding='utf-8') as file:
+            verdict = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(verdict, dict) or verdict.get('version') != CHECKER_VERSION:
+        return None
+
+    groups = verdict.get('errors')
+    if verdict.get('passed') != (not groups):
+        return None
+
+    return groups
+
+
+def _store_verdict(cacheDir, key, groups):
+    # Best effort: a cache that can't be written just isn't used. The file is
+    # written under a temporary name and then renamed, so checkers running
+    # in parallel never see half a verdict.
+    import json
+    import tempfile
+
+    verdict = {
+        'version': CHECKER_VERSION,
+        'passed': not groups,
+        'errors': groups,
+    }
+
+    try:
+        os.makedirs(cacheDir, exist_ok=True)
+        fd, tempPath = tempfile.mkstemp(dir=cacheDir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(verdict, file)
+        os.replace(tempPath, os.path.join(cacheDir, f"{key}.json"))
+    except OSError:
         pass
-    else:
-        if not check_module(pokemon_team):
-            failed = True
-            
-    if failed:
-        sys.exit(1)
 
-    failed = False
-    
-    if not check_class(pokemon.Player):
-        failed = True
-    
-    if not check_class(pokemon.Pokemon):
-        failed = True
-    
-    if not check_class(pokemon.Move):
-        failed = True
 
-    if failed:
+def check_or_exit():
+    """
+    Runs run_checks(), and exits the program (with status 1) if the code
+    isn't compatible.
+    """
+
+    if run_checks():
         sys.exit(1)
 
 
-_do_checks()
+def _limit_cpu(seconds):
+    # Caps this process's CPU time, where the resource module is available.
+    try:
+        import resource
+    except ImportError:
+        return
+
+    seconds = max(1, int(-(-seconds // 1)))
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        seconds = min(seconds, hard - 1)
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, hard))
+    else:
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+
+
+def _main(argv):
+    # Command line interface; see the top of this file.
+    useJson = '--json' in argv
+    useCache = '--no-cache' not in argv
+    staticOnly = '--static' in argv
+    cpuLimit = None
+    paths = []
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--cpu-limit' or arg.startswith('--cpu-limit='):
+            value = arg.partition('=')[2] or next(args, '')
+            try:
+                cpuLimit = float(value)
+            except ValueError:
+                paths.append(None)
+        elif not arg.startswith('--'):
+            paths.append(arg)
+
+    if len(paths) > 1 or None in paths:
+        print(
+            "usage: python compatibility_checker.py "
+            "[--json] [--no-cache] [--static] [--cpu-limit SECONDS] [DIRECTORY]",
+            file=sys.stderr,
+        )
+        return 2
+
+    if cpuLimit is not None:
+        _limit_cpu(cpuLimit)
+
+    if staticOnly:
+        directory = paths[0] if paths else os.path.dirname(os.path.abspath(__file__))
+        errors = static_check(directory)
+        if errors is None:
+            errors = ["pokemon.py file is missing or can't be parsed!"]
+            _spew_errors(errors)
+
+        if useJson:
+            import json
+
+            json.dump({'passed': not errors, 'errors': errors}, sys.stdout)
+            print()
+
+        return 1 if errors else 0
+
+    # Import the code in the given directory (by default, the code next to
+    # this file).
+    if paths:
+        sys.path[0] = os.path.abspath(paths[0])
+
+    # Whatever the checked code prints must not end up in the JSON.
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+
+    try:
+        errors = run_checks(useCache)
+    except Exception as e:
+        errors = [f"Encountered error while checking: {type(e).__name__}: {e}"]
+        _spew_errors(errors)
+    finally:
+        sys.stdout = stdout
+
+    if useJson:
+        import json
+
+        json.dump({'passed': not errors, 'errors': errors}, sys.stdout)
+        print()
+
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,422 @@
+"""
+Type-coverage analysis of teams.
+
+rank_teams() enumerates every team of k different Pokemon from a pool, with
+every way of giving them moves, and ranks the teams by how well they cover
+the type chart. Each candidate team member (a Pokemon with a moveset) is
+summed up as bitsets over the type ids of type_chart, derived from
+Move.get_multiplier_against():
+
+    superEffective: types its moves hit for more than 1x
+    unresisted:     types at least one of its moves hits for 1x or more
+    resists:        attacking types that do less than 1x to it
+    weaknesses:     attacking types that do more than 1x to it
+
+so a team's coverage is just the OR of its members' bitsets. Teams are
+ranked by, in order:
+
+    1. the number of types the team hits super effectively
+    2. the number of attacking types some member resists
+    3. the number of attacking types two or more members are weak to (fewer
+       is better)
+    4. the number of types the team can hit for at least 1x
+    5. the total power of the team's moves
+
+Two kinds of pruning keep the enumeration fast:
+
+    - Dominated candidates are dropped before the search. A candidate is
+      dominated by another if the other is at least as good in every
+      bitset and in power, so swapping it in never makes a team worse; a
+      candidate is dropped if it is dominated by another moveset of the
+      same Pokemon, or by candidates of k other Pokemon (one of which is
+      then always free to take its place).
+    - The search is branch and bound: a partial team is abandoned as soon
+      as an optimistic bound on its score (everything the remaining
+      candidates could still add) can't beat the teams found so far.
+
+"""
+
+import heapq
+import itertools
+
+from pokemon import Pokemon, Move
+from type_chart import TYPE_NAMES, NEUTRAL_TYPE_ID
+
+
+# The type ids that coverage is measured over: every type but the neutral
+# 'no type'.
+COVERED_TYPE_IDS = [
+    typeId for typeId in range(len(TYPE_NAMES)) if typeId != NEUTRAL_TYPE_ID
+]
+
+# The number of set bits in every possible type bitset.
+_POPCOUNT = [bin(mask).count('1') for mask in range(1 << len(TYPE_NAMES))]
+
+
+def mask_types(mask):
+    """Returns the names of the types in a type bitset."""
+
+    return [TYPE_NAMES[typeId] for typeId in COVERED_TYPE_IDS if mask >> typeId & 1]
+
+
+class Candidate:
+    """A Pokemon with one moveset, and its coverage bitsets."""
+
+    __slots__ = (
+        'pokemon', 'moves', 'superEffective', 'unresisted', 'resists', 'weaknesses',
+        'power', 'group',
+    )
+
+    def __init__(self, pokemon, moves, superEffective, unresisted, resists, weaknesses):
+        self.pokemon = pokemon
+        self.moves = moves
+        self.superEffective = superEffective
+        self.unresisted = unresisted
+        self.resists = resists
+        self.weaknesses = weaknesses
+        self.power = sum(move.power for move in moves)
+
+        # The index of the Pokemon in the pool.
+        self.group = None
+
+    def dominates(self, other):
+        '''Whether swapping this candidate in for the other one can never
+        make a team's coverage worse.
+        '''
+        return (
+            self.superEffective | other.superEffective == self.superEffective
+            and self.unresisted | other.unresisted == self.unresisted
+            and self.resists | other.resists == self.resists
+            and self.weaknesses & other.weaknesses == self.weaknesses
+            and self.power >= other.power
+        )
+
+    def __repr__(self):
+        moveNames = ', '.join(move.name for move in self.moves)
+        return f"Candidate({self.pokemon.name}: {moveNames})"
+
+
+class RankedTeam:
+    """A team found by rank_teams(), with its coverage bitsets and score."""
+
+    def __init__(self, members, superEffective, unresisted, resists, sharedWeaknesses, score):
+        self.members = members
+        self.superEffective = superEffective
+        self.unresisted = unresisted
+        self.resists = resists
+        self.sharedWeaknesses = sharedWeaknesses
+        self.score = score
+
+    def create_team(self):
+        '''Returns a new list of Pokemon for this team.'''
+        return [
+            Pokemon(
+                member.pokemon.name,
+                member.pokemon.max_hp,
+                [Move(move.name, move.power, move.type) for move in member.moves],
+                member.pokemon.type,
+                member.pokemon.speed,
+            )
+            for member in self.members
+        ]
+
+    def describe(self):
+        '''Returns a description of the team and its coverage.'''
+        lines = [
+            f"{member.pokemon.name} ({member.pokemon.type}): "
+            + ', '.join(move.name for move in member.moves)
+            for member in self.members
+        ]
+        lines.append(f"  super effective against: {', '.join(mask_types(self.superEffective))}")
+        lines.append(f"  resists: {', '.join(mask_types(self.resists))}")
+        lines.append(f"  shared weaknesses: {', '.join(mask_types(self.sharedWeaknesses))}")
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        names = ', '.join(member.pokemon.name for member in self.members)
+        return f"RankedTeam([{names}], score={self.score})"
+
+
+def move_masks(move):
+    """Returns the (superEffective, unresisted) type bitsets of one move."""
+
+    superEffective = unresisted = 0
+    for typeId, probe in _probe_pokemon():
+        multiplier = move.get_multiplier_against(probe)
+        if multiplier > 1:
+            superEffective |= 1 << typeId
+        if multiplier >= 1:
+            unresisted |= 1 << typeId
+
+    return superEffective, unresisted
+
+
+def defense_masks(pokemon):
+    """Returns the (resists, weaknesses) type bitsets of one Pokemon."""
+
+    resists = weaknesses = 0
+    for typeId, probe in _probe_moves():
+        multiplier = probe.get_multiplier_against(pokemon)
+        if multiplier < 1:
+            resists |= 1 << typeId
+        elif multiplier > 1:
+            weaknesses |= 1 << typeId
+
+    return resists, weaknesses
+
+
+def candidates(pokemon, movePool=None, movesPerPokemon=4):
+    """Returns the Candidates for one Pokemon: one per way of picking
+    movesPerPokemon moves from the move pool (by default, from the
+    Pokemon's own moves).
+
+    Movesets that hit the same types only differ in power, so only the most
+    powerful moveset for each combination of move types is returned.
+    """
+
+    moves = list(pokemon.moves if movePool is None else movePool)
+    movesPerPokemon = min(movesPerPokemon, len(moves))
+    resists, weaknesses = defense_masks(pokemon)
+
+    # The moves of each type, most powerful first.
+    movesByType = {}
+    for move in sorted(moves, key=lambda move: -move.power):
+        movesByType.setdefault(move.type, []).append(move)
+
+    types = list(movesByType)
+    masksForType = {moveType: move_masks(moves[0]) for moveType, moves in movesByType.items()}
+
+    found = []
+    for typeCombination in itertools.combinations_with_replacement(types, movesPerPokemon):
+        counts = {moveType: typeCombination.count(moveType) for moveType in set(typeCombination)}
+        if any(count > len(movesByType[moveType]) for moveType, count in counts.items()):
+            continue
+
+        superEffective = unresisted = 0
+        chosen = []
+        for moveType, count in counts.items():
+            chosen += movesByType[moveType][:count]
+            superEffective |= masksForType[moveType][0]
+            unresisted |= masksForType[moveType][1]
+
+        found.append(Candidate(
+            pokemon, tuple(chosen), superEffective, unresisted, resists, weaknesses,
+        ))
+
+    return found
+
+
+def prune_dominated(candidates, teamSize):
+    """Returns the candidates that aren't dominated (see the top of this
+    file), keeping their order. Candidates must have their .group set.
+    """
+
+    # Movesets dominated by another moveset of the same Pokemon go first,
+    # which leaves far fewer candidates to compare across Pokemon.
+    byGroup = {}
+    for candidate in candidates:
+        byGroup.setdefault(candidate.group, []).append(candidate)
+
+    survivors = []
+    for group in byGroup.values():
+        survivors += [
+            candidate for index, candidate in enumerate(group)
+                if not any(
+                    _dominated_by(candidate, index, other, otherIndex)
+                    for otherIndex, other in enumerate(group)
+                )
+        ]
+
+    kept = []
+    for index, candidate in enumerate(survivors):
+        dominatingGroups = set()
+        for otherIndex, other in enumerate(survivors):
+            if other.group == candidate.group or other.group in dominatingGroups:
+                continue
+
+            if _dominated_by(candidate, index, other, otherIndex):
+                dominatingGroups.add(other.group)
+                if len(dominatingGroups) >= teamSize:
+                    break
+        else:
+            kept.append(candidate)
+
+    return kept
+
+
+def _dominated_by(candidate, index, other, otherIndex):
+    # Of two equal candidates, only the later one is dominated.
+    return otherIndex != index and other.dominates(candidate) and (
+        otherIndex < index or not candidate.dominates(other)
+    )
+
+
+def rank_teams(pool=None, teamSize=4, top=10, movePool=None, movesPerPokemon=4, prune=True):
+    """Returns the `top` best-covering teams of teamSize different Pokemon
+    from the pool, as RankedTeams, best first.
+
+    pool: a list of Pokemon (default: the Pokemon of
+          pokemon_team.create_pool())
+    movePool: the moves every Pokemon may pick from (default: each Pokemon
+              picks from its own moves)
+    prune: if False, every team is scored (for checking the pruning)
+
+    Teams with a dominated member are left out: each is no better than the
+    team with the dominating candidate swapped in, so the top teams don't
+    fill up with weaker copies of each other. The best team's score is the
+    same either way.
+    """
+
+    if pool is None:
+        import pokemon_team
+        pool = pokemon_team.create_pool()[0]
+
+    allCandidates = []
+    for group, pokemon in enumerate(pool):
+        for candidate in candidates(pokemon, movePool, movesPerPokemon):
+            candidate.group = group
+            allCandidates.append(candidate)
+
+    if prune:
+        allCandidates = prune_dominated(allCandidates, teamSize)
+
+    return _search(allCandidates, teamSize, top, prune)
+
+
+def _search(candidates, teamSize, top, prune):
+    # Depth-first search over teams, with at most one candidate per group.
+    # candidates are in group order.
+    count = len(candidates)
+    popcount = _POPCOUNT
+
+    # Where the next group starts after each candidate, and how many groups
+    # there are from each candidate on.
+    nextGroup = [count] * count
+    groupsLeft = [1] * count
+    for index in range(count - 2, -1, -1):
+        if candidates[index].group == candidates[index + 1].group:
+            nextGroup[index] = nextGroup[index + 1]
+            groupsLeft[index] = groupsLeft[index + 1]
+        else:
+            nextGroup[index] = index + 1
+            groupsLeft[index] = groupsLeft[index + 1] + 1
+
+    # What all the candidates from each index on could add at most.
+    restSuperEffective = [0] * (count + 1)
+    restUnresisted = [0] * (count + 1)
+    restResists = [0] * (count + 1)
+    restPower = [0] * (count + 1)
+    for index in range(count - 1, -1, -1):
+        candidate = candidates[index]
+        restSuperEffective[index] = restSuperEffective[index + 1] | candidate.superEffective
+        restUnresisted[index] = restUnresisted[index + 1] | candidate.unresisted
+        restResists[index] = restResists[index + 1] | candidate.resists
+        restPower[index] = max(restPower[index + 1], candidate.power)
+
+    # A min-heap of the best (score, order, members) found so far.
+    best = []
+    order = itertools.count()
+    members = []
+
+    def visit(start, superEffective, unresisted, resists, weakOnce, weakTwice, power):
+        needed = teamSize - len(members)
+
+        if needed == 0:
+            score = (
+                popcount[superEffective],
+                popcount[resists],
+                -popcount[weakTwice],
+                popcount[unresisted],
+                power,
+            )
+            entry = (score, -next(order), tuple(members))
+            if len(best) < top:
+                heapq.heappush(best, entry)
+            elif score > best[0][0]:
+                heapq.heapreplace(best, entry)
+            return
+
+        if prune and len(best) == top:
+            bound = (
+                popcount[superEffective | restSuperEffective[start]],
+                popcount[resists | restResists[start]],
+                -popcount[weakTwice],
+                popcount[unresisted | restUnresisted[start]],
+                power + needed * restPower[start],
+            )
+            if bound <= best[0][0]:
+                return
+
+        for index in range(start, count):
+            if groupsLeft[index] < needed:
+                break
+
+            candidate = candidates[index]
+
+            members.append(candidate)
+            weaknesses = candidate.weaknesses
+            visit(
+                nextGroup[index],
+                superEffective | candidate.superEffective,
+                unresisted | candidate.unresisted,
+                resists | candidate.resists,
+                weakOnce | weaknesses,
+                weakTwice | weakOnce & weaknesses,
+                power + candidate.power,
+            )
+            members.pop()
+
+    visit(0, 0, 0, 0, 0, 0, 0)
+
+    ranked = sorted(best, reverse=True)
+    return [
+        _ranked_team(teamMembers, score) for score, _, teamMembers in ranked
+    ]
+
+
+def _ranked_team(members, score):
+    superEffective = unresisted = resists = weakOnce = weakTwice = 0
+    for member in members:
+        superEffective |= member.superEffective
+        unresisted |= member.unresisted
+        resists |= member.resists
+        weakTwice |= weakOnce & member.weaknesses
+        weakOnce |= member.weaknesses
+
+    return RankedTeam(members, superEffective, unresisted, resists, weakTwice, score)
+
+
+# Probes for measuring multipliers with Move.get_multiplier_against(): a
+# Pokemon and a Move of each covered type. Made on first use.
+_probes = None
+
+
+def _make_probes():
+    global _probes
+    if _probes is None:
+        _probes = (
+            [
+                (typeId, Pokemon("Probe", 1, [], TYPE_NAMES[typeId], 0))
+                for typeId in COVERED_TYPE_IDS
+            ],
+            [
+                (typeId, Move("Probe", 0, TYPE_NAMES[typeId]))
+                for typeId in COVERED_TYPE_IDS
+            ],
+        )
+
+    return _probes
+
+
+def _probe_pokemon():
+    return _make_probes()[0]
+
+
+def _probe_moves():
+    return _make_probes()[1]
+
+
+if __name__ == '__main__':
+    for team in rank_teams(top=3):
+        print(team.describe())
+        print()
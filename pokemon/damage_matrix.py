@@ -0,0 +1,125 @@
+"""
+Team-vs-team damage matrices, computed with NumPy.
+
+damage_matrix(party1, party2) returns the damage every move of every Pokemon
+in party1 does to every Pokemon in party2, as a dense array indexed by
+[attacker slot, move slot, defender slot], together with an array of
+effectiveness codes of the same shape:
+
+    IMMUNE           the move does nothing (0x)
+    NOT_EFFECTIVE    "It's not very effective..." (less than 1x)
+    NEUTRAL          1x
+    SUPER_EFFECTIVE  "It's super effective!" (more than 1x)
+    EMPTY            a padding slot: no such Pokemon or move (damage 0)
+
+damage_matrices() does the same for many pairs of parties at once, with a
+leading [pair] axis, in a fixed number of array operations however many
+pairs there are. Parties can be given as lists of Pokemon, as Players, or
+already encoded by batched.encode_parties() (encode a field of teams once,
+and reuse it for every batch).
+
+This module requires NumPy.
+
+"""
+
+import numpy
+
+from batched import encode_parties
+from type_chart import EFFECTIVENESS, EFFECTIVENESS_ARRAY
+
+
+# Effectiveness codes.
+EMPTY = -1
+IMMUNE = 0
+NOT_EFFECTIVE = 1
+NEUTRAL = 2
+SUPER_EFFECTIVE = 3
+
+CODE_NAMES = {
+    EMPTY: 'empty',
+    IMMUNE: 'immune',
+    NOT_EFFECTIVE: 'not very effective',
+    NEUTRAL: 'neutral',
+    SUPER_EFFECTIVE: 'super effective',
+}
+
+
+def _code(multiplier):
+    if multiplier == 0:
+        return IMMUNE
+    elif multiplier < 1:
+        return NOT_EFFECTIVE
+    elif multiplier == 1:
+        return NEUTRAL
+    else:
+        return SUPER_EFFECTIVE
+
+
+# [attack type id, defend type id] -> effectiveness code.
+_CODES = numpy.array(
+    [[_code(multiplier) for multiplier in row] for row in EFFECTIVENESS],
+    dtype=numpy.int8,
+)
+
+
+def damage_matrix(party1, party2):
+    """Returns (damage, codes) arrays indexed by [attacker slot, move slot,
+    defender slot], for the Pokemon of party1 attacking those of party2.
+    """
+
+    damage, codes = damage_matrices([party1], [party2])
+    return damage[0], codes[0]
+
+
+def damage_matrices(attackers, defenders):
+    """Returns (damage, codes) arrays indexed by [pair, attacker slot, move
+    slot, defender slot], for the Pokemon of attackers[pair] attacking those
+    of defenders[pair].
+
+    attackers, defenders: equally long lists of parties (lists of Pokemon,
+    or Players), or the arrays batched.encode_parties() returns for such
+    lists. Shorter parties and move lists are padded: padding slots do 0
+    damage and have the code EMPTY.
+    """
+
+    attackers = _encoded(attackers)
+    defenders = _encoded(defenders)
+    assert len(attackers['type_id']) == len(defenders['type_id'])
+
+    moveTypes = attackers['move_type_id'][:, :, :, None]
+    defendTypes = defenders['type_id'][:, None, None, :]
+
+    damage = attackers['move_power'][:, :, :, None] * EFFECTIVENESS_ARRAY[moveTypes, defendTypes]
+    codes = _CODES[moveTypes, defendTypes]
+
+    # Padding: moves past each Pokemon's move count (which covers missing
+    # attackers, which have none), and defenders past the party's size.
+    moveSlots = numpy.arange(moveTypes.shape[2])
+    defenderSlots = numpy.arange(defendTypes.shape[3])
+    empty = (
+        (moveSlots[None, None, :] >= attackers['move_count'][:, :, None])[:, :, :, None]
+        | (defenderSlots[None, :] >= defenders['party_size'][:, None])[:, None, None, :]
+    )
+    damage[empty] = 0
+    codes[empty] = EMPTY
+
+    return damage, codes
+
+
+def _encoded(parties):
+    if isinstance(parties, dict):
+        return parties
+
+    return encode_parties(parties)
+
+
+if __name__ == '__main__':
+    import pokemon_team
+
+    team = pokemon_team.create_team()
+    damage, codes = damage_matrix(team, team)
+
+    for a, attacker in enumerate(team):
+        for m, move in enumerate(attacker.moves):
+            cells = ' '.join(f"{damage[a, m, d]:6.1f}" for d in range(len(team)))
+            print(f"{attacker.name:>12} {move.name:<15} {cells}")
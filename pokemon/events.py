@@ -0,0 +1,270 @@
+"""
+Battle events and event sinks.
+
+Instead of print()ing their narration, Actions and the turn functions in
+pokemon_driver (and engine, when asked) describe what happens as event
+records and hand them to a sink:
+
+    - NullSink throws events away. Its .enabled is False, so emitters skip
+      building the events at all, which makes narration nearly free when
+      nobody is watching.
+    - TextSink renders events as the text the game has always printed, and
+      buffers it until .flush() (unless buffered=False).
+    - CollectingSink keeps every event in a list, for tests and analytics.
+
+A sink is any object with an .enabled attribute and emit() / flush()
+methods. Event fields hold names (strings) rather than Player / Pokemon
+objects, so collected events stay valid after the battle moves on.
+
+"""
+
+import sys
+
+
+class Event:
+    """Base class for battle events."""
+
+    __slots__ = ()
+
+    def text(self):
+        '''Returns the narration for this event (possibly several lines), or
+        None if the event isn't narrated.
+        '''
+        return None
+
+    def __repr__(self):
+        fields = ', '.join(
+            f"{name}={getattr(self, name)!r}" for name in self.__slots__
+        )
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __hash__(self):
+        # Equal events hash alike, so events can be counted and deduplicated
+        # (as long as they aren't changed once they're in a set or dict).
+        return hash((type(self),) + tuple(getattr(self, name) for name in self.__slots__))
+
+
+class MoveUsed(Event):
+    """A player's Pokemon used a move."""
+
+    __slots__ = ('player', 'pokemon', 'move')
+
+    def __init__(self, player, pokemon, move):
+        self.player = player
+        self.pokemon = pokemon
+        self.move = move
+
+    def text(self):
+        return f"{self.pokemon} used {self.move}!"
+
+
+class Effectiveness(Event):
+    """How effective a move was against its target. Neutral moves aren't
+    narrated.
+    """
+
+    __slots__ = ('player', 'target', 'multiplier')
+
+    def __init__(self, player, target, multiplier):
+        # player owns the target Pokemon.
+        self.player = player
+        self.target = target
+        self.multiplier = multiplier
+
+    def text(self):
+        if self.multiplier > 1:
+            return "It's super effective!"
+        elif self.multiplier == 0:
+            return f"It doesn't affect {self.target}..."
+        elif self.multiplier < 1:
+            return "It's not very effective..."
+
+        return None
+
+
+class Damage(Event):
+    """A Pokemon lost HP to an attack."""
+
+    __slots__ = ('player', 'pokemon', 'amount', 'hp')
+
+    def __init__(self, player, pokemon, amount, hp):
+        # player owns the damaged Pokemon; hp is what it has left.
+        self.player = player
+        self.pokemon = pokemon
+        self.amount = amount
+        self.hp = hp
+
+
+class Fainted(Event):
+    """A player's current Pokemon fainted."""
+
+    __slots__ = ('player', 'pokemon')
+
+    def __init__(self, player, pokemon):
+        self.player = player
+        self.pokemon = pokemon
+
+    def text(self):
+        return f"{self.pokemon} fainted!"
+
+
+class Recalled(Event):
+    """A player called back their current Pokemon to switch it out."""
+
+    __slots__ = ('player', 'pokemon')
+
+    def __init__(self, player, pokemon):
+        self.player = player
+        self.pokemon = pokemon
+
+    def text(self):
+        return f"{self.pokemon}, return!"
+
+
+class SentOut(Event):
+    """A player sent out a Pokemon."""
+
+    __slots__ = ('player', 'pokemon')
+
+    def __init__(self, player, pokemon):
+        self.player = player
+        self.pokemon = pokemon
+
+    def text(self):
+        return f"Go {self.pokemon}!"
+
+
+class Healed(Event):
+    """A player used a potion on their current Pokemon."""
+
+    __slots__ = ('player', 'pokemon', 'amount')
+
+    def __init__(self, player, pokemon, amount):
+        self.player = player
+        self.pokemon = pokemon
+        self.amount = amount
+
+    def text(self):
+        return f"{self.player} used a potion on {self.pokemon}!"
+
+
+class RanAway(Event):
+    """A player ran away."""
+
+    __slots__ = ('player',)
+
+    def __init__(self, player):
+        self.player = player
+
+    def text(self):
+        return f"{self.player} ran away!"
+
+
+class GameOver(Event):
+    """The battle ended. winner and loser are None if nobody won."""
+
+    __slots__ = ('winner', 'loser')
+
+    def __init__(self, winner=None, loser=None):
+        self.winner = winner
+        self.loser = loser
+
+    def text(self):
+        lines = []
+        if self.loser is not None:
+            lines.append(f"{self.loser} loses!")
+
+        if self.winner is not None:
+            lines.append(f"{self.winner} is the winner!")
+
+        return '\n'.join(lines) if lines else None
+
+
+def game_over(result):
+    """Returns the GameOver event for a TurnResult."""
+
+    return GameOver(
+        result.winner.name if result.winner is not None else None,
+        result.loser.name if result.loser is not None else None,
+    )
+
+
+class NullSink:
+    """A sink that ignores every event."""
+
+    enabled = False
+
+    def emit(self, event):
+        pass
+
+    def flush(self):
+        pass
+
+
+class TextSink:
+    """A sink that writes the narration of each event to a stream (standard
+    output by default), one line per line of narration.
+
+    If buffered is True, the text is only written when flush() is called,
+    in a single write.
+    """
+
+    enabled = True
+
+    def __init__(self, stream=None, buffered=True):
+        self.stream = stream
+        self.buffered = buffered
+        self._lines = []
+
+    def emit(self, event):
+        text = event.text()
+        if text is not None:
+            self._lines.append(text)
+            if not self.buffered:
+                self.flush()
+
+    def flush(self):
+        if self._lines:
+            # Look up sys.stdout now rather than at construction, so that
+            # redirected output is respected.
+            stream = self.stream if self.stream is not None else sys.stdout
+            stream.write('\n'.join(self._lines) + '\n')
+            self._lines.clear()
+
+
+class CollectingSink:
+    """A sink that keeps every event in its .events list."""
+
+    enabled = True
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+    def flush(self):
+        pass
+
+    def of_type(self, eventType):
+        '''Returns the collected events of the given type.'''
+        return [event for event in self.events if isinstance(event, eventType)]
+
+    def text(self):
+        '''Returns the narration of the collected events, as TextSink would
+        write it.
+        '''
+        lines = [event.text() for event in self.events]
+        return ''.join(line + '\n' for line in lines if line is not None)
+
+
+# The sink used when none is given: prints each event straight away, like
+# the game always has.
+PRINT = TextSink(buffered=False)
+
+NULL = NullSink()
@@ -0,0 +1,312 @@
+"""
+Expectimax AI player.
+
+ExpectimaxPolicy is an engine.Policy that picks its attack / switch / heal
+action by searching the turn rules of pokemon_driver.execute_turn() (through
+engine.play_turn()):
+
+    - At max nodes the AI tries each of its own actions.
+    - Both players choose at the same time, so the AI can't know the
+      opponent's action. Instead, an opponent model gives a probability for
+      each of the opponent's actions, and the AI averages over them (a chance
+      node). By default, the opponent is expected to use its strongest attack,
+      as engine.GreedyPolicy does (see greedy_opponent()); with
+      predictable_opponent(), it only does most of the time. Every opponent
+      action the model allows multiplies the size of the search, so a
+      sharper model searches deeper in the same time.
+    - When both players attack with equally fast Pokemon, the turn order is
+      a coin flip, so both orders are played out and averaged (another
+      chance node).
+
+The search uses iterative deepening within a time budget: it searches one
+turn ahead, then two, and so on. A transposition table keyed on the battle
+state (see snapshot.py) avoids searching the same position twice at the same
+depth, and remembers the best action found at each position. That action is
+searched first at the next depth (move ordering), so when time runs out in
+the middle of a search, the actions that were already searched deeper can
+still be trusted.
+
+Forced switches after a faint, both in the real battle and inside the
+search, are chosen like engine.GreedyPolicy does.
+
+"""
+
+import time
+
+from pokemon_driver import AttackAction, SwitchAction, HealAction
+from engine import Policy, GreedyPolicy, play_turn
+from snapshot import take_snapshot, restore_snapshot
+
+
+# Search values are from the AI's point of view. Evaluated positions lie
+# between -1 and 1; decided battles are worth more than any position, and
+# winning sooner is worth more than winning later.
+WIN = 1000
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def greedy_opponent(options):
+    """The default opponent model. Takes the opponent's options, ordered
+    like ExpectimaxPolicy orders them (strongest attack first), and returns
+    a list of (probability, Action) pairs: the strongest attack, for
+    certain. If the opponent can't attack, each option is equally likely.
+    """
+
+    for action in options:
+        if isinstance(action, AttackAction):
+            return [(1.0, action)]
+
+    return _uniform(options)
+
+
+def predictable_opponent(options, focus=0.75):
+    """An opponent model for less predictable opponents. Takes the
+    opponent's options, ordered like greedy_opponent() takes them, and
+    returns a list of (probability, Action) pairs: the strongest attack gets
+    the given focus, and the rest is split evenly between the other attacks.
+    Healing and switching are not expected, unless the opponent can't
+    attack, in which case each option is equally likely.
+    """
+
+    attacks = [action for action in options if isinstance(action, AttackAction)]
+    if not attacks:
+        return _uniform(options)
+    if len(attacks) == 1:
+        return [(1.0, attacks[0])]
+
+    rest = (1 - focus) / (len(attacks) - 1)
+    return [(focus, attacks[0])] + [(rest, action) for action in attacks[1:]]
+
+
+def _uniform(options):
+    return [(1 / len(options), action) for action in options]
+
+
+class ExpectimaxPolicy(Policy):
+    """A Policy that chooses actions by expectimax search.
+
+    budgetMs: how long choose_action() may think, in milliseconds
+    maxDepth: the deepest search, in turns
+    opponentModel: a function that takes the opponent's options and returns
+                   (probability, Action) pairs (see greedy_opponent())
+    tableSize: the transposition table is cleared before a decision once
+               it holds more than this many positions
+    """
+
+    def __init__(
+        self,
+        budgetMs=100,
+        maxDepth=20,
+        opponentModel=greedy_opponent,
+        tableSize=200000,
+    ):
+        self.budgetMs = budgetMs
+        self.maxDepth = maxDepth
+        self.opponentModel = opponentModel
+        self.tableSize = tableSize
+
+        self.switchPolicy = GreedyPolicy()
+        self.table = {}
+        self._tablePlayers = None
+
+        # Statistics about the last decision.
+        self.depth = 0
+        self.nodes = 0
+
+    def choose_action(self, player, opponent):
+        self._deadline = time.perf_counter() + self.budgetMs / 1000
+        self.depth = 0
+        self.nodes = 0
+
+        # Table entries only describe the battle they were found in.
+        if len(self.table) > self.tableSize or self._tablePlayers != (player, opponent):
+            self.table.clear()
+            self._tablePlayers = (player, opponent)
+
+        root = take_snapshot(player, opponent)
+        options = self._options(player, opponent)
+        best = options[0]
+
+        for depth in range(1, self.maxDepth + 1):
+            self._order(options, root, depth)
+
+            # Search the root by hand, so that a search that runs out of time
+            # can still use the actions it finished.
+            bestValue = None
+            for action in options:
+                try:
+                    value = self._action_value(action, opponent, depth, root)
+                except _OutOfTime:
+                    restore_snapshot(player, opponent, root)
+                    break
+
+                if bestValue is None or value > bestValue:
+                    bestValue = value
+                    best = action
+            else:
+                self.depth = depth
+                self.table[(root, depth)] = (bestValue, option_key(best))
+
+                if abs(bestValue) >= WIN:
+                    # The outcome is decided; searching deeper won't change it.
+                    break
+
+                continue
+
+            break
+
+        return best
+
+    def choose_switch(self, player, opponent):
+        return self.switchPolicy.choose_switch(player, opponent)
+
+    def _max_node(self, player, opponent, depth):
+        # Returns the value of the position for the AI, searching depth more
+        # turns.
+        snapshot = take_snapshot(player, opponent)
+
+        entry = self.table.get((snapshot, depth))
+        if entry is not None:
+            return entry[0]
+
+        options = self._options(player, opponent)
+        self._order(options, snapshot, depth)
+
+        bestValue = None
+        bestAction = None
+        for action in options:
+            value = self._action_value(action, opponent, depth, snapshot)
+            if bestValue is None or value > bestValue:
+                bestValue = value
+                bestAction = action
+
+        # The table stores option keys rather than Actions, which belong to
+        # the Players they were made for.
+        self.table[(snapshot, depth)] = (bestValue, option_key(bestAction))
+        return bestValue
+
+    def _action_value(self, action, opponent, depth, snapshot):
+        # The expected value of the AI taking the given action, averaged
+        # over the opponent model.
+        replies = self.opponentModel(self._options(opponent, action.player))
+
+        value = 0
+        for probability, reply in replies:
+            if probability > 0:
+                value += probability * self._turn_value(action, reply, depth, snapshot)
+
+        return value
+
+    def _turn_value(self, action, reply, depth, snapshot):
+        if (
+            isinstance(action, AttackAction)
+            and isinstance(reply, AttackAction)
+            and action.player.current_pokemon.speed == reply.player.current_pokemon.speed
+        ):
+            # Speed tie: a chance node.
+            return (
+                self._outcome(action, reply, depth, snapshot, True)
+                + self._outcome(action, reply, depth, snapshot, False)
+            ) / 2
+
+        return self._outcome(action, reply, depth, snapshot, None)
+
+    def _outcome(self, action, reply, depth, snapshot, aiFirst):
+        # Plays one turn, scores the resulting position, and puts the battle
+        # back the way it was.
+        if time.perf_counter() > self._deadline:
+            raise _OutOfTime
+
+        self.nodes += 1
+
+        player = action.player
+        opponent = reply.player
+        result = play_turn(
+            action, reply, self.switchPolicy, self.switchPolicy, aiFirst,
+        )
+
+        if result.gameOver:
+            if result.winner is player:
+                value = WIN + depth
+            elif result.winner is opponent:
+                value = -WIN - depth
+            else:
+                value = 0
+        elif depth == 1:
+            value = evaluate(player, opponent)
+        else:
+            value = self._max_node(player, opponent, depth - 1)
+
+        restore_snapshot(player, opponent, snapshot)
+        return value
+
+    def _order(self, options, snapshot, depth):
+        # Moves the best action found by a shallower search of this position
+        # to the front.
+        for shallower in range(depth - 1, 0, -1):
+            entry = self.table.get((snapshot, shallower))
+            if entry is not None:
+                bestKey = entry[1]
+                options.sort(key=lambda action: option_key(action) != bestKey)
+                return
+
+    def _options(self, player, opponent):
+        # Every sensible action for the player, most promising first:
+        # attacks by damage, then healing, then switching.
+        current = player.current_pokemon
+        target = opponent.current_pokemon
+
+        attacks = sorted(
+            current.moves,
+            key=lambda move: move.power * move.get_multiplier_against(target),
+            reverse=True,
+        )
+        options = [AttackAction(player, move.name, opponent) for move in attacks]
+
+        if current.hp < current.max_hp:
+            options.append(HealAction(player))
+
+        for pokemon in player.pokemon_party:
+            if pokemon is not current and pokemon.is_alive():
+                options.append(SwitchAction(player, pokemon.name))
+
+        if not options:
+            # A Pokemon with no moves, at full HP, and no one to switch to:
+            # healing (which does nothing) is all that's left.
+            options.append(HealAction(player))
+
+        return options
+
+
+def evaluate(player, opponent):
+    """Scores a battle position from the given player's point of view,
+    between -1 (only the opponent has any HP) and 1 (only the player does).
+    """
+
+    return _health(player) - _health(opponent)
+
+
+def _health(player):
+    hp = 0
+    maxHp = 0
+    for pokemon in player.pokemon_party:
+        hp += pokemon.hp
+        maxHp += pokemon.max_hp
+
+    return hp / maxHp if maxHp else 0
+
+
+def option_key(action):
+    """Returns a hashable key that identifies an action independently of
+    the Action object, e.g. ('attack', 'Tackle') or ('switch', 'Pikachu').
+    """
+
+    if isinstance(action, AttackAction):
+        return ('attack', action.moveName)
+    elif isinstance(action, SwitchAction):
+        return ('switch', action.pokemonName)
+    else:
+        return (type(action).__name__,)
@@ -0,0 +1,267 @@
+"""
+Asyncio matchmaking: pairs queued players by rating, and hands the pairs to
+battle workers.
+
+Players join a Matchmaker's queue with a team (which must pass
+compatibility_checker.check_team()) and a rating. Two entrants are paired
+when their ratings are within both of their windows. A window starts at
+`window` rating points, and widens by `widenRate` points per second spent
+waiting (up to `maxWindow`), so that players are paired with close opponents
+when there are any, and with farther ones rather than not at all.
+
+    matchmaker = Matchmaker()
+    matchmaker.start(battle)       # battle(entrant1, entrant2) is a coroutine
+    entrant = matchmaker.join("Ash", pokemon_team.create_team(), 1500)
+    opponent = await entrant.match
+
+The queue is kept sorted by rating. A new entrant is paired at once with the
+closer of its two neighbours, if either is within its window; everyone else
+is reconsidered every `interval` seconds, as windows widen, in one pass over
+the queue. Pairs go to self.pairs, an asyncio.Queue, which start() serves
+with `workers` tasks that each await battle(entrant1, entrant2) for one pair
+at a time.
+
+"""
+
+import math
+import asyncio
+import itertools
+import traceback
+from bisect import bisect_left, bisect_right
+
+from pokemon import Player
+from ratings import DEFAULT_RATING
+from compatibility_checker import check_team
+
+
+class Entrant:
+    """A player waiting in (or paired by) a Matchmaker.
+
+    match is a future: the opponent Entrant, once paired (it is cancelled if
+    the entrant leaves the queue first). client is whatever the caller passed
+    to join(), e.g. the connection the player is on.
+    """
+
+    __slots__ = ('number', 'name', 'player', 'rating', 'client', 'joined', 'paired', 'match')
+
+    def __init__(self, number, name, player, rating, client, joined, match):
+        self.number = number
+        self.name = name
+        self.player = player
+        self.rating = rating
+        self.client = client
+        self.joined = joined
+        self.paired = None
+        self.match = match
+
+    @property
+    def latency(self):
+        '''Seconds from joining the queue to being paired, or None.'''
+        return self.paired - self.joined if self.paired is not None else None
+
+    def __repr__(self):
+        return f"Entrant({self.name!r}, {self.rating})"
+
+
+class Matchmaker:
+    """A queue of players waiting for battles (see the top of this file).
+
+    window: the rating difference every entrant accepts from the start
+    widenRate: how much windows widen per second spent waiting
+    maxWindow: the widest a window gets (default: no limit)
+    interval: seconds between passes over the queue
+    checkTeams: whether to check teams with check_team() as they join
+    """
+
+    def __init__(
+        self,
+        window=100,
+        widenRate=50,
+        maxWindow=math.inf,
+        interval=0.1,
+        checkTeams=True,
+    ):
+        self.window = window
+        self.widenRate = widenRate
+        self.maxWindow = maxWindow
+        self.interval = interval
+        self.checkTeams = checkTeams
+
+        self.pairs = asyncio.Queue()
+
+        # Statistics.
+        self.joined = 0
+        self.paired = 0
+        self.totalLatency = 0.0
+
+        # The queue, sorted by rating, and the ratings (for bisect).
+        self._entrants = []
+        self._ratings = []
+        self._numbers = itertools.count(1)
+        self._tasks = []
+
+    def __len__(self):
+        return len(self._entrants)
+
+    def join(self, name, team, rating=DEFAULT_RATING, client=None):
+        '''Queues a player with the given team (a list of Pokemon) and
+        rating, and returns their Entrant. Raises ValueError if the team
+        doesn't pass check_team().
+        '''
+        if self.checkTeams:
+            errors = check_team(team, report=False)
+            if errors:
+                raise ValueError(' '.join(errors))
+
+        loop = asyncio.get_running_loop()
+        entrant = Entrant(
+            next(self._numbers), name, Player(name, team), rating, client,
+            loop.time(), loop.create_future(),
+        )
+        self.joined += 1
+
+        # Pair with the closer neighbour, if either is within this entrant's
+        # window (every other window is at least as wide).
+        index = bisect_left(self._ratings, rating)
+        best = None
+        bestDistance = self.window
+
+        for neighbour in (index - 1, index):
+            if 0 <= neighbour < len(self._entrants):
+                distance = abs(self._ratings[neighbour] - rating)
+                if distance <= bestDistance:
+                    best = neighbour
+                    bestDistance = distance
+
+        if best is not None:
+            opponent = self._entrants.pop(best)
+            del self._ratings[best]
+            self._pair(opponent, entrant, entrant.joined)
+        else:
+            self._entrants.insert(index, entrant)
+            self._ratings.insert(index, rating)
+
+        return entrant
+
+    def leave(self, entrant):
+        '''Takes an entrant out of the queue, if they haven't been paired.
+        Returns whether they were still waiting.
+        '''
+        start = bisect_left(self._ratings, entrant.rating)
+        end = bisect_right(self._ratings, entrant.rating, start)
+
+        for index in range(start, end):
+            if self._entrants[index] is entrant:
+                del self._entrants[index]
+                del self._ratings[index]
+                entrant.match.cancel()
+                return True
+
+        return False
+
+    def window_of(self, entrant, now):
+        '''Returns the rating difference the entrant accepts at time now.'''
+        return min(self.window + self.widenRate * (now - entrant.joined), self.maxWindow)
+
+    def sweep(self):
+        '''Pairs every waiting entrant whose window (and whose opponent's)
+        has widened enough, in one pass over the queue. Returns the number
+        of pairs made.
+        '''
+        now = asyncio.get_running_loop().time()
+        window = self.window
+        widenRate = self.widenRate
+        maxWindow = self.maxWindow
+
+        waiting = []
+        pairs = []
+
+        # Walk up the ratings, holding on to one unpaired entrant: whoever
+        # reaches higher (the one who has waited longer, if both do).
+        pending = None
+        pendingRating = pendingWindow = 0
+
+        for entrant in self._entrants:
+            rating = entrant.rating
+            entrantWindow = min(window + widenRate * (now - entrant.joined), maxWindow)
+
+            if pending is not None and rating - pendingRating <= min(pendingWindow, entrantWindow):
+                pairs.append((pending, entrant))
+                pending = None
+                continue
+
+            if pending is None or rating + entrantWindow >= pendingRating + pendingWindow:
+                if pending is not None:
+                    waiting.append(pending)
+                pending = entrant
+                pendingRating = rating
+                pendingWindow = entrantWindow
+            else:
+                waiting.append(entrant)
+
+        if not pairs:
+            return 0
+
+        if pending is not None:
+            waiting.append(pending)
+        waiting.sort(key=_rating)
+
+        self._entrants = waiting
+        self._ratings = [entrant.rating for entrant in waiting]
+
+        for entrant1, entrant2 in pairs:
+            self._pair(entrant1, entrant2, now)
+
+        return len(pairs)
+
+    def _pair(self, entrant1, entrant2, now):
+        for entrant, opponent in ((entrant1, entrant2), (entrant2, entrant1)):
+            entrant.paired = now
+            self.totalLatency += now - entrant.joined
+            if not entrant.match.done():
+                entrant.match.set_result(opponent)
+
+        self.paired += 2
+        self.pairs.put_nowait((entrant1, entrant2))
+
+    def start(self, battle=None, workers=1):
+        '''Starts passing over the queue every self.interval seconds, and
+        (if a battle coroutine function is given) `workers` tasks that each
+        await battle(entrant1, entrant2) for one pair at a time.
+        '''
+        self._tasks.append(asyncio.create_task(self._sweep_forever()))
+
+        if battle is not None:
+            for _ in range(workers):
+                self._tasks.append(asyncio.create_task(self._battle_forever(battle)))
+
+    async def close(self):
+        '''Stops the tasks start() started, and empties the queue.'''
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for entrant in self._entrants:
+            entrant.match.cancel()
+        self._entrants = []
+        self._ratings = []
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.sweep()
+
+    async def _battle_forever(self, battle):
+        while True:
+            entrant1, entrant2 = await self.pairs.get()
+            try:
+                await battle(entrant1, entrant2)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                self.pairs.task_done()
+
+
+def _rating(entrant):
+    return entrant.rating
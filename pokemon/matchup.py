@@ -0,0 +1,225 @@
+"""
+Precomputed matchups between the Pokemon of two (or more) parties.
+
+Choosing a move means working out move.power * move.get_multiplier_against()
+for every move of the attacker, every time. A MatchupCache does that once
+for every (attacker, defender) pair of Pokemon from different parties, and
+keeps, for each pair, a Matchup holding:
+
+    - the damage each of the attacker's moves does to the defender
+    - the best move (the most damaging; ties go to the move listed first,
+      as with engine.best_move())
+    - how many turns the best move takes to knock the defender out, from
+      each whole number of HP up to its max_hp
+
+so "what's my best move" becomes a dictionary lookup:
+
+    matchups = MatchupCache(player1.pokemon_party, player2.pokemon_party)
+    move = matchups.best_move(attacker, defender)
+
+Matchups only depend on the Pokemon's moves, type and max_hp (not their
+current HP, nor their speed, which decides who attacks first but not how
+much damage is done), so battles, healing and resets never invalidate them.
+Changing any of those bumps the Pokemon's version (see pokemon.py), and each
+Matchup remembers the versions of its two Pokemon, so a lookup that finds
+one out of date rebuilds just that Matchup. refresh() and invalidate() are
+there for Pokemon-like objects without a version.
+
+"""
+
+import math
+
+
+class Matchup:
+    """What one Pokemon can do to another."""
+
+    __slots__ = (
+        'attacker', 'defender', 'attackerVersion', 'defenderVersion', 'moves', 'damages',
+        'bestMove', 'bestDamage', 'turnsToKO',
+    )
+
+    def __init__(self, attacker, defender):
+        self.attacker = attacker
+        self.defender = defender
+        self.attackerVersion = getattr(attacker, 'version', None)
+        self.defenderVersion = getattr(defender, 'version', None)
+        self.moves = tuple(attacker.moves)
+        self.damages = tuple(
+            move.power * move.get_multiplier_against(defender) for move in self.moves
+        )
+
+        self.bestMove = None
+        self.bestDamage = -1
+        for move, damage in zip(self.moves, self.damages):
+            if damage > self.bestDamage:
+                self.bestMove = move
+                self.bestDamage = damage
+
+        # turnsToKO[hp] for every whole number of HP up to max_hp.
+        self.turnsToKO = tuple(
+            self._turns(hp) for hp in range(int(defender.max_hp) + 1)
+        )
+
+    def damage(self, move):
+        '''Returns the damage the given move (one of the attacker's) does.'''
+        return self.damages[self.moves.index(move)]
+
+    def turns_to_ko(self, hp=None):
+        '''Returns the number of turns the best move takes to knock out the
+        defender from the given HP (default: its current HP), or math.inf if
+        the best move does no damage.
+        '''
+        if hp is None:
+            hp = self.defender.hp
+        if hp <= 0:
+            # Negative indexes would count back from max_hp.
+            return 0
+
+        try:
+            return self.turnsToKO[hp]
+        except (IndexError, TypeError):
+            # HP isn't a whole number, or is above max_hp.
+            return self._turns(hp)
+
+    def _turns(self, hp):
+        if hp <= 0:
+            return 0
+        if self.bestDamage <= 0:
+            return math.inf
+        return math.ceil(hp / self.bestDamage)
+
+    def __repr__(self):
+        return (
+            f"Matchup({self.attacker.name} -> {self.defender.name}: "
+            f"{self.bestMove.name if self.bestMove is not None else None}, "
+            f"{self.bestDamage})"
+        )
+
+
+def fingerprint(pokemon):
+    """Returns a value that changes whenever the Pokemon's moves or stats
+    (other than its current HP) change.
+    """
+
+    return (
+        pokemon.type,
+        pokemon.max_hp,
+        pokemon.speed,
+        tuple((move.name, move.power, move.type) for move in pokemon.moves),
+    )
+
+
+class MatchupCache:
+    """Matchups between every pair of Pokemon from different parties.
+
+    Matchups for other pairs are built the first time they are asked for.
+    """
+
+    def __init__(self, *parties):
+        # attacker -> {defender: Matchup}
+        self._matchups = {}
+        # Pokemon -> fingerprint()
+        self._fingerprints = {}
+
+        for index, party in enumerate(parties):
+            for otherParty in parties[index + 1:]:
+                for pokemon in party:
+                    for other in otherParty:
+                        self.get(pokemon, other)
+                        self.get(other, pokemon)
+
+    def get(self, attacker, defender):
+        '''Returns the Matchup of the attacker against the defender.'''
+        try:
+            matchup = self._matchups[attacker][defender]
+        except KeyError:
+            matchup = None
+
+        if matchup is not None:
+            if (matchup.attackerVersion == getattr(attacker, 'version', None)
+                    and matchup.defenderVersion == getattr(defender, 'version', None)):
+                return matchup
+
+            # Out of date.
+            self._fingerprints[attacker] = fingerprint(attacker)
+            self._fingerprints[defender] = fingerprint(defender)
+
+        for pokemon in (attacker, defender):
+            if pokemon not in self._fingerprints:
+                self._fingerprints[pokemon] = fingerprint(pokemon)
+                self._matchups.setdefault(pokemon, {})
+
+        matchup = Matchup(attacker, defender)
+        self._matchups[attacker][defender] = matchup
+        return matchup
+
+    def best_move(self, attacker, defender):
+        '''Returns the attacker's most damaging move against the defender.'''
+        try:
+            matchup = self._matchups[attacker][defender]
+            if (matchup.attackerVersion == attacker.version
+                    and matchup.defenderVersion == defender.version):
+                return matchup.bestMove
+        except (KeyError, AttributeError):
+            pass
+
+        return self.get(attacker, defender).bestMove
+
+    def best_damage(self, attacker, defender):
+        '''Returns the damage of the attacker's best move against the
+        defender.
+        '''
+        try:
+            matchup = self._matchups[attacker][defender]
+            if (matchup.attackerVersion == attacker.version
+                    and matchup.defenderVersion == defender.version):
+                return matchup.bestDamage
+        except (KeyError, AttributeError):
+            pass
+
+        return self.get(attacker, defender).bestDamage
+
+    def turns_to_ko(self, attacker, defender, hp=None):
+        '''Returns the number of turns the attacker's best move takes to
+        knock out the defender from the given HP (default: its current HP).
+        '''
+        return self.get(attacker, defender).turns_to_ko(hp)
+
+    def invalidate(self, pokemon):
+        '''Forgets every matchup of the given Pokemon, so that they are
+        rebuilt (from its current moves and stats) when next asked for.
+        '''
+        self._fingerprints.pop(pokemon, None)
+        self._matchups.pop(pokemon, None)
+        for defenders in self._matchups.values():
+            defenders.pop(pokemon, None)
+
+    def refresh(self):
+        '''Rebuilds the matchups of every Pokemon whose moves or stats have
+        changed since its matchups were built. Returns the number of
+        Pokemon that had changed.
+
+        Lookups notice changes to Pokemon by themselves (see the top of
+        this file); this is for objects without a version.
+        '''
+        changed = [
+            pokemon for pokemon, oldFingerprint in self._fingerprints.items()
+                if fingerprint(pokemon) != oldFingerprint
+        ]
+
+        for pokemon in changed:
+            pairs = [(pokemon, defender) for defender in self._matchups.get(pokemon, ())]
+            pairs += [
+                (attacker, pokemon)
+                for attacker, defenders in self._matchups.items()
+                    if pokemon in defenders and attacker is not pokemon
+            ]
+
+            self.invalidate(pokemon)
+            for attacker, defender in pairs:
+                self.get(attacker, defender)
+
+        return len(changed)
+
+    def __len__(self):
+        return sum(len(defenders) for defenders in self._matchups.values())
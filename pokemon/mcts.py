@@ -0,0 +1,275 @@
+"""
+Monte Carlo Tree Search AI player.
+
+MCTSPolicy is an engine.Policy that chooses its action by Monte Carlo Tree
+Search over engine.play_turn(), which follows the rules of
+pokemon_driver.execute_turn():
+
+    - Each iteration walks down a tree of the AI's own actions, picking
+      actions with the UCB1 rule and taking the opponent's reply from
+      engine.GreedyPolicy, the same opponent model expectimax.py uses (the
+      tree is "open loop": a node stands for a sequence of the AI's
+      actions, whatever the opponent did in between).
+    - It adds one new node, then finishes the battle with a greedy playout
+      (both sides play GreedyPolicy), and counts a win as 1, a loss as 0
+      and a draw as 0.5. Playouts that run too long are scored with
+      expectimax.evaluate().
+    - The battle is put back the way it was with snapshot.py.
+
+Search is root-parallel: several worker processes each grow their own tree
+from the current position with a different random seed, and the visit
+counts of the root actions are added up before the most visited action is
+chosen. The worker processes are started the first time they are needed,
+and shut down by MCTSPolicy.close(), at the end of a with block:
+
+    with MCTSPolicy(thinkMs=50) as policy:
+        result = engine.run_battle(player1, player2, policy, GreedyPolicy())
+
+or, failing that, when the policy is garbage collected.
+
+"""
+
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pokemon_driver import AttackAction, SwitchAction, HealAction
+from engine import Policy, GreedyPolicy, play_turn
+from expectimax import evaluate, option_key
+from snapshot import take_snapshot, restore_snapshot
+
+
+class _Node:
+    __slots__ = ('visits', 'value', 'children')
+
+    def __init__(self):
+        self.visits = 0
+        self.value = 0.0
+        self.children = {}
+
+
+def _options(player, opponent):
+    # Every sensible action for the player: each attack, healing (unless the
+    # current Pokemon is at full health), and switching to each other
+    # Pokemon that can battle.
+    current = player.current_pokemon
+    actions = [AttackAction(player, move.name, opponent) for move in current.moves]
+
+    if current.hp < current.max_hp:
+        actions.append(HealAction(player))
+
+    for pokemon in player.pokemon_party:
+        if pokemon is not current and pokemon.is_alive():
+            actions.append(SwitchAction(player, pokemon.name))
+
+    if not actions:
+        # A Pokemon with no moves, at full HP, and no one to switch to:
+        # healing (which does nothing) is all that's left.
+        actions.append(HealAction(player))
+
+    return actions
+
+
+def search(player, opponent, thinkMs, seed, exploration=1.4, maxRolloutTurns=200):
+    """Grows one search tree from the current battle position for thinkMs
+    milliseconds, and returns (stats, playouts): a dict mapping an option
+    key for each root action (see expectimax) to its (visits, total value),
+    and the number of playouts played.
+
+    The battle is left exactly as it was.
+    """
+
+    rng = random.Random(seed)
+    rollout = GreedyPolicy()
+    root = _Node()
+    start = take_snapshot(player, opponent)
+    deadline = time.perf_counter() + thinkMs / 1000
+    playouts = 0
+
+    while True:
+        path = [root]
+        node = root
+        result = None
+        expanded = False
+
+        # Selection and expansion. A node is only walked into by playing
+        # its turn, so the battle can't be over at any node selected from:
+        # the walk stops at the turn that ends it.
+        while not expanded:
+            actions = _options(player, opponent)
+            action = _select(node, actions, exploration)
+            key = option_key(action)
+
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = _Node()
+                expanded = True
+
+            path.append(child)
+            node = child
+
+            reply = rollout.choose_action(opponent, player)
+            result = play_turn(action, reply, rollout, rollout, rng=rng)
+            if result.gameOver:
+                break
+
+        # Playout.
+        turns = 0
+        while not result.gameOver and turns < maxRolloutTurns:
+            result = play_turn(
+                rollout.choose_action(player, opponent),
+                rollout.choose_action(opponent, player),
+                rollout,
+                rollout,
+                rng=rng,
+            )
+            turns += 1
+
+        if not result.gameOver:
+            # Cut off: score the position instead.
+            value = (1 + evaluate(player, opponent)) / 2
+        elif result.winner is player:
+            value = 1.0
+        elif result.winner is opponent:
+            value = 0.0
+        else:
+            value = 0.5
+
+        for visited in path:
+            visited.visits += 1
+            visited.value += value
+
+        restore_snapshot(player, opponent, start)
+        playouts += 1
+
+        if time.perf_counter() > deadline:
+            break
+
+    stats = {
+        key: (child.visits, child.value) for key, child in root.children.items()
+    }
+    return stats, playouts
+
+
+def _select(node, actions, exploration):
+    # UCB1 over the actions available right now; untried actions first.
+    # _options() always offers at least one.
+    if not actions:
+        raise ValueError("no actions to select from")
+
+    logVisits = math.log(node.visits) if node.visits else 0
+    best = None
+    bestScore = -1
+
+    for action in actions:
+        child = node.children.get(option_key(action))
+        if child is None or child.visits == 0:
+            return action
+
+        score = child.value / child.visits + exploration * math.sqrt(
+            logVisits / child.visits
+        )
+        if score > bestScore:
+            best = action
+            bestScore = score
+
+    return best
+
+
+class MCTSPolicy(Policy):
+    """A Policy that chooses actions by root-parallel Monte Carlo Tree Search.
+
+    thinkMs: how long each worker searches per decision, in milliseconds
+    workers: the number of worker processes (default: one per CPU).
+             With 1 worker, the search runs in this process.
+    seed: seeds the searches, for repeatable decisions
+
+    With more than one worker, use it in a with block, or call close() when
+    done with it, to shut the worker processes down (see the top of this
+    file).
+    """
+
+    def __init__(
+        self,
+        thinkMs=100,
+        workers=None,
+        exploration=1.4,
+        maxRolloutTurns=200,
+        seed=None,
+    ):
+        self.thinkMs = thinkMs
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.exploration = exploration
+        self.maxRolloutTurns = maxRolloutTurns
+        self.rng = random.Random(seed)
+
+        self.switchPolicy = GreedyPolicy()
+        self._executor = None
+
+        # Statistics about the last decision.
+        self.playouts = 0
+        self.visits = {}
+
+    def choose_action(self, player, opponent):
+        seeds = [self.rng.getrandbits(64) for _ in range(self.workers)]
+        args = (self.exploration, self.maxRolloutTurns)
+
+        if self.workers == 1:
+            results = [search(player, opponent, self.thinkMs, seeds[0], *args)]
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+            futures = [
+                self._executor.submit(
+                    search, player, opponent, self.thinkMs, seed, *args,
+                )
+                for seed in seeds
+            ]
+            results = [future.result() for future in futures]
+
+        # Merge the root statistics of every tree.
+        visits = {}
+        self.playouts = 0
+        for stats, playouts in results:
+            self.playouts += playouts
+            for key, (count, _) in stats.items():
+                visits[key] = visits.get(key, 0) + count
+
+        self.visits = visits
+
+        actions = _options(player, opponent)
+        return max(actions, key=lambda action: visits.get(option_key(action), 0))
+
+    def choose_switch(self, player, opponent):
+        return self.switchPolicy.choose_switch(player, opponent)
+
+    def reseed(self, rng):
+        self.rng = rng
+
+    def close(self):
+        '''Shuts down the worker processes, if any were started.'''
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excInfo):
+        self.close()
+
+    def __del__(self):
+        # Don't wait for the workers: this may run in the middle of
+        # anything.
+        executor = getattr(self, '_executor', None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def __getstate__(self):
+        # Worker pools can't be pickled.
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        return state
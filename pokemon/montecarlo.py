@@ -0,0 +1,141 @@
+"""
+Monte Carlo estimate of how likely one Player's lineup is to beat another's.
+
+A single battle says little about which team is stronger: speed ties are
+decided by a coin flip, and policies such as engine.RandomPolicy are random
+too. estimate_win_probability() replays the same matchup with the headless
+engine, in batches, until the confidence interval around the win probability
+is tight enough (or a battle limit is reached). Lopsided matchups therefore
+stop after a few hundred battles instead of running the full budget.
+
+Each battle gets its own random streams derived from one seed (see
+seeding.py), so an estimate with a given seed can be reproduced exactly.
+
+"""
+
+import math
+from statistics import NormalDist
+
+from engine import run_battle, reset_player
+from seeding import spawn, master_seed
+
+
+class WinEstimate:
+    """The result of estimate_win_probability()."""
+
+    def __init__(self, wins, losses, draws, lower, upper, confidence):
+        self.wins = wins
+        self.losses = losses
+        self.draws = draws
+
+        # Confidence interval for the probability that player 1 wins.
+        self.lower = lower
+        self.upper = upper
+        self.confidence = confidence
+
+    @property
+    def battles(self):
+        return self.wins + self.losses + self.draws
+
+    @property
+    def probability(self):
+        '''The fraction of battles that player 1 won.'''
+        return self.wins / self.battles if self.battles else 0.0
+
+    def __repr__(self):
+        return (
+            f"WinEstimate(p={self.probability:.3f}, "
+            f"{self.confidence:.0%} CI=[{self.lower:.3f}, {self.upper:.3f}], "
+            f"battles={self.battles})"
+        )
+
+
+def wilson_interval(successes, trials, confidence=0.95):
+    """Returns the (lower, upper) Wilson score interval for a binomial
+    proportion. Unlike the normal approximation, it behaves well for
+    proportions close to 0 or 1, which is exactly where early stopping
+    saves the most battles.
+    """
+
+    if trials == 0:
+        return 0.0, 1.0
+
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    spread = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+
+    return max(0.0, center - spread), min(1.0, center + spread)
+
+
+def estimate_win_probability(
+    player1,
+    player2,
+    p1Policy,
+    p2Policy,
+    halfWidth=0.02,
+    confidence=0.95,
+    minBattles=100,
+    maxBattles=100000,
+    batchSize=100,
+    maxTurns=1000,
+    seed=None,
+):
+    """Repeatedly battles player1 against player2 (healing both teams
+    between battles) and estimates the probability that player1 wins.
+
+    Stops once the confidence interval is no wider than +/- halfWidth, after
+    at least minBattles battles, or after maxBattles battles regardless.
+    The interval is checked after every batchSize battles. Draws count as
+    not winning.
+
+    Battle n rolls its speed ties with a random stream derived from the
+    given seed (a fresh random seed by default), and reseeds both Policies
+    with streams of their own. The Policies are reseeded in place, so their
+    random state afterwards is the last battle's, not what it was before:
+    pass copies to keep it.
+
+    Raises ValueError if batchSize or maxBattles isn't positive.
+
+    Returns a WinEstimate.
+    """
+
+    if batchSize <= 0:
+        raise ValueError(f"batchSize must be positive, not {batchSize!r}")
+    if maxBattles <= 0:
+        raise ValueError(f"maxBattles must be positive, not {maxBattles!r}")
+
+    seed = master_seed(seed)
+    wins = losses = draws = 0
+    lower, upper = 0.0, 1.0
+
+    while wins + losses + draws < maxBattles:
+        for _ in range(min(batchSize, maxBattles - wins - losses - draws)):
+            battle = wins + losses + draws
+            reset_player(player1)
+            reset_player(player2)
+            p1Policy.reseed(spawn(seed, battle, 1))
+            p2Policy.reseed(spawn(seed, battle, 2))
+
+            result = run_battle(
+                player1,
+                player2,
+                p1Policy,
+                p2Policy,
+                maxTurns,
+                rng=spawn(seed, battle),
+            )
+            if result.winner is player1:
+                wins += 1
+            elif result.winner is player2:
+                losses += 1
+            else:
+                draws += 1
+
+        battles = wins + losses + draws
+        lower, upper = wilson_interval(wins, battles, confidence)
+        if battles >= minBattles and (upper - lower) / 2 <= halfWidth:
+            break
+
+    return WinEstimate(wins, losses, draws, lower, upper, confidence)
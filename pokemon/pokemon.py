@@ -1,4 +1,73 @@
+from type_chart import EFFECTIVENESS, type_id
+
+
+class NameIndex(list):
+    """
+    a list of objects that have a .name, which can also
+    find the first object with a given name without
+    searching the whole list
+
+    the name -> object dictionary is rebuilt the next
+    time it is needed after the list changes
+    (renaming an object that is already in the list
+    is not noticed)
+
+    a Pokemon's moves are kept in a NameIndex owned
+    by the Pokemon, which is told when they change
+    """
+
+    __slots__ = ('_byName', '_owner')
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self._byName = None
+        self._owner = None
+
+    def __reduce__(self):
+        # copies have no owner until a Pokemon takes them
+        return (NameIndex, (list(self),))
+
+    def find(self, name, default):
+        """
+        return the first object with the given name,
+        or default if there is none
+        """
+        byName = self._byName
+        if byName is None:
+            byName = {}
+            for item in self:
+                byName.setdefault(item.name, item)
+            self._byName = byName
+
+        return byName.get(name, default)
+
+
+def _forget_names(method):
+    def changed(self, *args):
+        self._byName = None
+        owner = self._owner
+        if owner is None:
+            return method(self, *args)
+
+        oldMoves = list(self)
+        result = method(self, *args)
+        owner._moves_changed(oldMoves)
+        return result
+
+    changed.__name__ = method.__name__
+    return changed
+
+
+for _methodName in (
+    '__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend',
+    'insert', 'pop', 'remove', 'clear', 'sort', 'reverse',
+):
+    setattr(NameIndex, _methodName, _forget_names(getattr(list, _methodName)))
+
+
 class Player:
+    __slots__ = ('name', '_pokemon_party', 'current_pokemon')
+
     def __init__(self, name, pokemon_party):
         """
         name: string
@@ -12,7 +81,20 @@ class Player:
         self.pokemon_party = pokemon_party
         self.current_pokemon = pokemon_party[0]
 
-      
+    @property
+    def pokemon_party(self):
+        return self._pokemon_party
+
+    @pokemon_party.setter
+    def pokemon_party(self, pokemon_party):
+        """
+        keep the party in a NameIndex so that
+        get_pokemon() doesn't have to search it
+        """
+        if not isinstance(pokemon_party, NameIndex):
+            pokemon_party = NameIndex(pokemon_party)
+        self._pokemon_party = pokemon_party
+
     def list_pokemon(self): #worked 
         """
         Using a for loop, print the pokemon's name
@@ -31,18 +113,15 @@ class Player:
 
     def get_pokemon(self, pokemon_name):
         """
-        Use a for loop to search for and return a 
-        pokemon from the list of pokemon that has the given pokemon_name
+        Look up and return the first pokemon from the
+        list of pokemon that has the given pokemon_name
         
         pokemon_name: string
         
         if the pokemon does not exist, return 
         INVALID_POKEMON
         """
-        for pokemon in self.pokemon_party: 
-          if pokemon.name == pokemon_name: 
-            return pokemon
-        return "Invalid Pokemon"
+        return self._pokemon_party.find(pokemon_name, INVALID_POKEMON)
 
         
     def switch(self, pokemon_name): #worked 
@@ -103,6 +182,16 @@ class Player:
 
 
 class Pokemon:
+    """
+    version counts the changes made to this Pokemon's
+    moves, type and max_hp since it was made (including
+    changes to the Move objects themselves), so that
+    caches of what it can do (see matchup.py) can tell
+    when they are out of date
+    """
+
+    __slots__ = ('name', 'hp', '_moves', '_type', 'type_id', 'speed', '_max_hp', 'version')
+
     def __init__(self, name, hp, moves, type, speed):
         """
         name, type: string
@@ -114,10 +203,80 @@ class Pokemon:
         """
         self.name = name 
         self.hp = hp
-        self.moves = moves 
-        self.type = type 
+        self.version = 0
+        self._set_moves(moves)
+        self._set_type(type)
         self.speed = speed
-        self.max_hp = self.hp
+        self._max_hp = self.hp
+
+    @property
+    def moves(self):
+        return self._moves
+
+    @moves.setter
+    def moves(self, moves):
+        """
+        keep the moves in a NameIndex so that
+        get_move() doesn't have to search them
+        """
+        oldMoves = self._moves
+        oldMoves._owner = None
+        self._set_moves(moves)
+        self._moves_changed(oldMoves)
+
+    def _set_moves(self, moves):
+        if not isinstance(moves, NameIndex) or moves._owner is not None:
+            moves = NameIndex(moves)
+        moves._owner = self
+        self._moves = moves
+
+        for move in moves:
+            move._add_owner(self)
+
+    def _moves_changed(self, oldMoves):
+        # oldMoves are the moves from before the change
+        for move in oldMoves:
+            if move not in self._moves:
+                move._remove_owner(self)
+        for move in self._moves:
+            move._add_owner(self)
+
+        self.version += 1
+
+    @property
+    def type(self):
+        return self._type
+
+    @type.setter
+    def type(self, type):
+        """
+        also keep the type's id from the type chart
+        in type_id
+        """
+        self._set_type(type)
+        self.version += 1
+
+    def _set_type(self, type):
+        self._type = type
+        self.type_id = type_id(type)
+
+    @property
+    def max_hp(self):
+        return self._max_hp
+
+    @max_hp.setter
+    def max_hp(self, max_hp):
+        self._max_hp = max_hp
+        self.version += 1
+
+    def __setstate__(self, state):
+        """
+        copies and unpickled Pokemon are owners of
+        their moves too
+        """
+        for name, value in state[1].items():
+            object.__setattr__(self, name, value)
+        self._set_moves(self._moves)
 
     def is_alive(self): #worked 
         """
@@ -138,19 +297,15 @@ class Pokemon:
 
     def get_move(self, move_name):
         """
-        Use a for loop to search for and return a 
-        move from the list of moves that has the 
-        given move_name
+        Look up and return the first move from the
+        list of moves that has the given move_name
         
         move_name: string
         
         if the move does not exist, return 
         INVALID_MOVE
         """
-        for move in self.moves:
-          if move.name == move_name: 
-            return move
-        return INVALID_MOVE
+        return self._moves.find(move_name, INVALID_MOVE)
           
 
     def take_damage(self, damage_amount): #worked
@@ -193,59 +348,70 @@ class Pokemon:
 
 
 class Move:
+    __slots__ = ('name', 'power', '_type', 'type_id', '_owners')
+
     def __init__(self, name, power, type):
+        # the Pokemon that know this move (none yet, so
+        # setting the rest tells no one)
+        object.__setattr__(self, '_owners', ())
         self.name = name
         self.power = power
-        self.type = type
+        self._type = type
+        self.type_id = type_id(type)
+
+    def __setattr__(self, name, value):
+        """
+        a change to a move is a change to every Pokemon
+        that knows it (power is read on every attack,
+        so it isn't a property)
+        """
+        object.__setattr__(self, name, value)
+        for pokemon in getattr(self, '_owners', ()):
+            pokemon.version += 1
+
+    def __reduce__(self):
+        # copies don't take the owners along
+        return (Move, (self.name, self.power, self.type))
+
+    # (moves made without __init__(), like the compatibility
+    # checker's stubs, have no owners)
+
+    def _add_owner(self, pokemon):
+        owners = getattr(self, '_owners', ())
+        if pokemon not in owners:
+            object.__setattr__(self, '_owners', owners + (pokemon,))
+
+    def _remove_owner(self, pokemon):
+        owners = getattr(self, '_owners', ())
+        object.__setattr__(self, '_owners', tuple(owner for owner in owners if owner is not pokemon))
+
+    @property
+    def type(self):
+        return self._type
+
+    @type.setter
+    def type(self, type):
+        """
+        also keep the type's id from the type chart
+        in type_id
+        """
+        self._type = type
+        self.type_id = type_id(type)
 
     def __str__(self):
         return self.name + ": " + self.type + " type"
 
-    def get_multiplier_against(self, pokemon):        
-        if self.type == "grass":
-            if pokemon.type == "water" or pokemon.type == "ground":
-                return 2
-            elif pokemon.type == "fire" or pokemon.type == "grass":
-                return 0.5
-            else:
-                return 1
-                
-        elif self.type == "fire":
-            if pokemon.type == "grass":
-                return 2
-            elif pokemon.type == "water" or pokemon.type == "fire":
-                return 0.5
-            else:
-                return 1
-                
-        elif self.type == "water":
-            if pokemon.type == "fire" or pokemon.type == "ground":
-                return 2
-            elif pokemon.type == "grass" or pokemon.type == "water":
-                return 0.5
-            else:
-                return 1
-                
-        elif self.type == "ground": 
-            if pokemon.type == "fire" or pokemon.type == "electric":
-                return 2
-            elif pokemon.type == "grass":
-                return 0.5
-            else:
-                return 1
-            
-        elif self.type == "electric": 
-            if pokemon.type == "water":
-                return 2
-            elif pokemon.type == "grass" or pokemon.type == "electric":
-                return 0.5
-            elif pokemon.type == "ground":
-                return 0
-            else:
-                return 1
-            
-        else:
-            return 1
+    def get_multiplier_against(self, pokemon):
+        """
+        Look up this move's multiplier against the
+        pokemon's type in the precomputed type chart
+        """
+        try:
+            return EFFECTIVENESS[self.type_id][pokemon.type_id]
+        except (AttributeError, TypeError):
+            # pokemon isn't one of our Pokemon objects, so it has
+            # no usable type_id
+            return EFFECTIVENESS[self.type_id][type_id(pokemon.type)]
 
 
 INVALID_MOVE = Move("Invalid Move", 0, 'no type')
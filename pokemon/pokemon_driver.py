@@ -2,6 +2,19 @@
 import random
 
 from pokemon import Player, Pokemon, Move, INVALID_MOVE, INVALID_POKEMON
+from events import (
+    MoveUsed,
+    Effectiveness,
+    Damage,
+    Fainted,
+    Recalled,
+    SentOut,
+    Healed,
+    RanAway,
+    TextSink,
+    game_over,
+    PRINT,
+)
 
 
 class Action:
@@ -9,6 +22,8 @@ class Action:
     their turn.
     """
 
+    __slots__ = ('player', 'priority')
+
     def __init__(self, player, priority):
         self.player = player
 
@@ -16,26 +31,38 @@ class Action:
         # Higher-priority Actions will go first.
         self.priority = priority
 
-    def should_perform_before(self, otherAction):
+    def should_perform_before(self, otherAction, rng=None):
         '''Returns True if this Action should be performed before another
-        Action, or False otherwise.
+        Action, or False otherwise. Ties are decided with the given rng (a
+        random.Random), or with the random module if there is none.
         '''
         return self.priority > otherAction.priority
 
-    def perform_action(self):
-        '''Executes this Action. Subclasses must implement this.'''
+    def perform_action(self, sink=None):
+        '''Executes this Action, describing what happens as events sent to
+        the given sink (see events.py). By default, the events are printed.
+        Subclasses must implement this.
+        '''
+        raise NotImplementedError
+
+    def apply(self):
+        '''Executes this Action without narrating it. Subclasses must
+        implement this.
+        '''
         raise NotImplementedError
 
 
 class AttackAction(Action):
     """An Action that represents a player's Pokemon attacking another."""
 
+    __slots__ = ('moveName', 'opponent')
+
     def __init__(self, player, moveName, opponent):
         super().__init__(player, 0)
         self.moveName = moveName
         self.opponent = opponent
 
-    def should_perform_before(self, otherAction):
+    def should_perform_before(self, otherAction, rng=None):
         # If the other action is an AttackAction, we go first if our
         # Pokemon's speed is greater than the other Pokemon's speed.
         if isinstance(otherAction, AttackAction):
@@ -47,65 +74,115 @@ class AttackAction(Action):
             elif mySpeed < otherSpeed:
                 return False
             else:
-                return random.randint(0, 1) == 0
+                return (rng if rng is not None else random).randint(0, 1) == 0
 
         # Otherwise, just use normal priority rules.
         else:
-            return super().should_perform_before(otherAction)
+            return super().should_perform_before(otherAction, rng)
+
+    def perform_action(self, sink=None):
+        if sink is None:
+            sink = PRINT
+
+        if not sink.enabled:
+            self.apply()
+            return
 
-    def perform_action(self):
-        move = self.player.current_pokemon.get_move(self.moveName)
-        print(f"{self.player.current_pokemon.name} used {move.name}!")
+        pokemon = self.player.current_pokemon
+        move = pokemon.get_move(self.moveName)
+        sink.emit(MoveUsed(self.player.name, pokemon.name, move.name))
 
         targetPokemon = self.opponent.current_pokemon
 
         multiplier = move.get_multiplier_against(targetPokemon)
-        if multiplier > 1:
-            print("It's super effective!")
-        elif multiplier == 0:
-            print(f"It doesn't affect {targetPokemon.name}...")
-        elif multiplier < 1:
-            print("It's not very effective...")
+        sink.emit(Effectiveness(self.opponent.name, targetPokemon.name, multiplier))
 
-        self.player.attack(self.moveName, targetPokemon)
+        hp = targetPokemon.hp
+        self.apply()
+        sink.emit(Damage(
+            self.opponent.name,
+            targetPokemon.name,
+            hp - targetPokemon.hp,
+            targetPokemon.hp,
+        ))
+
+    def apply(self):
+        self.player.attack(self.moveName, self.opponent.current_pokemon)
 
 
 class SwitchAction(Action):
     """An Action that represents a player switching their Pokemon for another."""
 
+    __slots__ = ('pokemonName',)
+
     def __init__(self, player, pokemonName):
         super().__init__(player, 1)
         self.pokemonName = pokemonName
 
-    def perform_action(self):
+    def perform_action(self, sink=None):
+        if sink is None:
+            sink = PRINT
+
+        if not sink.enabled:
+            self.apply()
+            return
+
         if self.player.current_pokemon.is_alive():
-            print(f"{self.player.current_pokemon.name}, return!")
+            sink.emit(Recalled(self.player.name, self.player.current_pokemon.name))
 
-        self.player.switch(self.pokemonName)
+        self.apply()
 
         pokemon = self.player.get_pokemon(self.pokemonName)
-        print(f"Go {pokemon.name}!")
+        sink.emit(SentOut(self.player.name, pokemon.name))
+
+    def apply(self):
+        self.player.switch(self.pokemonName)
 
 
 class HealAction(Action):
     """An Action that represents a player healing their Pokemon."""
 
+    __slots__ = ()
+
     def __init__(self, player):
         super().__init__(player, 2)
 
-    def perform_action(self):
-        print(f"{self.player.name} used a potion on {self.player.current_pokemon.name}!")
+    def perform_action(self, sink=None):
+        if sink is None:
+            sink = PRINT
+
+        if not sink.enabled:
+            self.apply()
+            return
+
+        pokemon = self.player.current_pokemon
+        hp = pokemon.hp
+        self.apply()
+        sink.emit(Healed(self.player.name, pokemon.name, pokemon.hp - hp))
+
+    def apply(self):
         self.player.heal()
 
 
 class RunAction(Action):
     """An Action that represents a player running away."""
 
+    __slots__ = ()
+
     def __init__(self, player):
         super().__init__(player, 3)
 
-    def perform_action(self):
-        print(f"{self.player.name} ran away!")
+    def perform_action(self, sink=None):
+        if sink is None:
+            sink = PRINT
+
+        if sink.enabled:
+            sink.emit(RanAway(self.player.name))
+
+    def apply(self):
+        # Running away doesn't change any Pokemon; execute_turn() ends the
+        # game instead.
+        pass
 
 
 class TurnResult:
@@ -114,6 +191,8 @@ class TurnResult:
     with a winner and loser.
     """
 
+    __slots__ = ('gameOver', 'winner', 'loser')
+
     def __init__(self, gameOver=False, winner=None, loser=None):
         self.gameOver = gameOver
         self.winner = winner
@@ -199,22 +278,29 @@ def choose_action(player, opponent):
             print(":(")
 
 
-def handle_fainting(player):
+def handle_fainting(player, sink=None):
     """Takes a plaier, and determines whether that player's currently-active
     Pokemon has fainted.
 
     If the player's currently-active Pokemon has fainted, asks that player
     which Pokemon they would like to switch to, if any are available, and
-    immediately executes the switch.
+    immediately executes the switch. Events go to the given sink (printed
+    by default), which is flushed before asking.
 
     Returns True if the player's currently-active Pokemon has fainted, and
     False otherwise.
     """
 
+    if sink is None:
+        sink = PRINT
+
     if not player.current_pokemon.is_alive():
-        print(f"{player.current_pokemon.name} fainted!")
+        if sink.enabled:
+            sink.emit(Fainted(player.name, player.current_pokemon.name))
+
         if player.team_is_alive():
-            handle_switch(player).perform_action()
+            sink.flush()
+            handle_switch(player).perform_action(sink)
 
         return True
 
@@ -222,7 +308,7 @@ def handle_fainting(player):
         return False
 
 
-def execute_turn(p1Action, p2Action):
+def execute_turn(p1Action, p2Action, sink=None, rng=None):
     """Takes two Action objects and executes a single battle turn using
     those actions. The Action that is performed first is determined by the
     result of Action.should_perform_before().
@@ -230,11 +316,18 @@ def execute_turn(p1Action, p2Action):
     If a Pokemon faints as a result of the first Action that executes during this
     turn, that Pokemon will not perform its own Action.
 
+    Events describing the turn go to the given sink (see events.py). By
+    default, they are printed. Speed ties are decided with the given rng (a
+    random.Random), or with the random module if there is none.
+
     Returns a TurnResult object representing the result of executing this turn.
     If the game should not continue, the TurnResult will have its .gameOver
     attribute set to True.
     """
 
+    if sink is None:
+        sink = PRINT
+
     player1 = p1Action.player
     player2 = p2Action.player
 
@@ -248,10 +341,10 @@ def execute_turn(p1Action, p2Action):
 
     # Handle all the weird combinations of cases where players are running away.
     if player1Ran:
-        p1Action.perform_action()
+        p1Action.perform_action(sink)
 
         if player2Ran:
-            p2Action.perform_action()
+            p2Action.perform_action(sink)
 
             # If both players ran, then there is no winner.
             return TurnResult(gameOver=True)
@@ -261,10 +354,10 @@ def execute_turn(p1Action, p2Action):
             return TurnResult(gameOver=True, winner=player2, loser=player1)
 
     elif player2Ran:
-        p2Action.perform_action()
+        p2Action.perform_action(sink)
 
         if player1Ran:
-            p1Action.perform_action()
+            p1Action.perform_action(sink)
 
             # If both players ran, then there is no winner.
             return TurnResult(gameOver=True)
@@ -279,27 +372,27 @@ def execute_turn(p1Action, p2Action):
     #########################
 
     # In what order should we perform these actions?
-    if p1Action.should_perform_before(p2Action):
+    if p1Action.should_perform_before(p2Action, rng):
         # Player 1's Action goes first.
-        p1Action.perform_action()
-        fainted = handle_fainting(player2)
+        p1Action.perform_action(sink)
+        fainted = handle_fainting(player2, sink)
 
         # Only perform Player 2's Action if Player 1's Action
         # didn't result in Player 2's Pokemon fainting.
         if not fainted:
-            p2Action.perform_action()
-            fainted = handle_fainting(player1)
+            p2Action.perform_action(sink)
+            fainted = handle_fainting(player1, sink)
 
     else:
         # Player 2's Action goes first.
-        p2Action.perform_action()
-        fainted = handle_fainting(player1)
+        p2Action.perform_action(sink)
+        fainted = handle_fainting(player1, sink)
 
         # Only perform Player 1's Action if Player 2's Action
         # didn't result in Player 1's Pokemon fainting.
         if not fainted:
-            p1Action.perform_action()
-            fainted = handle_fainting(player2)
+            p1Action.perform_action(sink)
+            fainted = handle_fainting(player2, sink)
 
     # If either Pokemon fainted, check to see if the game is over.
     if fainted:
@@ -329,11 +422,19 @@ def execute_turn(p1Action, p2Action):
     return TurnResult(gameOver=False)
 
 
-def main(player1, player2):
+def main(player1, player2, recorder=None):
     """The main battle driver loop. Takes two valid Player objects representing
     the two contestants of this battle.
+
+    If a replay.Recorder for the two players is given, every decision is
+    recorded with it, so the battle can be replayed afterwards.
     """
 
+    # Narration is buffered, and flushed whenever somebody has to read it.
+    sink = TextSink()
+    if recorder is not None:
+        sink = recorder.watch(sink)
+
     while True:
         print(f"{player1.name}'s Pokemon: {player1.current_pokemon.name}")
         print(f"{player1.current_pokemon.hp} HP")
@@ -348,20 +449,26 @@ def main(player1, player2):
         p2Action = choose_action(player2, player1)
         print()
 
+        if recorder is not None:
+            recorder.record(p1Action)
+            recorder.record(p2Action)
+
         print("======================================================\n")
 
-        result = execute_turn(p1Action, p2Action)
+        result = execute_turn(
+            p1Action,
+            p2Action,
+            sink,
+            recorder.rng if recorder is not None else None,
+        )
+        sink.flush()
 
         print()
         print("======================================================\n")
 
         if result.gameOver:
-            if result.loser is not None:
-                print(f"{result.loser.name} loses!")
-
-            if result.winner is not None:
-                print(f"{result.winner.name} is the winner!")
-
+            sink.emit(game_over(result))
+            sink.flush()
             break
 
     print("Game over.")
@@ -1,4 +1,4 @@
-from .pokemon import Pokemon, Move
+from pokemon import Pokemon, Move
 
 
 def create_team():
@@ -10,6 +10,21 @@ def create_team():
 
     """
     
+    pokemon, _ = create_pool()
+    byName = {p.name: p for p in pokemon}
+
+    return [byName[name] for name in ("Pikachu", "Squirtle", "Charmander", "Groudon")]
+
+
+def create_pool():
+    """
+    Return every Pokemon and every Move that a team can be built from,
+    as a (list of Pokemon, list of Moves) tuple.
+
+    team_builder.py searches this pool for strong teams.
+
+    """
+
     #ground move
     earth_power = Move("Earth Power", 90, "ground")
     mud_shot = Move("Mud Shot", 55, "ground")
@@ -54,5 +69,17 @@ def create_team():
     Charmander = Pokemon("Charmander", 146, [ember, flamethrower, fire_spin, fire_fang], "fire", 65)
     Groudon = Pokemon("Groudon", 170, [earth_power, mud_shot, rock_tomb, rock_smash], "ground", 90)
     
-    return [Pikachu, Squirtle, Charmander, Groudon]
+    pokemon = [
+        Infernape, Bulbasaur, Piplup, Mareep,
+        Pikachu, Squirtle, Charmander, Groudon,
+    ]
+    moves = [
+        earth_power, mud_shot, rock_tomb, rock_smash,
+        ember, flamethrower, fire_spin, fire_fang, flame_wheel,
+        seed_bomb, vine_whip, bullet_seed, razor_leaf,
+        thunder_shock, thunderbolt, electro_ball, spark, charge_beam,
+        water_gun, aqua_tail, brine, water_pulse, whirlpool,
+    ]
+
+    return pokemon, moves
 
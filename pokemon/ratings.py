@@ -0,0 +1,491 @@
+"""
+Incremental Elo and Glicko-2 ratings from a stream of battle results.
+
+    ratings = Glicko2Ratings(periodLength=1000)
+    ratings.record("Ash", "Gary")                  # Ash beat Gary
+    ratings.record("Ash", "Misty", draw=True)
+    ratings.record_result(turnResult, player1, player2)
+    for entry in ratings.leaderboard(10):
+        print(entry.name, entry.rating, entry.rd)
+
+EloRatings updates both players' ratings as soon as a result is recorded.
+
+Glicko2Ratings batches results into rating periods, as Glicko-2 expects:
+within a period, every result is scored against the ratings players had
+when the period began, and ratings change when it ends (after periodLength
+results, or when end_period() is called). A result only adds to two running
+sums per player, so memory depends on the number of players, never on the
+number of results, and the period's results are never kept or re-read.
+Players who sit out periods have their rating deviation widened when they
+next play (or are looked at), rather than at the end of every period.
+
+Leaderboards are computed from the current ratings alone, with heapq.
+save() writes everything (including a period in progress) in a compact
+binary format, and load() reads it back.
+
+"""
+
+import os
+import math
+import heapq
+import struct
+
+
+DEFAULT_RATING = 1500
+DEFAULT_RD = 350
+DEFAULT_VOLATILITY = 0.06
+
+# Glicko-2's rating scale: mu = (rating - 1500) / GLICKO2_SCALE.
+GLICKO2_SCALE = 173.7178
+
+# The precision of the Glicko-2 volatility iteration.
+_EPSILON = 1e-6
+
+
+class PlayerRating:
+    """One player's rating and record."""
+
+    __slots__ = (
+        'name', 'rating', 'rd', 'volatility', 'wins', 'losses', 'draws',
+        'period', 'varianceSum', 'scoreSum',
+    )
+
+    def __init__(self, name, rating=DEFAULT_RATING, rd=DEFAULT_RD, volatility=DEFAULT_VOLATILITY):
+        self.name = name
+        self.rating = rating
+        self.rd = rd
+        self.volatility = volatility
+
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+
+        # Glicko-2 only: the rating period rd is up to date for, and the
+        # sums accumulated during the current period.
+        self.period = 0
+        self.varianceSum = 0.0
+        self.scoreSum = 0.0
+
+    @property
+    def games(self):
+        return self.wins + self.losses + self.draws
+
+    def __repr__(self):
+        return f"PlayerRating({self.name!r}, {self.rating:.1f}, rd={self.rd:.1f})"
+
+
+class Ratings:
+    """The ratings of every player seen so far. See EloRatings and
+    Glicko2Ratings.
+    """
+
+    # Identifies the rating system in saved files.
+    SYSTEM = None
+
+    def __init__(self):
+        self._players = {}
+
+        # Results recorded (in the current rating period, for Glicko-2).
+        self.results = 0
+
+    def __len__(self):
+        return len(self._players)
+
+    def __contains__(self, name):
+        return name in self._players
+
+    def __iter__(self):
+        return iter(self._players.values())
+
+    def get(self, name):
+        '''Returns the PlayerRating of the named player (a new one, if they
+        haven't played).
+        '''
+        player = self._players.get(name)
+        if player is None:
+            player = self._players[name] = PlayerRating(name)
+        return player
+
+    def rating(self, name):
+        '''Returns the named player's rating (DEFAULT_RATING if they haven't
+        played).
+        '''
+        player = self._players.get(name)
+        return player.rating if player is not None else DEFAULT_RATING
+
+    def record(self, winner, loser, draw=False):
+        '''Records a battle between the named players, which the first won
+        (or, if draw is true, which neither won).
+        '''
+        raise NotImplementedError
+
+    def record_result(self, result, player1, player2):
+        '''Records the TurnResult of a finished battle between two Players
+        (see engine.run_battle()). A Game Over with no winner is a draw.
+        '''
+        if result.winner is None:
+            self.record(player1.name, player2.name, draw=True)
+        else:
+            self.record(result.winner.name, result.loser.name)
+
+    def record_match(self, name1, name2, wins1, wins2, draws):
+        '''Records every battle of a match between the named players (see
+        tournament.play_match()).
+        '''
+        for _ in range(wins1):
+            self.record(name1, name2)
+        for _ in range(wins2):
+            self.record(name2, name1)
+        for _ in range(draws):
+            self.record(name1, name2, draw=True)
+
+    def record_many(self, results):
+        '''Records every (winner, loser, draw) tuple from an iterable, e.g. a
+        generator reading a log of any length.
+        '''
+        record = self.record
+        for winner, loser, draw in results:
+            record(winner, loser, draw)
+
+    def leaderboard(self, count=10, key=None):
+        '''Returns the PlayerRatings of the best `count` players, best first,
+        by rating (or by the given key function).
+        '''
+        return heapq.nlargest(count, self._players.values(), key=key or _rating)
+
+    def save(self, path):
+        '''Writes every player's rating and record to a file, replacing it
+        atomically.
+        '''
+        header = _HEADER.pack(
+            _MAGIC, _VERSION, self.SYSTEM, self._parameter(), self._period(),
+            self._periodLength(), self.results, len(self._players),
+        )
+
+        pack = _PLAYER.pack
+        chunks = [header]
+        for player in self._players.values():
+            name = player.name.encode('utf-8')
+            chunks.append(pack(
+                len(name), player.rating, player.rd, player.volatility,
+                player.wins, player.losses, player.draws, player.period,
+                player.varianceSum, player.scoreSum,
+            ))
+            chunks.append(name)
+
+        temporaryPath = f"{path}.tmp"
+        with open(temporaryPath, 'wb') as file:
+            file.write(b''.join(chunks))
+        os.replace(temporaryPath, path)
+
+    @staticmethod
+    def load(path):
+        '''Reads ratings written by save(), and returns them as an
+        EloRatings or Glicko2Ratings object.
+        '''
+        with open(path, 'rb') as file:
+            data = file.read()
+
+        magic, version, system, parameter, period, periodLength, results, count = \
+            _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} isn't a ratings file")
+
+        if system == EloRatings.SYSTEM:
+            ratings = EloRatings(k=parameter)
+        elif system == Glicko2Ratings.SYSTEM:
+            ratings = Glicko2Ratings(tau=parameter, periodLength=periodLength or None)
+            ratings.period = period
+        else:
+            raise ValueError(f"{path} uses an unknown rating system ({system})")
+
+        ratings.results = results
+
+        players = ratings._players
+        unpack = _PLAYER.unpack_from
+        offset = _HEADER.size
+        playerSize = _PLAYER.size
+
+        for _ in range(count):
+            (nameLength, rating, rd, volatility, wins, losses, draws, playerPeriod,
+             varianceSum, scoreSum) = unpack(data, offset)
+            offset += playerSize
+            name = data[offset:offset + nameLength].decode('utf-8')
+            offset += nameLength
+
+            player = PlayerRating(name, rating, rd, volatility)
+            player.wins = wins
+            player.losses = losses
+            player.draws = draws
+            player.period = playerPeriod
+            player.varianceSum = varianceSum
+            player.scoreSum = scoreSum
+            players[name] = player
+
+        ratings._loaded()
+        return ratings
+
+    # Saved with the ratings, for load().
+    def _parameter(self):
+        raise NotImplementedError
+
+    def _period(self):
+        return 0
+
+    def _periodLength(self):
+        return 0
+
+    def _loaded(self):
+        pass
+
+
+class EloRatings(Ratings):
+    """Elo ratings: every result moves both players' ratings by up to k
+    points at once.
+    """
+
+    SYSTEM = 0
+
+    def __init__(self, k=32):
+        super().__init__()
+        self.k = k
+
+    def record(self, winner, loser, draw=False):
+        winner = self.get(winner)
+        loser = self.get(loser)
+
+        expected = 1 / (1 + 10 ** ((loser.rating - winner.rating) / 400))
+        score = 0.5 if draw else 1.0
+        change = self.k * (score - expected)
+
+        winner.rating += change
+        loser.rating -= change
+
+        if draw:
+            winner.draws += 1
+            loser.draws += 1
+        else:
+            winner.wins += 1
+            loser.losses += 1
+
+        self.results += 1
+
+    def _parameter(self):
+        return self.k
+
+
+class Glicko2Ratings(Ratings):
+    """Glicko-2 ratings, updated at the end of every rating period (see the
+    top of this file).
+
+    tau: how much volatilities may change from period to period
+    periodLength: the number of results in a rating period (default: a
+                  period only ends when end_period() is called)
+    """
+
+    SYSTEM = 1
+
+    def __init__(self, tau=0.5, periodLength=None):
+        super().__init__()
+        self.tau = tau
+        self.periodLength = periodLength
+
+        # The current rating period, and the players with results in it.
+        self.period = 0
+        self._active = {}
+
+    def get(self, name):
+        '''Returns the PlayerRating of the named player, with its rating
+        deviation brought up to date for the current period.
+        '''
+        player = self._players.get(name)
+        if player is None:
+            player = self._players[name] = PlayerRating(name)
+            player.period = self.period
+        elif player.period != self.period:
+            self._catch_up(player)
+        return player
+
+    def rd(self, name):
+        '''Returns the named player's rating deviation as of the current
+        period (DEFAULT_RD if they haven't played).
+        '''
+        player = self._players.get(name)
+        if player is None:
+            return DEFAULT_RD
+        if player.period != self.period:
+            self._catch_up(player)
+        return player.rd
+
+    def record(self, winner, loser, draw=False):
+        # This runs for every result: get() is inlined for players who have
+        # already played in this period.
+        players = self._players
+        period = self.period
+
+        player = players.get(winner)
+        winner = player if player is not None and player.period == period else self.get(winner)
+        player = players.get(loser)
+        loser = player if player is not None and player.period == period else self.get(loser)
+
+        # Both players' values from the start of the period (nothing changes
+        # until it ends), on the Glicko-2 scale: g() of each deviation, and
+        # the difference between the ratings.
+        rd1 = winner.rd
+        rd2 = loser.rd
+        g1 = 1 / math.sqrt(1 + _G_FACTOR * rd1 * rd1)
+        g2 = 1 / math.sqrt(1 + _G_FACTOR * rd2 * rd2)
+        difference = (winner.rating - loser.rating) / GLICKO2_SCALE
+
+        # Each player's expected score against the other.
+        expected1 = 1 / (1 + math.exp(-g2 * difference))
+        expected2 = 1 / (1 + math.exp(g1 * difference))
+        score = 0.5 if draw else 1.0
+
+        winner.varianceSum += g2 * g2 * expected1 * (1 - expected1)
+        winner.scoreSum += g2 * (score - expected1)
+        loser.varianceSum += g1 * g1 * expected2 * (1 - expected2)
+        loser.scoreSum += g1 * ((1 - score) - expected2)
+
+        if draw:
+            winner.draws += 1
+            loser.draws += 1
+        else:
+            winner.wins += 1
+            loser.losses += 1
+
+        self._active[winner.name] = winner
+        self._active[loser.name] = loser
+
+        self.results += 1
+        if self.periodLength is not None and self.results >= self.periodLength:
+            self.end_period()
+
+    def end_period(self):
+        '''Ends the current rating period: updates the rating, deviation and
+        volatility of every player with results in it. Everyone else's
+        deviation widens when they are next looked at.
+        '''
+        tau = self.tau
+        maxPhi = DEFAULT_RD / GLICKO2_SCALE
+
+        for player in self._active.values():
+            mu = (player.rating - DEFAULT_RATING) / GLICKO2_SCALE
+            phi = player.rd / GLICKO2_SCALE
+
+            variance = 1 / player.varianceSum
+            delta = variance * player.scoreSum
+            volatility = _new_volatility(player.volatility, phi, variance, delta, tau)
+
+            phiStar = math.sqrt(phi * phi + volatility * volatility)
+            newPhi = min(1 / math.sqrt(1 / (phiStar * phiStar) + 1 / variance), maxPhi)
+            newMu = mu + newPhi * newPhi * player.scoreSum
+
+            player.rating = DEFAULT_RATING + GLICKO2_SCALE * newMu
+            player.rd = GLICKO2_SCALE * newPhi
+            player.volatility = volatility
+            player.varianceSum = 0.0
+            player.scoreSum = 0.0
+            player.period = self.period + 1
+
+        self._active = {}
+        self.period += 1
+        self.results = 0
+
+    def leaderboard(self, count=10, key=None):
+        '''Returns the PlayerRatings of the best `count` players, best first,
+        by rating (or by the given key function), with their rating
+        deviations brought up to date.
+        '''
+        best = super().leaderboard(count, key)
+        for player in best:
+            if player.period != self.period:
+                self._catch_up(player)
+        return best
+
+    def _catch_up(self, player):
+        # Widens the deviation of a player who sat out the periods since
+        # player.period (their volatility doesn't change while they do).
+        phi = player.rd / GLICKO2_SCALE
+        idle = self.period - player.period
+        phi = math.sqrt(phi * phi + idle * player.volatility * player.volatility)
+
+        player.rd = min(GLICKO2_SCALE * phi, DEFAULT_RD)
+        player.period = self.period
+
+    def _parameter(self):
+        return self.tau
+
+    def _period(self):
+        return self.period
+
+    def _periodLength(self):
+        return self.periodLength or 0
+
+    def _loaded(self):
+        self._active = {
+            player.name: player for player in self._players.values()
+                if player.varianceSum
+        }
+
+
+# Helpers
+
+def _rating(player):
+    return player.rating
+
+
+# Glicko-2's g(phi) = 1 / sqrt(1 + 3 * phi^2 / pi^2), with phi = rd /
+# GLICKO2_SCALE, is 1 / math.sqrt(1 + _G_FACTOR * rd * rd).
+_G_FACTOR = 3 / (math.pi * math.pi * GLICKO2_SCALE * GLICKO2_SCALE)
+
+
+def _new_volatility(volatility, phi, variance, delta, tau):
+    # Step 5 of Glicko-2: solves for the new volatility with the Illinois
+    # algorithm.
+    a = math.log(volatility * volatility)
+    phi2 = phi * phi
+    delta2 = delta * delta
+    tau2 = tau * tau
+
+    def f(x):
+        ex = math.exp(x)
+        return (
+            ex * (delta2 - phi2 - variance - ex) / (2 * (phi2 + variance + ex) ** 2)
+            - (x - a) / tau2
+        )
+
+    A = a
+    if delta2 > phi2 + variance:
+        B = math.log(delta2 - phi2 - variance)
+    else:
+        k = 1
+        while f(a - k * tau) < 0:
+            k += 1
+        B = a - k * tau
+
+    fA = f(A)
+    fB = f(B)
+    while abs(B - A) > _EPSILON:
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        if fC * fB <= 0:
+            A = B
+            fA = fB
+        else:
+            fA /= 2
+        B = C
+        fB = fC
+
+    return math.exp(A / 2)
+
+
+# The file format of save() and load(): a header, then each player's numbers
+# followed by their UTF-8 name.
+_MAGIC = b'PKRT'
+_VERSION = 1
+# magic, version, system, k or tau, period, periodLength, results, players
+_HEADER = struct.Struct('<4sBBdIIII')
+# name length, rating, rd, volatility, wins, losses, draws, period,
+# varianceSum, scoreSum
+_PLAYER = struct.Struct('<HdddIIIIdd')
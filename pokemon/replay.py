@@ -0,0 +1,659 @@
+"""
+Compact binary battle replays.
+
+A replay records the two teams once (as they were when the battle started),
+the seed of the battle's random.Random (which decides speed ties), and then
+every decision made in each turn: both players' actions, and the forced
+switch after a faint, if any. Replaying re-executes those decisions with
+engine.play_turn(), which follows the rules of pokemon_driver.execute_turn(),
+so the battle plays out exactly as it did.
+
+Recording a headless battle:
+
+    replay, result = record_battle(player1, player2, p1Policy, p2Policy)
+
+Recording an interactive one:
+
+    recorder = Recorder(player1, player2)
+    pokemon_driver.main(player1, player2, recorder)
+    replay = recorder.replay()
+
+Watching it again, or jumping to a turn:
+
+    replayer = Replayer(replay, TextSink())
+    replayer.seek(10)
+    replayer.run()
+
+Archives are files of many replays, each preceded by its length, so they can
+be written one battle at a time and read back one battle at a time with
+read_archive(), however large they are. Most of a replay is its two team
+definitions, and archives tend to hold the same teams over and over, so
+recently seen teams are encoded and decoded only once.
+
+Binary format (little-endian):
+
+    replay   := b'PKRP' version:u8 seed:u64 player player turn* 0:u8
+    player   := length:u16 name:str current:u8 count:u8 pokemon*
+    pokemon  := name:str type:str hp:f64 max_hp:f64 speed:f64 count:u8 move*
+    move     := name:str type:str power:f64
+    str      := length:u16 utf-8 bytes
+    turn     := count:u8 (side << 4 | kind):u8 arg:u8 ...
+    archive  := (length:u32 replay)*
+
+A turn starts with player 1's action, then player 2's, then the forced
+switch (if any). kind is ATTACK, SWITCH, HEAL or RUN, and arg is the move
+slot of the current Pokemon or the party slot to switch to.
+
+Replay.to_bytes() raises ReplayError for anything that doesn't fit: seeds
+outside 0 to 2**64 - 1, strings (and team definitions) over 65535 bytes,
+parties or move lists over 255 long, and so on.
+
+"""
+
+import random
+import struct
+
+from pokemon import Player, Pokemon, Move
+from pokemon_driver import AttackAction, SwitchAction, HealAction, RunAction
+from engine import Policy, play_turn, run_battle
+from events import Fainted, SentOut, game_over
+from snapshot import take_snapshot, restore_snapshot
+from seeding import master_seed
+
+
+MAGIC = b'PKRP'
+VERSION = 1
+
+# Decision kinds, numbered like the Action priorities in pokemon_driver (and
+# like the action kinds in batched.py).
+ATTACK = 0
+SWITCH = 1
+HEAL = 2
+RUN = 3
+
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+_U64 = struct.Struct('<Q')
+_F64 = struct.Struct('<d')
+
+
+class ReplayError(Exception):
+    """Raised for data that isn't a valid replay, or decisions that can't
+    be replayed.
+    """
+
+
+class Replay:
+    """A recorded battle.
+
+    teams: a (player 1, player 2) pair of team definitions, as returned by
+           describe_player()
+    seed: the seed of the random.Random that decided the speed ties
+    turns: a list with a list of (side, kind, arg) decisions for each turn
+    """
+
+    def __init__(self, teams, seed, turns):
+        self.teams = teams
+        self.seed = seed
+        self.turns = turns
+
+    def players(self):
+        '''Returns fresh (player1, player2) Player objects in the state they
+        were in when the battle started.
+        '''
+        return build_player(self.teams[0]), build_player(self.teams[1])
+
+    def to_bytes(self):
+        out = bytearray(MAGIC)
+        out += _U8.pack(VERSION)
+        out += _pack(_U64, self.seed, "Seed")
+
+        for team in self.teams:
+            data = _encode_team(team)
+            out += _pack(_U16, len(data), "Team definition length")
+            out += data
+
+        for decisions in self.turns:
+            # A count of 0 would end the replay early.
+            if not decisions:
+                raise ReplayError("A turn has no decisions!")
+            out += _pack(_U8, len(decisions), "Number of decisions in a turn")
+
+            for side, kind, arg in decisions:
+                if not (0 <= side <= 0xF and 0 <= kind <= 0xF):
+                    raise ReplayError(f"Decision {(side, kind, arg)} doesn't fit in a replay!")
+                out += _U8.pack(side << 4 | kind)
+                out += _pack(_U8, arg, "Decision argument")
+
+        out += _U8.pack(0)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        reader = _Reader(data)
+
+        if reader.take(4) != MAGIC:
+            raise ReplayError("Not a replay!")
+
+        version = reader.u8()
+        if version != VERSION:
+            raise ReplayError(f"Unsupported replay version {version}!")
+
+        seed = reader.u64()
+        teams = (_decode_team(reader), _decode_team(reader))
+
+        turns = []
+        while True:
+            count = reader.u8()
+            if count == 0:
+                break
+
+            codes = reader.take(2 * count)
+            turns.append([
+                (code >> 4, code & 0xF, arg) for code, arg in zip(codes[::2], codes[1::2])
+            ])
+
+        return cls(teams, seed, turns)
+
+
+def describe_player(player):
+    """Returns a team definition for the given Player: (name, current party
+    slot, ((name, type, hp, max_hp, speed, ((name, type, power), ...)), ...)).
+    """
+
+    party = tuple(
+        (
+            pokemon.name,
+            pokemon.type,
+            pokemon.hp,
+            pokemon.max_hp,
+            pokemon.speed,
+            tuple((move.name, move.type, move.power) for move in pokemon.moves),
+        )
+        for pokemon in player.pokemon_party
+    )
+
+    return player.name, _slot_of(player.pokemon_party, player.current_pokemon), party
+
+
+def build_player(team):
+    """Builds a new Player from a team definition (see describe_player())."""
+
+    name, current, party = team
+
+    pokemon_party = []
+    for pokemonName, pokemonType, hp, max_hp, speed, moves in party:
+        pokemon = Pokemon(
+            pokemonName,
+            max_hp,
+            [Move(moveName, power, moveType) for moveName, moveType, power in moves],
+            pokemonType,
+            speed,
+        )
+        pokemon.hp = hp
+        pokemon_party.append(pokemon)
+
+    player = Player(name, pokemon_party)
+    player.current_pokemon = player.pokemon_party[current]
+    return player
+
+
+class Recorder:
+    """Records the decisions of a battle between two Players.
+
+    Creating a Recorder describes both teams. The battle must decide its
+    speed ties with the Recorder's .rng, a random.Random seeded with the
+    given seed (a random one by default).
+
+    Pass each turn's two Actions to record(), player 1's first, and forced
+    switches to record_switch() (or let watch() find them in the battle's
+    events). replay() returns the recorded Replay.
+    """
+
+    def __init__(self, player1, player2, seed=None):
+        self.player1 = player1
+        self.player2 = player2
+        self.seed = master_seed(seed)
+        self.rng = random.Random(self.seed)
+        self.teams = (describe_player(player1), describe_player(player2))
+        self.turns = []
+
+        self._actions = 2
+        self._fainted = None
+
+    def record(self, action):
+        '''Records one of the two Actions chosen at the start of a turn.'''
+        if self._actions == 2:
+            self.turns.append([])
+            self._actions = 0
+
+        self._actions += 1
+        self.turns[-1].append(encode_action(action, self._side(action.player)))
+
+    def record_switch(self, action):
+        '''Records a forced switch after a faint.'''
+        self.turns[-1].append(encode_action(action, self._side(action.player)))
+
+    def watch(self, sink):
+        '''Returns a sink that passes events on to the given sink and
+        records the forced switches they describe.
+        '''
+        return _SwitchWatcher(self, sink)
+
+    def replay(self):
+        return Replay(self.teams, self.seed, [list(turn) for turn in self.turns])
+
+    def _side(self, player):
+        if player is self.player1:
+            return 0
+        elif player is self.player2:
+            return 1
+
+        raise ReplayError(f"{player.name} isn't in this battle!")
+
+
+class _SwitchWatcher:
+    # A sink that spots forced switches: a Fainted event, then the SentOut
+    # event for the fainted Pokemon's replacement.
+
+    enabled = True
+
+    def __init__(self, recorder, sink):
+        self.recorder = recorder
+        self.sink = sink
+
+    def emit(self, event):
+        recorder = self.recorder
+
+        if isinstance(event, Fainted):
+            # Only the Pokemon that was just attacked can have fainted.
+            for player in (recorder.player1, recorder.player2):
+                if not player.current_pokemon.is_alive():
+                    recorder._fainted = player
+
+        elif isinstance(event, SentOut) and recorder._fainted is not None:
+            player = recorder._fainted
+            recorder._fainted = None
+            recorder.record_switch(SwitchAction(player, player.current_pokemon.name))
+
+        if self.sink.enabled:
+            self.sink.emit(event)
+
+    def flush(self):
+        self.sink.flush()
+
+
+class RecordingPolicy(Policy):
+    """Wraps a Policy, recording every Action it chooses with a Recorder."""
+
+    def __init__(self, policy, recorder):
+        self.policy = policy
+        self.recorder = recorder
+
+    def choose_action(self, player, opponent):
+        action = self.policy.choose_action(player, opponent)
+        self.recorder.record(action)
+        return action
+
+    def choose_switch(self, player, opponent):
+        action = self.policy.choose_switch(player, opponent)
+        self.recorder.record_switch(action)
+        return action
+
+
+def record_battle(player1, player2, p1Policy, p2Policy, seed=None, maxTurns=1000, sink=None):
+    """Runs a headless battle (see engine.run_battle()) and records it.
+
+    Returns (replay, result): the Replay, and the final TurnResult.
+    """
+
+    recorder = Recorder(player1, player2, seed)
+    result = run_battle(
+        player1,
+        player2,
+        RecordingPolicy(p1Policy, recorder),
+        RecordingPolicy(p2Policy, recorder),
+        maxTurns,
+        sink,
+        recorder.rng,
+    )
+    return recorder.replay(), result
+
+
+def encode_action(action, side):
+    """Returns the (side, kind, arg) decision for an Action."""
+
+    player = action.player
+
+    if isinstance(action, AttackAction):
+        moves = player.current_pokemon.moves
+        move = moves.find(action.moveName, None)
+        if move is None:
+            raise ReplayError(f"{player.current_pokemon.name} doesn't know {action.moveName}!")
+        return side, ATTACK, _slot_of(moves, move)
+
+    elif isinstance(action, SwitchAction):
+        party = player.pokemon_party
+        pokemon = party.find(action.pokemonName, None)
+        if pokemon is None:
+            raise ReplayError(f"{player.name} has no {action.pokemonName}!")
+        return side, SWITCH, _slot_of(party, pokemon)
+
+    elif isinstance(action, HealAction):
+        return side, HEAL, 0
+
+    elif isinstance(action, RunAction):
+        return side, RUN, 0
+
+    raise ReplayError(f"Can't record a {type(action).__name__}!")
+
+
+def decode_action(decision, player, opponent):
+    """Returns the Action for a (side, kind, arg) decision made by the given
+    player.
+    """
+
+    side, kind, arg = decision
+
+    try:
+        if kind == ATTACK:
+            move = player.current_pokemon.moves[arg]
+            return AttackAction(player, move.name, opponent)
+        elif kind == SWITCH:
+            return SwitchAction(player, player.pokemon_party[arg].name)
+    except IndexError:
+        raise ReplayError(f"Decision {decision} doesn't fit the battle!") from None
+
+    if kind == HEAL:
+        return HealAction(player)
+    elif kind == RUN:
+        return RunAction(player)
+
+    raise ReplayError(f"Unknown decision kind {kind}!")
+
+
+class _LoggedSwitches(Policy):
+    # Supplies the forced switches of the turn being replayed.
+
+    def __init__(self):
+        self.pending = []
+
+    def choose_switch(self, player, opponent):
+        if not self.pending:
+            raise ReplayError("The replay has no forced switch here!")
+
+        return decode_action(self.pending.pop(0), player, opponent)
+
+
+class Replayer:
+    """Plays a Replay back, one turn at a time or all at once. Narration
+    goes to the given sink, if any (see events.py).
+
+    Speed ties are decided with a random.Random seeded like the recorded
+    battle's.
+
+    seek() jumps to any turn. It restores the nearest earlier keyframe (a
+    snapshot taken every keyframeInterval turns as the replay is played) and
+    replays from there.
+    """
+
+    def __init__(self, replay, sink=None, keyframeInterval=64):
+        self.replay = replay
+        self.sink = sink
+        self.keyframeInterval = keyframeInterval
+
+        self.player1, self.player2 = replay.players()
+        self.rng = random.Random(replay.seed)
+        self._switches = _LoggedSwitches()
+        self._keyframes = {}
+        self.restart()
+
+    def restart(self):
+        '''Goes back to the start of the battle.'''
+        if 0 not in self._keyframes:
+            self.rng.seed(self.replay.seed)
+            self._keyframes[0] = take_snapshot(self.player1, self.player2, self.rng)
+
+        restore_snapshot(self.player1, self.player2, self._keyframes[0], self.rng)
+        self.turn = 0
+        self.result = None
+
+    @property
+    def finished(self):
+        return self.turn >= len(self.replay.turns)
+
+    def step(self):
+        '''Plays the next turn and returns its TurnResult, or None if the
+        replay is over.
+        '''
+        if self.finished:
+            return None
+
+        decisions = self.replay.turns[self.turn]
+        if len(decisions) < 2:
+            raise ReplayError(f"Turn {self.turn + 1} is missing an action!")
+
+        player1, player2 = self.player1, self.player2
+        p1Action = decode_action(decisions[0], player1, player2)
+        p2Action = decode_action(decisions[1], player2, player1)
+        self._switches.pending = decisions[2:]
+
+        self.result = play_turn(
+            p1Action,
+            p2Action,
+            self._switches,
+            self._switches,
+            sink=self.sink,
+            rng=self.rng,
+        )
+        self.turn += 1
+
+        if self.turn % self.keyframeInterval == 0 and self.turn not in self._keyframes:
+            self._keyframes[self.turn] = take_snapshot(player1, player2, self.rng)
+
+        if self.finished and self.sink is not None and self.sink.enabled:
+            if self.result.gameOver:
+                self.sink.emit(game_over(self.result))
+            self.sink.flush()
+
+        return self.result
+
+    def seek(self, turn):
+        '''Moves to just after the given turn (0 is the start of the
+        battle), without narrating the turns in between.
+        '''
+        turn = max(0, min(turn, len(self.replay.turns)))
+
+        keyframe = max(t for t in self._keyframes if t <= turn)
+        if turn < self.turn or keyframe > self.turn:
+            restore_snapshot(
+                self.player1, self.player2, self._keyframes[keyframe], self.rng,
+            )
+            self.turn = keyframe
+            self.result = None
+
+        sink = self.sink
+        self.sink = None
+        try:
+            while self.turn < turn:
+                self.step()
+        finally:
+            self.sink = sink
+
+    def run(self):
+        '''Plays the rest of the replay and returns the last TurnResult.'''
+        while not self.finished:
+            self.step()
+
+        return self.result
+
+
+def write_replay(file, replay):
+    """Appends a Replay to an archive opened for binary writing."""
+
+    data = replay.to_bytes()
+    file.write(_U32.pack(len(data)))
+    file.write(data)
+
+
+def read_archive(file):
+    """Yields the Replays in an archive opened for binary reading, one at a
+    time, so that archives of any size can be streamed.
+    """
+
+    while True:
+        header = file.read(4)
+        if not header:
+            return
+        if len(header) < 4:
+            raise ReplayError("Truncated archive!")
+
+        length = _U32.unpack(header)[0]
+        data = file.read(length)
+        if len(data) < length:
+            raise ReplayError("Truncated archive!")
+
+        yield Replay.from_bytes(data)
+
+
+def _slot_of(items, item):
+    for slot, other in enumerate(items):
+        if other is item:
+            return slot
+
+    raise ReplayError(f"{item.name} isn't in the list!")
+
+
+def _pack(format, value, what):
+    # Packs a field, or raises ReplayError if it doesn't fit.
+    try:
+        return format.pack(value)
+    except struct.error:
+        raise ReplayError(f"{what} {value!r} doesn't fit in a replay!") from None
+
+
+def _write_string(out, text):
+    data = text.encode('utf-8')
+    out += _pack(_U16, len(data), f"Length of {text[:20]!r}")
+    out += data
+
+
+def _write_number(out, number):
+    out += _pack(_F64, number, "Number")
+
+
+# Recently encoded teams, and recently decoded ones by their encoding.
+_TEAM_CACHE_SIZE = 1024
+_encodedTeams = {}
+_decodedTeams = {}
+
+
+def _encode_team(team):
+    data = _encodedTeams.get(team)
+    if data is None:
+        out = bytearray()
+        _write_team(out, team)
+        data = bytes(out)
+
+        if len(_encodedTeams) >= _TEAM_CACHE_SIZE:
+            _encodedTeams.clear()
+        _encodedTeams[team] = data
+
+    return data
+
+
+def _decode_team(reader):
+    data = reader.take(reader.u16())
+
+    team = _decodedTeams.get(data)
+    if team is None:
+        team = _read_team(_Reader(data))
+
+        if len(_decodedTeams) >= _TEAM_CACHE_SIZE:
+            _decodedTeams.clear()
+        _decodedTeams[data] = team
+
+    return team
+
+
+def _write_team(out, team):
+    name, current, party = team
+    _write_string(out, name)
+    out += _pack(_U8, current, "Current party slot")
+    out += _pack(_U8, len(party), "Party size")
+
+    for pokemonName, pokemonType, hp, max_hp, speed, moves in party:
+        _write_string(out, pokemonName)
+        _write_string(out, pokemonType)
+        _write_number(out, hp)
+        _write_number(out, max_hp)
+        _write_number(out, speed)
+        out += _pack(_U8, len(moves), f"Number of moves of {pokemonName}")
+
+        for moveName, moveType, power in moves:
+            _write_string(out, moveName)
+            _write_string(out, moveType)
+            _write_number(out, power)
+
+
+def _read_team(reader):
+    name = reader.string()
+    current = reader.u8()
+
+    party = []
+    for _ in range(reader.u8()):
+        pokemonName = reader.string()
+        pokemonType = reader.string()
+        hp = reader.number()
+        max_hp = reader.number()
+        speed = reader.number()
+        moves = tuple(
+            (reader.string(), reader.string(), reader.number())
+            for _ in range(reader.u8())
+        )
+        party.append((pokemonName, pokemonType, hp, max_hp, speed, moves))
+
+    return name, current, tuple(party)
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = bytes(data)
+        self.offset = 0
+
+    def _unpack(self, format):
+        try:
+            value = format.unpack_from(self.data, self.offset)[0]
+        except struct.error:
+            raise ReplayError("Truncated replay!") from None
+
+        self.offset += format.size
+        return value
+
+    def take(self, size):
+        end = self.offset + size
+        if end > len(self.data):
+            raise ReplayError("Truncated replay!")
+
+        chunk = self.data[self.offset:end]
+        self.offset = end
+        return chunk
+
+    def u8(self):
+        return self._unpack(_U8)
+
+    def u16(self):
+        return self._unpack(_U16)
+
+    def u64(self):
+        return self._unpack(_U64)
+
+    def number(self):
+        # Numbers are stored as doubles; give whole numbers back as ints, as
+        # teams are usually written.
+        number = self._unpack(_F64)
+        return int(number) if number.is_integer() else number
+
+    def string(self):
+        return self.take(self._unpack(_U16)).decode('utf-8')
@@ -0,0 +1,38 @@
+"""
+Independent random number streams derived from one master seed.
+
+Every battle should roll its speed ties (and every Policy its random
+choices) with its own random.Random, rather than the shared random module.
+Deriving each stream's seed from a master seed and a few keys that name the
+stream (such as the two entrants and the game number) makes results
+reproducible bit for bit, however the battles are split between worker
+processes and in whatever order they run:
+
+    rng = spawn(masterSeed, "Team A", "Team B", game)
+
+"""
+
+import hashlib
+import random
+
+
+def derive_seed(master, *keys):
+    """Returns a 64-bit seed derived from the master seed and the given keys
+    (ints, strings, or tuples of them). Different keys give unrelated seeds.
+    """
+
+    text = repr((master,) + keys).encode('utf-8')
+    digest = hashlib.blake2b(text, digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def spawn(master, *keys):
+    """Returns a new random.Random seeded with derive_seed(master, *keys)."""
+
+    return random.Random(derive_seed(master, *keys))
+
+
+def master_seed(seed=None):
+    """Returns the given seed, or a fresh random 64-bit seed if it is None."""
+
+    return seed if seed is not None else random.SystemRandom().getrandbits(64)
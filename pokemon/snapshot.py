@@ -0,0 +1,94 @@
+"""
+Cheap snapshots of battle state, for search algorithms that try out many
+possible turns from the same position.
+
+During a battle the only things that change are the HP of each Pokemon and
+each Player's current_pokemon (plus the random number generator, which
+decides speed ties). A snapshot records just those values in a flat tuple,
+so taking and restoring one is much cheaper than copy.deepcopy() of the two
+Players and their whole Pokemon / Move graphs.
+
+    snapshot = take_snapshot(player1, player2)
+    ...  # play some turns
+    restore_snapshot(player1, player2, snapshot)
+
+or, equivalently:
+
+    with trial(player1, player2):
+        ...  # play some turns
+
+"""
+
+from contextlib import contextmanager
+
+
+def take_snapshot(player1, player2, rng=None):
+    """Returns a snapshot of the mutable state of a battle between the two
+    given Players. If an rng (e.g. a random.Random instance) is given, its
+    state is saved too.
+
+    The snapshot is a tuple: the HP of every Pokemon in player1's party,
+    then in player2's party, then the party index of each player's current
+    Pokemon, then the rng state (or None). Snapshots can be compared and
+    hashed, so they also work as keys for transposition tables.
+    """
+
+    return (
+        *[pokemon.hp for pokemon in player1.pokemon_party],
+        *[pokemon.hp for pokemon in player2.pokemon_party],
+        _current_index(player1),
+        _current_index(player2),
+        rng.getstate() if rng is not None else None,
+    )
+
+
+def restore_snapshot(player1, player2, snapshot, rng=None):
+    """Puts the two given Players (and the rng, if given) back into the state
+    recorded by take_snapshot().
+    """
+
+    party1 = player1.pokemon_party
+    party2 = player2.pokemon_party
+    size1 = len(party1)
+
+    for pokemon, hp in zip(party1, snapshot):
+        pokemon.hp = hp
+
+    for pokemon, hp in zip(party2, snapshot[size1:]):
+        pokemon.hp = hp
+
+    player1.current_pokemon = party1[snapshot[-3]]
+    player2.current_pokemon = party2[snapshot[-2]]
+
+    if rng is not None:
+        rng.setstate(snapshot[-1])
+
+
+def state_key(snapshot):
+    """Returns the part of a snapshot that describes the battle position,
+    leaving out the rng state.
+    """
+
+    return snapshot[:-1]
+
+
+@contextmanager
+def trial(player1, player2, rng=None):
+    """Context manager that restores the battle between the two given
+    Players (and the rng, if given) to its current state on exit.
+    """
+
+    snapshot = take_snapshot(player1, player2, rng)
+    try:
+        yield snapshot
+    finally:
+        restore_snapshot(player1, player2, snapshot, rng)
+
+
+def _current_index(player):
+    current = player.current_pokemon
+    for index, pokemon in enumerate(player.pokemon_party):
+        if pokemon is current:
+            return index
+
+    raise ValueError(f"{player.name}'s current Pokemon is not in their party!")
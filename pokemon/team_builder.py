@@ -0,0 +1,424 @@
+"""
+Genetic-algorithm search for strong teams.
+
+pokemon_team.create_pool() lists every Pokemon and Move a team can be built
+from. evolve_team() searches that pool for the team (which Pokemon, in which
+order, with which moves) that wins the most headless battles (see engine.py)
+against a field of opponent teams:
+
+    result = evolve_team(opponents={'create_team': pokemon_team.create_team})
+    print(result.describe())
+
+A team is encoded as a genome: a tuple with one (pokemonIndex, moveIndices)
+pair per team member, indexing into the pool, where moveIndices is a sorted
+tuple. The first member leads. Every generation, the fittest genomes are
+kept, and the rest of the population is bred from tournament-selected
+parents by uniform crossover and mutation.
+
+A genome's fitness is the fraction of its battles it wins: `battles` battles
+against each opponent, swapping sides every battle. Each generation's new
+genomes are evaluated in parallel by a ProcessPoolExecutor, and every
+fitness is cached, so a genome that turns up again (elites, and the
+duplicates breeding keeps producing) is never simulated twice.
+
+Battles roll their speed ties, and reseed the policies, with random streams
+derived from the search seed and the genome (see seeding.py), so a genome's
+fitness doesn't depend on when or where it is evaluated, and a search with
+a given seed has the same result with any number of workers.
+
+Team factories must be picklable (e.g. module-level functions) when more
+than one worker process is used.
+
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pokemon import Player, Pokemon, Move
+from engine import GreedyPolicy, run_battle, reset_player
+from seeding import derive_seed, spawn, master_seed
+from tournament import chunks
+
+
+class BuildResult:
+    """The result of evolve_team().
+
+    best: the fittest genome found
+    fitness: its fitness
+    history: the best fitness after each generation
+    evaluations: the number of genomes simulated
+    cacheHits: the number of fitness lookups answered by the cache
+    """
+
+    def __init__(self, pool, best, fitness, history, evaluations, cacheHits):
+        self.pool = pool
+        self.best = best
+        self.fitness = fitness
+        self.history = history
+        self.evaluations = evaluations
+        self.cacheHits = cacheHits
+
+    def create_team(self):
+        '''Returns a new list of Pokemon for the best genome.'''
+        return build_team(self.best, self.pool)
+
+    def team_factory(self):
+        '''Returns a picklable TeamFactory for the best genome.'''
+        return TeamFactory(self.best, self.pool)
+
+    def describe(self):
+        '''Returns a description of the best team, one Pokemon per line.'''
+        return describe_genome(self.best, self.pool)
+
+    def __repr__(self):
+        return (
+            f"BuildResult(fitness={self.fitness:.3f}, "
+            f"evaluations={self.evaluations}, cacheHits={self.cacheHits})"
+        )
+
+
+class TeamFactory:
+    """A picklable team factory (like pokemon_team.create_team()) for the
+    team a genome encodes, for use as an opponent or tournament entrant.
+    """
+
+    def __init__(self, genome, pool):
+        self.genome = genome
+        self.specs = _specs(pool)
+
+    def __call__(self):
+        return build_team(self.genome, self.specs)
+
+
+def random_field(size, pool=None, seed=0, teamSize=4, movesPerPokemon=4):
+    """Returns a dict of `size` opponents with random teams from the pool
+    (default: pokemon_team.create_pool()), as TeamFactory objects.
+    """
+
+    if pool is None:
+        import pokemon_team
+        pool = pokemon_team.create_pool()
+
+    specs = _specs(pool)
+    rng = spawn(seed, 'field')
+
+    return {
+        f"Random {index}": TeamFactory(
+            random_genome(rng, len(specs[0]), len(specs[1]), teamSize, movesPerPokemon),
+            specs,
+        )
+        for index in range(size)
+    }
+
+
+def pool_specs(pool):
+    """Returns a (pokemon, moves) pool as plain tuples: a tuple of
+    (name, hp, type, speed) tuples and a tuple of (name, power, type) tuples.
+    """
+
+    pokemon, moves = pool
+    return (
+        tuple((p.name, p.max_hp, p.type, p.speed) for p in pokemon),
+        tuple((m.name, m.power, m.type) for m in moves),
+    )
+
+
+def build_team(genome, pool):
+    """Returns a new list of Pokemon for the given genome. pool is a
+    (pokemon, moves) pool or the pool_specs() of one.
+    """
+
+    pokemonSpecs, moveSpecs = _specs(pool)
+
+    team = []
+    for pokemonIndex, moveIndices in genome:
+        name, hp, type, speed = pokemonSpecs[pokemonIndex]
+        moves = [Move(*moveSpecs[index]) for index in moveIndices]
+        team.append(Pokemon(name, hp, moves, type, speed))
+
+    return team
+
+
+def describe_genome(genome, pool):
+    """Returns a description of the team the given genome encodes, one
+    Pokemon per line.
+    """
+
+    pokemonSpecs, moveSpecs = _specs(pool)
+
+    lines = []
+    for pokemonIndex, moveIndices in genome:
+        name, hp, type, speed = pokemonSpecs[pokemonIndex]
+        moveNames = ', '.join(moveSpecs[index][0] for index in moveIndices)
+        lines.append(f"{name} ({type}, {hp} HP, speed {speed}): {moveNames}")
+
+    return '\n'.join(lines)
+
+
+def random_genome(rng, pokemonCount, moveCount, teamSize=4, movesPerPokemon=4):
+    """Returns a random genome of teamSize different Pokemon, each with
+    movesPerPokemon different moves.
+    """
+
+    return tuple(
+        (pokemonIndex, tuple(sorted(rng.sample(range(moveCount), movesPerPokemon))))
+        for pokemonIndex in rng.sample(range(pokemonCount), teamSize)
+    )
+
+
+def crossover(rng, parent1, parent2, pokemonCount):
+    """Returns a child genome that takes each team member (a Pokemon and its
+    moves) from one parent or the other. A member whose Pokemon is already
+    on the child's team is taken from the other parent instead, or failing
+    that gets an unused Pokemon.
+    """
+
+    child = []
+    used = set()
+
+    for member1, member2 in zip(parent1, parent2):
+        first, second = (member1, member2) if rng.random() < 0.5 else (member2, member1)
+
+        for member in (first, second):
+            if member[0] not in used:
+                break
+        else:
+            unused = [index for index in range(pokemonCount) if index not in used]
+            member = (rng.choice(unused), first[1])
+
+        child.append(member)
+        used.add(member[0])
+
+    return tuple(child)
+
+
+def mutate(rng, genome, pokemonCount, moveCount, rate):
+    """Returns a copy of the genome in which each team member, with
+    probability rate, has one of its moves replaced, is replaced by an
+    unused Pokemon (keeping its moves), or swaps places with another member.
+    """
+
+    genome = list(genome)
+
+    for position, (pokemonIndex, moveIndices) in enumerate(genome):
+        if rng.random() >= rate:
+            continue
+
+        roll = rng.random()
+
+        if roll < 0.5:
+            unusedMoves = [index for index in range(moveCount) if index not in moveIndices]
+            if unusedMoves:
+                moveIndices = list(moveIndices)
+                moveIndices[rng.randrange(len(moveIndices))] = rng.choice(unusedMoves)
+                genome[position] = (pokemonIndex, tuple(sorted(moveIndices)))
+
+        elif roll < 0.8:
+            used = {member[0] for member in genome}
+            unused = [index for index in range(pokemonCount) if index not in used]
+            if unused:
+                genome[position] = (rng.choice(unused), moveIndices)
+
+        else:
+            other = rng.randrange(len(genome))
+            genome[position], genome[other] = genome[other], genome[position]
+
+    return tuple(genome)
+
+
+# Set in each worker process by _init_worker(), so that the pool and the
+# opponents only have to be sent to each worker once.
+_workerSetup = None
+
+
+def _init_worker(setup):
+    global _workerSetup
+    _workerSetup = setup
+
+
+def _evaluate_chunk(genomes):
+    return [genome_fitness(genome, *_workerSetup) for genome in genomes]
+
+
+def genome_fitness(genome, pool, opponents, battles, Policy, maxTurns, seed):
+    """Returns the fraction of battles the genome's team wins: `battles`
+    battles against each of the opponent team factories, swapping sides
+    every battle. Draws count as not winning.
+    """
+
+    candidate = Player("Candidate", build_team(genome, pool))
+    candidatePolicy = Policy()
+    opponentPolicy = Policy()
+
+    wins = 0
+    for opponentIndex, factory in enumerate(opponents):
+        opponent = Player("Opponent", factory())
+
+        for game in range(battles):
+            reset_player(candidate)
+            reset_player(opponent)
+
+            battleSeed = derive_seed(seed, genome, opponentIndex, game)
+            candidatePolicy.reseed(spawn(battleSeed, 1))
+            opponentPolicy.reseed(spawn(battleSeed, 2))
+
+            if game % 2 == 0:
+                result = run_battle(
+                    candidate, opponent, candidatePolicy, opponentPolicy, maxTurns,
+                    rng=spawn(battleSeed),
+                )
+            else:
+                result = run_battle(
+                    opponent, candidate, opponentPolicy, candidatePolicy, maxTurns,
+                    rng=spawn(battleSeed),
+                )
+
+            if result.winner is candidate:
+                wins += 1
+
+    return wins / (battles * len(opponents))
+
+
+def evolve_team(
+    opponents=None,
+    pool=None,
+    generations=20,
+    populationSize=32,
+    eliteCount=2,
+    tournamentSize=3,
+    mutationRate=0.2,
+    teamSize=4,
+    movesPerPokemon=4,
+    battles=20,
+    policy=GreedyPolicy,
+    maxTurns=1000,
+    workers=None,
+    seed=None,
+    fitnessCache=None,
+):
+    """Searches the pool for the team that wins the most battles against the
+    opponents, and returns a BuildResult.
+
+    opponents: a dict mapping each opponent's name to its team factory
+               (default: pokemon_team.create_team)
+    pool: a (list of Pokemon, list of Moves) tuple to build teams from
+          (default: pokemon_team.create_pool())
+    generations: the number of generations bred after the first
+    eliteCount: the number of fittest genomes kept unchanged each generation
+    tournamentSize: the number of genomes competing to be each parent
+    mutationRate: the chance that each team member of a child is mutated
+    battles: the number of battles against each opponent per evaluation
+    policy: the Policy class that plays for both sides
+    workers: the number of worker processes (default: one per CPU).
+             With 1 worker, everything runs in this process.
+    seed: the master seed of the search and of every battle's random
+          streams (default: a fresh random seed)
+    fitnessCache: a dict mapping genomes to their fitness, which is used
+                  and filled in. Only reuse it between searches with the
+                  same opponents, pool, battles, policy and seed.
+    """
+
+    if opponents is None:
+        import pokemon_team
+        opponents = {'create_team': pokemon_team.create_team}
+
+    if pool is None:
+        import pokemon_team
+        pool = pokemon_team.create_pool()
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if fitnessCache is None:
+        fitnessCache = {}
+
+    specs = pool_specs(pool)
+    pokemonCount = len(specs[0])
+    moveCount = len(specs[1])
+
+    if teamSize > pokemonCount or movesPerPokemon > moveCount:
+        raise ValueError("the pool is too small for the team size")
+
+    seed = master_seed(seed)
+    rng = spawn(seed, 'evolve')
+    setup = (specs, list(opponents.values()), battles, policy, maxTurns, seed)
+
+    evaluations = 0
+    cacheHits = 0
+
+    def evaluate(population, executor):
+        nonlocal evaluations, cacheHits
+
+        newGenomes = list(dict.fromkeys(
+            genome for genome in population if genome not in fitnessCache
+        ))
+        cacheHits += len(population) - len(newGenomes)
+        evaluations += len(newGenomes)
+
+        if executor is None:
+            fitnesses = _evaluate_chunk(newGenomes)
+        else:
+            chunkSize = max(1, -(-len(newGenomes) // (workers * 4)))
+            fitnesses = list(executor.map(_evaluate_chunk, chunks(newGenomes, chunkSize)))
+            fitnesses = [fitness for chunk in fitnesses for fitness in chunk]
+
+        fitnessCache.update(zip(newGenomes, fitnesses))
+
+        # Fittest first; ties go to the genome bred first.
+        return sorted(population, key=lambda genome: -fitnessCache[genome])
+
+    def select(ranked):
+        entrants = rng.sample(range(len(ranked)), min(tournamentSize, len(ranked)))
+        return ranked[min(entrants)]
+
+    def search(executor):
+        population = [
+            random_genome(rng, pokemonCount, moveCount, teamSize, movesPerPokemon)
+            for _ in range(populationSize)
+        ]
+        ranked = evaluate(population, executor)
+        history = [fitnessCache[ranked[0]]]
+
+        for _ in range(generations):
+            population = ranked[:eliteCount]
+            while len(population) < populationSize:
+                child = crossover(rng, select(ranked), select(ranked), pokemonCount)
+                population.append(mutate(rng, child, pokemonCount, moveCount, mutationRate))
+
+            ranked = evaluate(population, executor)
+            history.append(fitnessCache[ranked[0]])
+
+        return ranked[0], history
+
+    if workers == 1:
+        _init_worker(setup)
+        best, history = search(None)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(setup,),
+        ) as executor:
+            best, history = search(executor)
+
+    return BuildResult(
+        specs, best, fitnessCache[best], history, evaluations, cacheHits,
+    )
+
+
+def _specs(pool):
+    # Accepts a (pokemon, moves) pool or the pool_specs() of one.
+    pokemon, moves = pool
+    if pokemon and not isinstance(pokemon[0], tuple):
+        return pool_specs(pool)
+
+    return pool
+
+
+if __name__ == '__main__':
+    import pokemon_team
+
+    opponents = dict(random_field(7), create_team=pokemon_team.create_team)
+    result = evolve_team(opponents, seed=0)
+    print(result)
+    print(result.describe())
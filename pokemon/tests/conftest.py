@@ -0,0 +1,10 @@
+"""
+The modules under test live in the directory above this one, and import
+each other as top-level modules.
+
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,46 @@
+import os
+import shutil
+
+import pytest
+
+import bulk_check
+
+
+SOURCE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def submissions(tmp_path, monkeypatch):
+    # A directory holding one compatible submission, subs/good, with the
+    # working directory set to it.
+    good = tmp_path / 'subs' / 'good'
+    good.mkdir(parents=True)
+    for name in ('pokemon.py', 'pokemon_team.py', 'type_chart.py'):
+        shutil.copy(os.path.join(SOURCE, name), good / name)
+
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_relative_path(submissions):
+    report = bulk_check.check_submission(os.path.join('subs', 'good'), useCache=False)
+    assert report.status == bulk_check.PASSED, report.errors
+
+
+def test_absolute_path(submissions):
+    path = str(submissions / 'subs' / 'good')
+    report = bulk_check.check_submission(path, useCache=False)
+    assert report.status == bulk_check.PASSED, report.errors
+
+
+def test_broken_submission_fails(submissions):
+    broken = submissions / 'subs' / 'broken'
+    shutil.copytree(submissions / 'subs' / 'good', broken)
+    source = (broken / 'pokemon.py').read_text()
+    (broken / 'pokemon.py').write_text(source.replace('def team_is_alive', 'def teamIsAlive'))
+
+    reports = bulk_check.check_submissions(
+        [os.path.join('subs', 'good'), os.path.join('subs', 'broken')],
+        workers=2, useCache=False,
+    )
+    assert [report.status for report in reports] == [bulk_check.PASSED, bulk_check.FAILED]
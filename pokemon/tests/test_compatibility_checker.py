@@ -0,0 +1,82 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+
+SOURCE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECKER = os.path.join(SOURCE, 'compatibility_checker.py')
+
+
+@pytest.fixture
+def submission(tmp_path):
+    # A compatible submission whose pokemon_team.py adds a line to
+    # imported.txt whenever it's imported.
+    directory = tmp_path / 'sub'
+    directory.mkdir()
+    for name in ('pokemon.py', 'type_chart.py'):
+        shutil.copy(os.path.join(SOURCE, name), directory / name)
+
+    with open(os.path.join(SOURCE, 'pokemon_team.py'), encoding='utf-8', newline='') as file:
+        team = file.read()
+    (directory / 'pokemon_team.py').write_text(
+        f"open({str(tmp_path / 'imported.txt')!r}, 'a').write('imported\\n')\n" + team,
+        encoding='utf-8',
+    )
+    return directory
+
+
+def check(directory, *options):
+    # Runs the checker on the directory, with its cache next to it. Returns
+    # the verdict and the number of times the code has been imported.
+    environment = dict(os.environ, POKEMON_CHECKER_CACHE=str(directory.parent / 'cache'))
+    process = subprocess.run(
+        [sys.executable, CHECKER, '--json', *options, str(directory)],
+        capture_output=True, text=True, env=environment, timeout=120,
+    )
+    verdict = json.loads(process.stdout)
+    assert process.returncode == (0 if verdict['passed'] else 1)
+
+    marker = directory.parent / 'imported.txt'
+    imports = len(marker.read_text().splitlines()) if marker.exists() else 0
+    return verdict, imports
+
+
+def test_cached_verdicts_dont_import(submission):
+    verdict, imports = check(submission)
+    assert verdict == {'passed': True, 'errors': []}
+    assert imports == 1
+
+    verdict, imports = check(submission)
+    assert verdict == {'passed': True, 'errors': []}
+    assert imports == 1
+
+
+def test_changes_are_checked_again(submission):
+    check(submission)
+
+    # A module that pokemon.py imports is part of the key.
+    with open(submission / 'type_chart.py', 'a', encoding='utf-8') as file:
+        file.write("\n# changed\n")
+    _, imports = check(submission)
+    assert imports == 2
+
+    # So are cached failures.
+    source = (submission / 'pokemon.py').read_text(encoding='utf-8')
+    (submission / 'pokemon.py').write_text(
+        source.replace('def team_is_alive', 'def teamIsAlive'), encoding='utf-8',
+    )
+    verdict, imports = check(submission)
+    assert not verdict['passed'] and imports == 3
+
+    cached, imports = check(submission)
+    assert cached == verdict and imports == 3
+
+
+def test_no_cache(submission):
+    check(submission)
+    _, imports = check(submission, '--no-cache')
+    assert imports == 2
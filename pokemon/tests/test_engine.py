@@ -0,0 +1,151 @@
+import copy
+import random
+
+import pytest
+
+import pokemon_driver
+from pokemon import Player, Pokemon, Move
+from pokemon_driver import AttackAction, SwitchAction, HealAction, RunAction, execute_turn
+from engine import Policy, GreedyPolicy, RandomPolicy, play_turn, run_battle, reset_player
+from events import CollectingSink
+from type_chart import TYPE_NAMES
+
+
+def random_team(rng, size=4):
+    types = TYPE_NAMES[1:]
+    return [
+        Pokemon(
+            f"Mon {index}",
+            rng.randrange(60, 200),
+            [Move(f"Move {index}.{slot}", rng.randrange(0, 100, 5), rng.choice(types))
+             for slot in range(rng.randint(1, 4))],
+            rng.choice(types),
+            # Few speeds, so that there are speed ties.
+            rng.choice((40, 50, 60)),
+        )
+        for index in range(size)
+    ]
+
+
+def same_action(action, player, opponent):
+    # The Action for the other copy of the battle.
+    if isinstance(action, AttackAction):
+        return AttackAction(player, action.moveName, opponent)
+    elif isinstance(action, SwitchAction):
+        return SwitchAction(player, action.pokemonName)
+    elif isinstance(action, HealAction):
+        return HealAction(player)
+    else:
+        return RunAction(player)
+
+
+class LoggedSwitches(Policy):
+    # Keeps the names of the Pokemon the wrapped policy switches to.
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.switches = []
+
+    def choose_action(self, player, opponent):
+        return self.policy.choose_action(player, opponent)
+
+    def choose_switch(self, player, opponent):
+        action = self.policy.choose_switch(player, opponent)
+        self.switches.append(action.pokemonName)
+        return action
+
+
+def state(player):
+    return player.current_pokemon.name, [pokemon.hp for pokemon in player.pokemon_party]
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_engine_plays_like_the_driver(seed, monkeypatch):
+    rng = random.Random(seed)
+    engine1 = Player("Player 1", random_team(rng))
+    engine2 = Player("Player 2", random_team(rng))
+    driver1 = copy.deepcopy(engine1)
+    driver2 = copy.deepcopy(engine2)
+
+    policy1 = LoggedSwitches(RandomPolicy(random.Random(seed + 1)))
+    policy2 = LoggedSwitches(GreedyPolicy())
+
+    # The driver asks for forced switches with input(); make the choices the
+    # engine's policies made instead.
+    logs = {id(driver1): policy1.switches, id(driver2): policy2.switches}
+    monkeypatch.setattr(
+        pokemon_driver, 'handle_switch',
+        lambda player: SwitchAction(player, logs[id(player)].pop(0)),
+    )
+
+    engineRng = random.Random(seed)
+    driverRng = random.Random(seed)
+
+    for turn in range(200):
+        p1Action = policy1.choose_action(engine1, engine2)
+        p2Action = policy2.choose_action(engine2, engine1)
+        driverActions = (
+            same_action(p1Action, driver1, driver2), same_action(p2Action, driver2, driver1),
+        )
+
+        engineSink = CollectingSink()
+        driverSink = CollectingSink()
+        engineResult = play_turn(
+            p1Action, p2Action, policy1, policy2, sink=engineSink, rng=engineRng,
+        )
+        driverResult = execute_turn(*driverActions, sink=driverSink, rng=driverRng)
+
+        assert engineSink.events == driverSink.events
+        assert (state(engine1), state(engine2)) == (state(driver1), state(driver2))
+        assert engineResult.gameOver == driverResult.gameOver
+        assert getattr(engineResult.winner, 'name', None) == \
+            getattr(driverResult.winner, 'name', None)
+
+        if engineResult.gameOver:
+            break
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_narration_doesnt_change_battles(seed):
+    rng = random.Random(seed)
+    players = Player("Player 1", random_team(rng)), Player("Player 2", random_team(rng))
+    outcomes = []
+
+    for sink in (None, CollectingSink()):
+        for player in players:
+            reset_player(player)
+        result = run_battle(
+            *players,
+            RandomPolicy(random.Random(seed)),
+            GreedyPolicy(),
+            sink=sink,
+            rng=random.Random(seed),
+        )
+        outcomes.append((
+            getattr(result.winner, 'name', None), state(players[0]), state(players[1]),
+        ))
+
+    assert outcomes[0] == outcomes[1]
+
+
+def test_greedy_policy_notices_changed_moves():
+    attacker = Player("A", [Pokemon("A", 100, [Move("Big", 90, 'fire'),
+                                               Move("Small", 20, 'fire')], 'fire', 50)])
+    defender = Player("B", [Pokemon("B", 100, [Move("Hit", 10, 'fire')], 'grass', 50)])
+    policy = GreedyPolicy()
+
+    assert policy.choose_action(attacker, defender).moveName == "Big"
+    attacker.current_pokemon.moves[0].power = 1
+    assert policy.choose_action(attacker, defender).moveName == "Small"
+
+
+def test_greedy_policy_without_moves():
+    magikarp = Pokemon("Magikarp", 100, [], 'water', 50)
+    feebas = Pokemon("Feebas", 100, [], 'water', 40)
+    pikachu = Pokemon("Pikachu", 100, [Move("Thunder", 40, 'electric')], 'electric', 50)
+    player = Player("Player 1", [magikarp, feebas])
+    opponent = Player("Player 2", [pikachu])
+
+    policy = GreedyPolicy()
+    assert isinstance(policy.choose_action(player, opponent), HealAction)
+    assert policy.choose_switch(player, opponent).pokemonName == "Magikarp"
@@ -0,0 +1,19 @@
+from collections import Counter
+
+from events import Damage, Fainted, GameOver, SentOut
+
+
+def test_equal_events_hash_alike():
+    assert Damage("Ash", "Pikachu", 20, 80) == Damage("Ash", "Pikachu", 20.0, 80)
+    assert hash(Damage("Ash", "Pikachu", 20, 80)) == hash(Damage("Ash", "Pikachu", 20.0, 80))
+
+    # The same fields in a different kind of event aren't equal.
+    assert Fainted("Ash", "Pikachu") != SentOut("Ash", "Pikachu")
+
+    counts = Counter([
+        Fainted("Ash", "Pikachu"), SentOut("Ash", "Pikachu"), Fainted("Ash", "Pikachu"),
+        GameOver("Ash", "Gary"),
+    ])
+    assert counts[Fainted("Ash", "Pikachu")] == 2
+    assert counts[SentOut("Ash", "Pikachu")] == 1
+    assert len(set(counts)) == 3
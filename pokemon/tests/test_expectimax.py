@@ -0,0 +1,29 @@
+from pokemon import Player, Pokemon, Move
+from pokemon_driver import AttackAction, HealAction
+from engine import GreedyPolicy, run_battle
+from expectimax import ExpectimaxPolicy
+
+
+def test_nothing_to_do_but_heal():
+    player = Player("Player 1", [Pokemon("Magikarp", 100, [], 'water', 50)])
+    pikachu = Pokemon("Pikachu", 100, [Move("Thunder", 40, 'electric')], 'electric', 50)
+    opponent = Player("Player 2", [pikachu])
+
+    action = ExpectimaxPolicy(budgetMs=50, maxDepth=3).choose_action(player, opponent)
+    assert isinstance(action, HealAction)
+
+    # The opponent, searched for, has nothing to do either.
+    action = ExpectimaxPolicy(budgetMs=50, maxDepth=3).choose_action(opponent, player)
+    assert isinstance(action, AttackAction)
+
+
+def test_beats_a_greedy_player():
+    moves = [Move("Tackle", 30, 'no type'), Move("Thunder", 40, 'electric')]
+    fast = Pokemon("Pikachu", 100, moves, 'electric', 60)
+    slow = Pokemon("Squirtle", 100, [Move("Bubble", 40, 'water')], 'water', 40)
+    player = Player("Player 1", [fast])
+    opponent = Player("Player 2", [slow])
+
+    policy = ExpectimaxPolicy(budgetMs=20, maxDepth=4)
+    result = run_battle(player, opponent, policy, GreedyPolicy())
+    assert result.winner is player
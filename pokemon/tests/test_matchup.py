@@ -0,0 +1,105 @@
+import copy
+import pickle
+
+import pytest
+
+from pokemon import Player, Pokemon, Move
+from matchup import MatchupCache
+
+
+def make_pokemon(name, type, power=40, hp=100):
+    return Pokemon(name, hp, [Move(f"{name} Hit", power, type), Move(f"{name} Tap", 10, type)],
+                   type, 50)
+
+
+@pytest.fixture
+def pair():
+    # Electric moves do double damage to water types.
+    attacker = make_pokemon('A', 'electric')
+    defender = make_pokemon('B', 'water')
+    return attacker, defender, MatchupCache([attacker], [defender])
+
+
+def test_best_move(pair):
+    attacker, defender, matchups = pair
+    assert matchups.best_move(attacker, defender) is attacker.moves[0]
+    assert matchups.best_damage(attacker, defender) == 80
+    assert matchups.turns_to_ko(attacker, defender) == 2
+
+
+def test_move_power_change(pair):
+    attacker, defender, matchups = pair
+    attacker.moves[0].power = 1
+    assert matchups.best_damage(attacker, defender) == 20
+    assert matchups.best_move(attacker, defender) is attacker.moves[1]
+
+
+def test_move_type_change(pair):
+    attacker, defender, matchups = pair
+    attacker.moves[0].type = 'ground'
+    assert matchups.best_damage(attacker, defender) == 40
+
+
+def test_moves_edited_in_place(pair):
+    attacker, defender, matchups = pair
+    big = Move("Big", 200, 'no type')
+    attacker.moves.append(big)
+    assert matchups.best_move(attacker, defender) is big
+
+    # The new move is tracked too.
+    big.power = 5
+    assert matchups.best_move(attacker, defender) is attacker.moves[0]
+
+
+def test_moves_replaced(pair):
+    attacker, defender, matchups = pair
+    old = attacker.moves[0]
+    attacker.moves = [Move("New", 70, 'no type')]
+    assert matchups.best_damage(attacker, defender) == 70
+
+    # The Pokemon no longer knows the old move.
+    version = attacker.version
+    old.power = 250
+    assert attacker.version == version
+    assert matchups.best_damage(attacker, defender) == 70
+
+
+def test_defender_changes(pair):
+    attacker, defender, matchups = pair
+    defender.type = 'ground'
+    assert matchups.best_damage(attacker, defender) == 0
+
+    defender.type = 'water'
+    defender.max_hp = 200
+    assert matchups.turns_to_ko(attacker, defender, 200) == 3
+
+
+def test_negative_hp(pair):
+    attacker, defender, matchups = pair
+    assert matchups.turns_to_ko(attacker, defender, -5) == 0
+    assert matchups.turns_to_ko(attacker, defender, 0) == 0
+
+
+def test_unrelated_changes_keep_matchups(pair):
+    attacker, defender, matchups = pair
+    matchup = matchups.get(attacker, defender)
+
+    # New teams, party edits, speed and HP changes don't affect the matchup.
+    player = Player("Ash", [attacker, make_pokemon('C', 'fire')])
+    player.pokemon_party.append(make_pokemon('D', 'grass'))
+    player.pokemon_party.reverse()
+    attacker.speed = 120
+    defender.hp = 7
+
+    assert matchups.get(attacker, defender) is matchup
+
+
+def test_copies_are_tracked():
+    original = make_pokemon('A', 'electric')
+    defender = make_pokemon('B', 'water')
+
+    for other in (copy.deepcopy(original), pickle.loads(pickle.dumps(original))):
+        matchups = MatchupCache([other], [defender])
+        other.moves[0].power = 1
+        assert matchups.best_damage(other, defender) == 20
+        assert original.moves[0].power == 40
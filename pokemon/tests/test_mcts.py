@@ -0,0 +1,41 @@
+import gc
+
+from pokemon import Player, Pokemon, Move
+from pokemon_driver import AttackAction, HealAction
+from mcts import MCTSPolicy
+
+
+def players():
+    magikarp = Pokemon("Magikarp", 100, [], 'water', 50)
+    pikachu = Pokemon("Pikachu", 100, [Move("Thunder", 40, 'electric')], 'electric', 50)
+    return Player("Player 1", [magikarp]), Player("Player 2", [pikachu])
+
+
+def test_nothing_to_do_but_heal():
+    player, opponent = players()
+    with MCTSPolicy(thinkMs=20, workers=1, seed=0) as policy:
+        assert isinstance(policy.choose_action(player, opponent), HealAction)
+        assert isinstance(policy.choose_action(opponent, player), AttackAction)
+
+
+def test_with_block_shuts_the_workers_down():
+    player, opponent = players()
+    with MCTSPolicy(thinkMs=20, workers=2, seed=0) as policy:
+        policy.choose_action(opponent, player)
+        executor = policy._executor
+        assert executor is not None
+
+    assert policy._executor is None
+    processes = list(executor._processes.values()) if executor._processes else []
+    assert not any(process.is_alive() for process in processes)
+
+
+def test_garbage_collected_policies_shut_the_workers_down():
+    player, opponent = players()
+    policy = MCTSPolicy(thinkMs=20, workers=2, seed=0)
+    policy.choose_action(opponent, player)
+    executor = policy._executor
+
+    del policy
+    gc.collect()
+    assert executor._shutdown_thread
@@ -0,0 +1,31 @@
+import pytest
+
+from pokemon import Player, Pokemon, Move
+from engine import GreedyPolicy, RandomPolicy
+from montecarlo import estimate_win_probability
+
+
+def players():
+    pikachu = Pokemon("Pikachu", 100, [Move("Thunder", 40, 'electric')], 'electric', 50)
+    squirtle = Pokemon("Squirtle", 100, [Move("Bubble", 40, 'water')], 'water', 50)
+    return Player("Player 1", [pikachu]), Player("Player 2", [squirtle])
+
+
+@pytest.mark.parametrize('options', [{'batchSize': 0}, {'batchSize': -1}, {'maxBattles': 0}])
+def test_bad_limits(options):
+    player1, player2 = players()
+    with pytest.raises(ValueError):
+        estimate_win_probability(player1, player2, GreedyPolicy(), GreedyPolicy(), **options)
+
+
+def test_reproducible():
+    estimates = []
+    for _ in range(2):
+        player1, player2 = players()
+        estimate = estimate_win_probability(
+            player1, player2, RandomPolicy(), RandomPolicy(), maxBattles=300, seed=5,
+        )
+        estimates.append((estimate.wins, estimate.losses, estimate.draws))
+
+    assert estimates[0] == estimates[1]
+    assert sum(estimates[0]) <= 300
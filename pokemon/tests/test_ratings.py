@@ -0,0 +1,77 @@
+import pytest
+
+from ratings import DEFAULT_RD, EloRatings, Glicko2Ratings, Ratings
+
+
+def test_glicko2_example():
+    # The example from Glickman's "Example of the Glicko-2 system".
+    ratings = Glicko2Ratings(tau=0.5)
+    for name, rating, rd in (
+        ("player", 1500, 200), ("a", 1400, 30), ("b", 1550, 100), ("c", 1700, 300),
+    ):
+        player = ratings.get(name)
+        player.rating = rating
+        player.rd = rd
+
+    ratings.record("player", "a")
+    ratings.record("b", "player")
+    ratings.record("c", "player")
+    ratings.end_period()
+
+    player = ratings.get("player")
+    assert player.rating == pytest.approx(1464.06, abs=0.01)
+    assert player.rd == pytest.approx(151.52, abs=0.01)
+    assert player.volatility == pytest.approx(0.05999, abs=1e-5)
+    assert (player.wins, player.losses) == (1, 2)
+
+
+def test_glicko2_idle_players_widen():
+    ratings = Glicko2Ratings()
+    ratings.record("a", "b")
+    ratings.end_period()
+    rd = ratings.rd("a")
+
+    for _ in range(5):
+        ratings.end_period()
+    assert rd < ratings.rd("a") <= DEFAULT_RD
+
+
+def test_rd_of_new_players():
+    ratings = Glicko2Ratings()
+    assert ratings.rd("nobody") == DEFAULT_RD
+    assert "nobody" not in ratings
+
+
+def test_period_length():
+    ratings = Glicko2Ratings(periodLength=2)
+    ratings.record("a", "b")
+    assert ratings.period == 0
+    ratings.record("a", "b", draw=True)
+    assert ratings.period == 1 and ratings.results == 0
+
+
+def test_elo():
+    ratings = EloRatings(k=32)
+    ratings.record("a", "b")
+    assert ratings.rating("a") == pytest.approx(1516)
+    assert ratings.rating("b") == pytest.approx(1484)
+
+    ratings.record("a", "b", draw=True)
+    assert ratings.rating("a") + ratings.rating("b") == pytest.approx(3000)
+    assert ratings.rating("a") < 1516
+
+
+def test_save_and_load(tmp_path):
+    ratings = Glicko2Ratings(tau=0.3, periodLength=10)
+    for index in range(25):
+        ratings.record(f"p{index % 4}", f"p{(index + 1) % 4}", draw=index % 5 == 0)
+
+    path = tmp_path / 'ratings.bin'
+    ratings.save(str(path))
+    loaded = Ratings.load(str(path))
+
+    # Including the period in progress.
+    for copy in (ratings, loaded):
+        copy.end_period()
+    assert [(p.name, p.rating, p.rd, p.volatility, p.games) for p in loaded] == \
+        [(p.name, p.rating, p.rd, p.volatility, p.games) for p in ratings]
@@ -0,0 +1,143 @@
+import io
+import random
+
+import pytest
+
+from pokemon import Player, Pokemon, Move
+from engine import GreedyPolicy, RandomPolicy
+from events import CollectingSink
+from replay import (
+    Replay, Replayer, ReplayError, record_battle, describe_player, write_replay, read_archive,
+)
+from type_chart import TYPE_NAMES
+
+
+def random_player(name, rng):
+    types = TYPE_NAMES[1:]
+    return Player(name, [
+        Pokemon(
+            f"{name} Mon {index}",
+            rng.randrange(60, 200),
+            [
+                Move(f"Move {slot}", rng.randrange(5, 100, 5), rng.choice(types))
+                for slot in range(4)
+            ],
+            rng.choice(types),
+            rng.choice((40, 50, 60)),
+        )
+        for index in range(4)
+    ])
+
+
+def state(player):
+    return player.current_pokemon.name, [pokemon.hp for pokemon in player.pokemon_party]
+
+
+def recorded(seed):
+    # Returns a recorded battle and the players it left behind.
+    rng = random.Random(seed)
+    player1 = random_player("Player 1", rng)
+    player2 = random_player("Player 2", rng)
+    replay, result = record_battle(
+        player1, player2, RandomPolicy(random.Random(seed)), GreedyPolicy(), seed=seed,
+    )
+    return replay, result, player1, player2
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_round_trip(seed):
+    replay, result, player1, player2 = recorded(seed)
+    copy = Replay.from_bytes(replay.to_bytes())
+
+    assert copy.teams == replay.teams
+    assert copy.seed == replay.seed
+    assert copy.turns == replay.turns
+    assert copy.to_bytes() == replay.to_bytes()
+
+    # Replaying ends where the battle ended.
+    replayer = Replayer(copy)
+    final = replayer.run()
+    assert final.gameOver == result.gameOver
+    assert getattr(final.winner, 'name', None) == getattr(result.winner, 'name', None)
+    assert (state(replayer.player1), state(replayer.player2)) == (state(player1), state(player2))
+
+
+def test_replay_narrates_like_the_battle():
+    rng = random.Random(7)
+    player1 = random_player("Player 1", rng)
+    player2 = random_player("Player 2", rng)
+    sink = CollectingSink()
+    replay, _ = record_battle(
+        player1, player2, RandomPolicy(random.Random(7)), GreedyPolicy(), seed=7, sink=sink,
+    )
+
+    replaySink = CollectingSink()
+    Replayer(Replay.from_bytes(replay.to_bytes()), replaySink).run()
+    assert replaySink.text() == sink.text()
+
+
+def test_seek():
+    replay, _, _, _ = recorded(3)
+    replayer = Replayer(replay, keyframeInterval=4)
+
+    states = [(state(replayer.player1), state(replayer.player2))]
+    while not replayer.finished:
+        replayer.step()
+        states.append((state(replayer.player1), state(replayer.player2)))
+
+    for turn in (len(states) - 1, 0, 5, 2, 9, 1):
+        turn = min(turn, len(states) - 1)
+        replayer.seek(turn)
+        assert (state(replayer.player1), state(replayer.player2)) == states[turn]
+
+
+def test_archive():
+    replays = [recorded(seed)[0] for seed in range(5)]
+    # The same teams again, to use the archive's team cache.
+    replays += replays[:2]
+
+    file = io.BytesIO()
+    for replay in replays:
+        write_replay(file, replay)
+
+    file.seek(0)
+    read = list(read_archive(file))
+    assert [replay.to_bytes() for replay in read] == [replay.to_bytes() for replay in replays]
+
+    with pytest.raises(ReplayError):
+        list(read_archive(io.BytesIO(file.getvalue()[:-3])))
+
+
+def test_not_a_replay():
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(b'nope' + bytes(20))
+
+
+def test_teams_are_kept_as_they_started():
+    replay, _, player1, _ = recorded(11)
+    assert replay.teams[0] != describe_player(player1)
+    assert describe_player(Replay.from_bytes(replay.to_bytes()).players()[0]) == replay.teams[0]
+
+
+@pytest.mark.parametrize('change', [
+    lambda replay: setattr(replay, 'seed', 2 ** 64),
+    lambda replay: setattr(replay, 'seed', -1),
+    lambda replay: replay.turns.append([(0, 0, 256), (1, 0, 0)]),
+    lambda replay: replay.turns.append([(16, 0, 0), (1, 0, 0)]),
+    lambda replay: replay.turns.append([]),
+    lambda replay: replay.turns.append([(0, 2, 0)] * 256),
+    lambda replay: setattr(replay, 'teams', (
+        ("x" * 70000,) + replay.teams[0][1:], replay.teams[1],
+    )),
+    lambda replay: setattr(replay, 'teams', (
+        (replay.teams[0][0], 300, replay.teams[0][2]), replay.teams[1],
+    )),
+    lambda replay: setattr(replay, 'teams', (
+        (replay.teams[0][0], 0, replay.teams[0][2] * 64), replay.teams[1],
+    )),
+])
+def test_values_that_dont_fit(change):
+    replay, _, _, _ = recorded(1)
+    change(replay)
+    with pytest.raises(ReplayError):
+        replay.to_bytes()
@@ -0,0 +1,239 @@
+"""
+Round-robin Pokemon tournament runner.
+
+Every entrant is a team factory shaped like pokemon_team.create_team(): a
+function that takes nothing and returns a new list of Pokemon. Every pair of
+entrants plays a best-of-N match of headless battles (see engine.py), and the
+results are merged into one win/loss/draw table.
+
+Matches are spread over a ProcessPoolExecutor. To keep inter-process
+communication cheap, the entrants are sent to each worker process once, and
+the workers are handed chunks of many pairings at a time, returning one small
+tuple of counts per match.
+
+Team factories must be picklable (e.g. module-level functions) when more than
+one worker process is used.
+
+Each battle rolls its speed ties, and reseeds the policies, with random
+streams derived from the tournament seed and the names of the two entrants
+(see seeding.py), so a tournament with a given seed has the same results
+with any number of workers and any chunk size.
+
+"""
+
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+from pokemon import Player
+from engine import GreedyPolicy, run_battle, reset_player
+from seeding import derive_seed, spawn, master_seed
+
+
+class Standing:
+    """One entrant's row in the tournament table."""
+
+    def __init__(self, name):
+        self.name = name
+
+        # Match results.
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+
+        # Individual battle results.
+        self.gamesWon = 0
+        self.gamesLost = 0
+        self.gamesDrawn = 0
+
+    @property
+    def points(self):
+        '''3 points for a match win and 1 for a match draw.'''
+        return 3 * self.wins + self.draws
+
+    def __repr__(self):
+        return (
+            f"Standing({self.name!r}, wins={self.wins}, losses={self.losses}, "
+            f"draws={self.draws})"
+        )
+
+
+def play_match(team1, team2, bestOf, p1Policy, p2Policy, maxTurns=1000, seed=None):
+    """Plays a best-of-bestOf match between two Players. The players swap
+    sides every battle, and the match stops as soon as either player has
+    won a majority of the battles.
+
+    If a seed is given, every battle gets its own random streams derived
+    from it, for its speed ties and for each of the two Policies.
+
+    Returns a (team1Wins, team2Wins, draws) tuple counting battles.
+    """
+
+    needed = bestOf // 2 + 1
+    team1Wins = team2Wins = draws = 0
+
+    for game in range(bestOf):
+        reset_player(team1)
+        reset_player(team2)
+
+        rng = None
+        if seed is not None:
+            rng = spawn(seed, game)
+            p1Policy.reseed(spawn(seed, game, 1))
+            p2Policy.reseed(spawn(seed, game, 2))
+
+        if game % 2 == 0:
+            result = run_battle(team1, team2, p1Policy, p2Policy, maxTurns, rng=rng)
+        else:
+            result = run_battle(team2, team1, p2Policy, p1Policy, maxTurns, rng=rng)
+
+        if result.winner is team1:
+            team1Wins += 1
+        elif result.winner is team2:
+            team2Wins += 1
+        else:
+            draws += 1
+
+        if team1Wins >= needed or team2Wins >= needed:
+            break
+
+    return team1Wins, team2Wins, draws
+
+
+# Set in each worker process by _init_worker(), so that the entrants only
+# have to be sent to each worker once.
+_workerSetup = None
+
+
+def _init_worker(setup):
+    global _workerSetup
+    _workerSetup = setup
+
+
+def _play_chunk(pairings):
+    names, factories, bestOf, Policy, maxTurns, seed = _workerSetup
+    p1Policy = Policy()
+    p2Policy = Policy()
+
+    results = []
+    for i, j in pairings:
+        team1 = Player(f"Entrant {i}", factories[i]())
+        team2 = Player(f"Entrant {j}", factories[j]())
+        matchSeed = derive_seed(seed, names[i], names[j])
+        results.append(
+            (i, j) + play_match(
+                team1, team2, bestOf, p1Policy, p2Policy, maxTurns, matchSeed,
+            )
+        )
+
+    return results
+
+
+def chunks(items, size):
+    """Yields consecutive slices of items of the given size (the last
+    one may be shorter), for handing work to worker processes in batches.
+    """
+
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def run_tournament(
+    entrants,
+    bestOf=3,
+    policy=GreedyPolicy,
+    workers=None,
+    chunkSize=None,
+    maxTurns=1000,
+    seed=None,
+    ratings=None,
+):
+    """Runs a round-robin tournament and returns the final table as a list
+    of Standing objects, best first.
+
+    entrants: a dict mapping each entrant's name to its team factory
+    bestOf: the number of battles in each match
+    policy: the Policy class that plays for every entrant
+    workers: the number of worker processes (default: one per CPU).
+             With 1 worker, everything runs in this process.
+    chunkSize: the number of matches handed to a worker at a time
+               (default: enough for about 4 chunks per worker)
+    seed: the master seed of every battle's random streams (default: a
+          fresh random seed)
+    ratings: a ratings.Ratings object to record every battle in (a
+             Glicko2Ratings without a periodLength can then treat the
+             tournament as one rating period: call its end_period())
+    """
+
+    names = list(entrants)
+    factories = [entrants[name] for name in names]
+    pairings = list(itertools.combinations(range(len(names)), 2))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if chunkSize is None:
+        chunkSize = max(1, -(-len(pairings) // (workers * 4)))
+
+    setup = (names, factories, bestOf, policy, maxTurns, master_seed(seed))
+
+    if workers == 1:
+        _init_worker(setup)
+        chunkResults = map(_play_chunk, chunks(pairings, chunkSize))
+        return _standings(names, itertools.chain.from_iterable(chunkResults), ratings)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(setup,),
+    ) as executor:
+        chunkResults = executor.map(_play_chunk, chunks(pairings, chunkSize))
+        return _standings(names, itertools.chain.from_iterable(chunkResults), ratings)
+
+
+def _standings(names, matchResults, ratings=None):
+    standings = [Standing(name) for name in names]
+
+    for i, j, iWins, jWins, draws in matchResults:
+        if ratings is not None:
+            ratings.record_match(names[i], names[j], iWins, jWins, draws)
+
+        first = standings[i]
+        second = standings[j]
+
+        first.gamesWon += iWins
+        first.gamesLost += jWins
+        first.gamesDrawn += draws
+        second.gamesWon += jWins
+        second.gamesLost += iWins
+        second.gamesDrawn += draws
+
+        if iWins > jWins:
+            first.wins += 1
+            second.losses += 1
+        elif jWins > iWins:
+            second.wins += 1
+            first.losses += 1
+        else:
+            first.draws += 1
+            second.draws += 1
+
+    standings.sort(
+        key=lambda standing: (standing.points, standing.gamesWon - standing.gamesLost),
+        reverse=True,
+    )
+    return standings
+
+
+def print_standings(standings):
+    """Prints the tournament table returned by run_tournament()."""
+
+    width = max([len(standing.name) for standing in standings] + [4])
+
+    print(f"{'#':>3}  {'Team':<{width}}  {'W':>4} {'L':>4} {'D':>4}  {'Pts':>4}")
+    for rank, standing in enumerate(standings, 1):
+        print(
+            f"{rank:>3}  {standing.name:<{width}}  "
+            f"{standing.wins:>4} {standing.losses:>4} {standing.draws:>4}  "
+            f"{standing.points:>4}"
+        )
@@ -0,0 +1,157 @@
+"""
+Type effectiveness chart.
+
+Every type name is interned to a small integer id, and the multiplier for an
+attacking type against a defending type is stored in a dense 2-D table, so
+looking one up is a single indexed read:
+
+    EFFECTIVENESS[attackTypeId][defendTypeId]
+
+Move and Pokemon objects keep the id of their type in their .type_id
+attribute, so Move.get_multiplier_against() never has to look at type names.
+
+Types that the chart doesn't know about (including 'no type') share id 0,
+which is neutral (1x) in both directions.
+
+EFFECTIVENESS_ARRAY is the same table as a NumPy array, for looking up many
+multipliers at once. NumPy is optional; everything else in this module works
+without it. NumPy is only imported the first time EFFECTIVENESS_ARRAY (or a
+function that needs it) is used, so importing this module stays cheap.
+
+"""
+
+
+TYPE_NAMES = ['no type', 'grass', 'fire', 'water', 'ground', 'electric']
+
+TYPE_IDS = {name: typeId for typeId, name in enumerate(TYPE_NAMES)}
+
+NEUTRAL_TYPE_ID = 0
+
+# attacking type -> (defending types, multiplier)
+_MATCHUPS = {
+    'grass': [
+        (('water', 'ground'), 2),
+        (('fire', 'grass'), 0.5),
+    ],
+    'fire': [
+        (('grass',), 2),
+        (('water', 'fire'), 0.5),
+    ],
+    'water': [
+        (('fire', 'ground'), 2),
+        (('grass', 'water'), 0.5),
+    ],
+    'ground': [
+        (('fire', 'electric'), 2),
+        (('grass',), 0.5),
+    ],
+    'electric': [
+        (('water',), 2),
+        (('grass', 'electric'), 0.5),
+        (('ground',), 0),
+    ],
+}
+
+
+def _build_table():
+    table = [[1] * len(TYPE_NAMES) for _ in TYPE_NAMES]
+
+    for attackType, matchups in _MATCHUPS.items():
+        row = table[TYPE_IDS[attackType]]
+        for defendTypes, multiplier in matchups:
+            for defendType in defendTypes:
+                row[TYPE_IDS[defendType]] = multiplier
+
+    return table
+
+
+EFFECTIVENESS = _build_table()
+
+
+def __getattr__(name):
+    # Builds the NumPy attributes on first use: numpy (the module, or None
+    # if it isn't installed) and EFFECTIVENESS_ARRAY (None without NumPy).
+    # Once built, they are plain module attributes.
+    if name in globals():
+        return globals()[name]
+
+    if name == 'numpy':
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+
+        globals()['numpy'] = numpy
+        return numpy
+
+    elif name == 'EFFECTIVENESS_ARRAY':
+        numpy = __getattr__('numpy')
+        array = None
+        if numpy is not None:
+            array = numpy.array(EFFECTIVENESS, dtype=numpy.float64)
+
+        globals()['EFFECTIVENESS_ARRAY'] = array
+        return array
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def type_id(typeName):
+    """Returns the interned id of the given type name. Unknown types get
+    NEUTRAL_TYPE_ID.
+    """
+
+    return TYPE_IDS.get(typeName, NEUTRAL_TYPE_ID)
+
+
+def multiplier(attackType, defendType):
+    """Returns the multiplier of an attack of the given type against a
+    Pokemon of the given type. Both types are type names (strings).
+    """
+
+    return EFFECTIVENESS[type_id(attackType)][type_id(defendType)]
+
+
+def multipliers(moves, defenders):
+    """Takes two equally long sequences of Move objects and Pokemon objects,
+    and returns a list with the multiplier of each move against the Pokemon
+    it is paired with.
+    """
+
+    table = EFFECTIVENESS
+    return [
+        table[move.type_id][defender.type_id]
+        for move, defender in zip(moves, defenders)
+    ]
+
+
+def type_id_array(typeNames):
+    """Returns a NumPy array with the interned id of each of the given type
+    names.
+    """
+
+    numpy = _require_numpy()
+    typeIds = TYPE_IDS
+    return numpy.fromiter(
+        (typeIds.get(typeName, NEUTRAL_TYPE_ID) for typeName in typeNames),
+        dtype=numpy.intp,
+        count=len(typeNames),
+    )
+
+
+def multipliers_array(attackTypeIds, defendTypeIds):
+    """Takes two broadcastable NumPy arrays of type ids (as returned by
+    type_id_array()) and returns an array with the multiplier of each attack
+    type against the matching defending type.
+    """
+
+    _require_numpy()
+    return __getattr__('EFFECTIVENESS_ARRAY')[attackTypeIds, defendTypeIds]
+
+
+def _require_numpy():
+    numpy = __getattr__('numpy')
+    if numpy is None:
+        raise ImportError("This function requires NumPy to be installed!")
+
+    return numpy